@@ -6,28 +6,1180 @@ Database: PostgreSQL
 """
 
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import sql
+from psycopg2 import pool as pg_pool
+from psycopg2.extras import execute_values
+import argparse
+import asyncio
+import csv
 import datetime
-from typing import List, Dict, Any, Optional
+import functools
+import io
+import itertools
+import json
+import logging
+import math
+import platform
+import random
+import typing
+from typing import List, Dict, Any, Optional, Iterator, Iterable, Sequence, Tuple
 import os
+import queue
+import re
+import select
+import shutil
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, asdict, astuple, is_dataclass
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
 from tabulate import tabulate
 
+try:
+    import asyncpg
+except ImportError:  # backend async bersifat opsional
+    asyncpg = None
+
+try:
+    import resource
+except ImportError:  # tidak tersedia di Windows, RSS puncak tidak dilaporkan
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:  # pipeline perencanaan (PipelinePerencanaan) membutuhkan numpy
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:  # opsional: parsing CSV lebih cepat dan keluaran DataFrame
+    pd = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # ekspor Parquet (EksporData) membutuhkan pyarrow
+    pa = pq = None
+
+# Konfigurasi koneksi PostgreSQL, bisa di-override lewat environment variable
+DB_CONFIG = {
+    "host": os.environ.get("SIPATANI_DB_HOST", "localhost"),
+    "dbname": os.environ.get("SIPATANI_DB_NAME", "sipatani"),
+    "user": os.environ.get("SIPATANI_DB_USER", "postgres"),  # Ganti username PostgreSQL 
+    "password": os.environ.get("SIPATANI_DB_PASSWORD", "ardan230202"),  # Ganti password PostgreSQL 
+    "port": os.environ.get("SIPATANI_DB_PORT", "5432"),
+}
+
+# Ukuran pool koneksi yang dipakai bersama oleh semua manager
+POOL_MIN_KONEKSI = int(os.environ.get("SIPATANI_POOL_MIN", "1"))
+POOL_MAX_KONEKSI = int(os.environ.get("SIPATANI_POOL_MAX", "10"))
+
+# Sequence pembangkit ID: nama sequence -> (tabel, kolom ID, ID awal lama)
+ID_SEQUENCES = {
+    "jadwal_tanam_id_seq": ("jadwal_tanam", "id_jadwal_tanam", 8000),
+    "hasil_panen_id_seq": ("hasil_panen", "id_panen", 5000),
+    "jadwal_pemupukan_id_seq": ("jadwal_pemupukan", "id_kegiatan", 300),
+    "pupuk_pestisida_id_seq": ("pupuk_pestisida", "id_pupukpestisida", 200),
+}
+
+# Cache data referensi (Tanaman, Lahan, Status_Jadwal): umur maksimum dan channel NOTIFY
+TTL_CACHE_REFERENSI = float(os.environ.get("SIPATANI_CACHE_TTL", "300"))
+CHANNEL_REFERENSI = "sipatani_referensi"
+
+# Jumlah baris per halaman untuk listing jadwal tanam
+UKURAN_HALAMAN_JADWAL = 50
+
+# Partisi RANGE per tanggal: tabel -> kolom kunci partisi. Satu partisi = BULAN_PER_PARTISI bulan
+# (default satu musim, selalu mulai dari Januari); partisi dibuat sampai PARTISI_KE_DEPAN periode ke depan.
+TABEL_PARTISI = {"hasil_panen": "tanggal", "jadwal_tanam": "tanggal", "laporan_masalah": "tanggal_masalah"}
+BULAN_PER_PARTISI = int(os.environ.get("SIPATANI_BULAN_PER_PARTISI", "3"))
+PARTISI_KE_DEPAN = int(os.environ.get("SIPATANI_PARTISI_KE_DEPAN", "4"))
+
+# Change-data-capture: tabel yang perubahannya dicatat ke event_perubahan (tabel -> kolom kunci),
+# channel NOTIFY pembangun konsumen dan jumlah event per batch
+TABEL_CDC = {"jadwal_tanam": "id_jadwal_tanam", "hasil_panen": "id_panen", "laporan_masalah": "id"}
+CHANNEL_PERUBAHAN = "sipatani_perubahan"
+UKURAN_BATCH_CDC = int(os.environ.get("SIPATANI_CDC_BATCH", "500"))
+# Batas tunggu NOTIFY; event yang tertahan transaksi lain tetap terambil paling lambat selama ini
+INTERVAL_POLL_CDC = float(os.environ.get("SIPATANI_CDC_POLL", "5"))
+
+# Interval (detik) penjadwal status otomatis jadwal tanam; 0 = tidak dijalankan di background
+INTERVAL_STATUS_OTOMATIS = float(os.environ.get("SIPATANI_INTERVAL_STATUS", "3600"))
+
+# m2 per satuan Lahan.luas_lahan (default 1: luas_lahan dalam m2, seperti tampilan menu lahan;
+# isi 10000 jika data lahan dicatat dalam hektar); jarak_antar_tanaman dalam cm
+LUAS_LAHAN_M2 = float(os.environ.get("SIPATANI_LUAS_LAHAN_M2", "1"))
+
+# Database khusus benchmark; isinya dihapus dan dibangkitkan ulang oleh GeneratorDataSintetis
+DB_BENCHMARK = os.environ.get("SIPATANI_BENCH_DB", "sipatani_bench")
+
+# Seq Scan yang membaca baris sebanyak ini atau lebih ditandai butuh indeks oleh PenasihatQuery
+AMBANG_SEQ_SCAN = int(os.environ.get("SIPATANI_AMBANG_SEQ_SCAN", "1000"))
+
+# Instrumentasi query: statement selambat ini (ms) masuk slow-query log, metrik Prometheus
+# dilayani di PORT_METRIK untuk menu interaktif (0 = mati)
+AMBANG_QUERY_LAMBAT_MS = float(os.environ.get("SIPATANI_QUERY_LAMBAT_MS", "200"))
+PORT_METRIK = int(os.environ.get("SIPATANI_PORT_METRIK", "9464"))
+FILE_LOG_QUERY_LAMBAT = os.environ.get("SIPATANI_LOG_QUERY_LAMBAT", "sipatani-query-lambat.log")
+BUCKET_DURASI_QUERY = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Query di registri_query dijalankan sebagai prepared statement server-side; matikan (0) jika
+# koneksi lewat pooler mode transaksi (misal pgbouncer) yang tidak mempertahankan sesi
+PREPARED_STATEMENT_AKTIF = os.environ.get("SIPATANI_PREPARED", "1") != "0"
+
+# Replika baca (streaming replication), dipisah koma: "host:port" atau DSN libpq lengkap.
+# Kosong = semua operasi ke primary. Replika yang tertinggal lebih dari batas lag dilewati.
+DB_REPLIKA = [r.strip() for r in os.environ.get("SIPATANI_DB_REPLIKA", "").split(",") if r.strip()]
+BATAS_LAG_REPLIKA_DETIK = float(os.environ.get("SIPATANI_BATAS_LAG_REPLIKA", "5"))
+INTERVAL_CEK_REPLIKA = float(os.environ.get("SIPATANI_INTERVAL_CEK_REPLIKA", "2"))
+
+# Query listing jadwal tanam berbasis keyset (WHERE id > id_terakhir)
+QUERY_LIHAT_JADWAL = """
+SELECT 
+    jt.id_jadwal_tanam,
+    jt.id_lahan,
+    l.id_petani,
+    jt.id_tanaman,
+    t.nama_tanaman,
+    t.jarak_antar_tanaman,
+    l.jumlah_pegawai,
+    jt.tanggal as tanggal_tanam,
+    t.durasi_tanam,
+    s.status as status_jadwal
+FROM Jadwal_Tanam jt
+JOIN Lahan l ON jt.id_lahan = l.id_lahan
+JOIN Tanaman t ON jt.id_tanaman = t.id_tanaman
+JOIN Status_Jadwal s ON jt.status_jadwal_id = s.id_status_jadwal
+WHERE jt.id_jadwal_tanam > %s
+ORDER BY jt.id_jadwal_tanam
+"""
+QUERY_LIHAT_JADWAL_HALAMAN = QUERY_LIHAT_JADWAL + " LIMIT %s;"
+
+KOLOM_LIHAT_JADWAL = [
+    "ID Jadwal", "ID Lahan", "ID Petani", "ID Tanaman", 
+    "Nama Tanaman", "Jarak Tanaman (cm)", "Jumlah Pegawai", 
+    "Tanggal Tanam", "Durasi (hari)", "Status Jadwal"
+]
+
+# Query bersama SipataniService (psycopg2) dan AsyncSipataniBackend (asyncpg, lewat sql_asyncpg)
+# versi = xmin baris, dipakai sebagai pengecekan optimistic concurrency saat patch
+QUERY_AMBIL_JADWAL = """
+SELECT id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id, xmin::text::bigint AS versi
+FROM Jadwal_Tanam WHERE id_jadwal_tanam = %s;
+"""
+
+QUERY_TAMBAH_JADWAL = """
+INSERT INTO Jadwal_Tanam (tanggal, id_lahan, id_tanaman, status_jadwal_id)
+VALUES (%s, %s, %s, %s)
+RETURNING id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id, xmin::text::bigint AS versi;
+"""
+
+# Patch banyak jadwal dalam satu UPDATE ... FROM (VALUES ...); kolom NULL berarti tidak diubah,
+# baris dengan versi berbeda tidak ikut ter-update (dideteksi sebagai konflik)
+QUERY_PATCH_JADWAL = """
+UPDATE Jadwal_Tanam jt
+SET tanggal = COALESCE(v.tanggal, jt.tanggal),
+    id_lahan = COALESCE(v.id_lahan, jt.id_lahan),
+    id_tanaman = COALESCE(v.id_tanaman, jt.id_tanaman),
+    status_jadwal_id = COALESCE(v.status_jadwal_id, jt.status_jadwal_id)
+FROM (VALUES %s) AS v(id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id, versi)
+WHERE jt.id_jadwal_tanam = v.id_jadwal_tanam AND (v.versi IS NULL OR jt.xmin::text::bigint = v.versi)
+RETURNING jt.id_jadwal_tanam, jt.tanggal, jt.id_lahan, jt.id_tanaman, jt.status_jadwal_id, jt.xmin::text::bigint;
+"""
+TEMPLATE_PATCH_JADWAL = "(%s::integer, %s::date, %s::integer, %s::integer, %s::integer, %s::bigint)"
+
+QUERY_HITUNG_DATA_TERKAIT = """
+SELECT
+    (SELECT COUNT(*) FROM Hasil_Panen WHERE id_jadwal_tanam = %s),
+    (SELECT COUNT(*) FROM Masalah_Tanam WHERE id_jadwal_tanam = %s),
+    (SELECT COUNT(*) FROM laporan_masalah WHERE id_jadwal_tanam = %s);
+"""
+
+# Hapus jadwal beserta hasil panen, masalah tanam dan laporan masalahnya dalam satu statement.
+# {kondisi} diisi oleh _kondisi_filter_jadwal(); pemeriksaan foreign key baru
+# dijalankan di akhir statement sehingga urutan CTE tidak berpengaruh.
+QUERY_HAPUS_JADWAL_MASSAL = """
+WITH target AS (
+    SELECT jt.id_jadwal_tanam FROM Jadwal_Tanam jt WHERE {kondisi} FOR UPDATE
+), hapus_panen AS (
+    DELETE FROM Hasil_Panen hp USING target t
+    WHERE hp.id_jadwal_tanam = t.id_jadwal_tanam RETURNING 1
+), hapus_masalah AS (
+    DELETE FROM Masalah_Tanam mt USING target t
+    WHERE mt.id_jadwal_tanam = t.id_jadwal_tanam RETURNING 1
+), hapus_laporan AS (
+    -- laporan_masalah tidak punya foreign key, jadi tanpa ini barisnya tertinggal tanpa jadwal
+    DELETE FROM laporan_masalah lm USING target t
+    WHERE lm.id_jadwal_tanam = t.id_jadwal_tanam RETURNING 1
+), hapus_jadwal AS (
+    DELETE FROM Jadwal_Tanam jt USING target t
+    WHERE jt.id_jadwal_tanam = t.id_jadwal_tanam RETURNING 1
+)
+SELECT
+    (SELECT COUNT(*) FROM hapus_jadwal),
+    (SELECT COUNT(*) FROM hapus_panen),
+    (SELECT COUNT(*) FROM hapus_masalah),
+    (SELECT COUNT(*) FROM hapus_laporan);
+"""
+
+QUERY_PRATINJAU_HAPUS_MASSAL = """
+WITH target AS (
+    SELECT jt.id_jadwal_tanam FROM Jadwal_Tanam jt WHERE {kondisi}
+)
+SELECT
+    (SELECT COUNT(*) FROM target),
+    (SELECT COUNT(*) FROM Hasil_Panen hp JOIN target t ON hp.id_jadwal_tanam = t.id_jadwal_tanam),
+    (SELECT COUNT(*) FROM Masalah_Tanam mt JOIN target t ON mt.id_jadwal_tanam = t.id_jadwal_tanam),
+    (SELECT COUNT(*) FROM laporan_masalah lm JOIN target t ON lm.id_jadwal_tanam = t.id_jadwal_tanam);
+"""
+
+QUERY_JADWAL_SIAP_PANEN = """
+SELECT 
+    jt.id_jadwal_tanam,
+    t.nama_tanaman,
+    jt.tanggal as tanggal_tanam,
+    t.durasi_tanam,
+    s.status
+FROM Jadwal_Tanam jt
+JOIN Tanaman t ON jt.id_tanaman = t.id_tanaman
+JOIN Status_Jadwal s ON jt.status_jadwal_id = s.id_status_jadwal
+WHERE jt.status_jadwal_id = %s
+ORDER BY jt.id_jadwal_tanam;
+"""
+
+
+# Ambil id_kegiatan dari jadwal pemupukan (ambil yang terakhir untuk tanaman ini)
+# Input hasil panen dalam satu round-trip lewat fungsi catat_hasil_panen_massal (migrasi 9):
+# validasi jadwal, lookup tanaman/kegiatan dan INSERT terjadi di server
+QUERY_CATAT_HASIL_PANEN_MASSAL = """
+SELECT id_panen, tanggal, jumlah_panen_kg, harga_per_kg, id_tanaman, id_jadwal_tanam, id_kegiatan, total_nilai
+FROM catat_hasil_panen_massal(%s::integer[], %s::date[], %s::numeric[], %s::numeric[], %s, %s);
+"""
+
+QUERY_LIHAT_PEMUPUKAN = """
+SELECT 
+    jp.id_kegiatan,
+    t.id_tanaman || ' / ' || t.nama_tanaman AS tanaman,
+    jp.nama_kegiatan,
+    pp.jenis,
+    jp.dosis_per_bibit_tanaman AS dosis_per_bibit,
+    jp.tanggal_pemupukan AS waktu_pemupukan
+FROM Jadwal_Pemupukan jp
+JOIN Tanaman t ON jp.id_tanaman = t.id_tanaman
+JOIN Pupuk_Pestisida pp ON jp.id_kegiatan = pp.id_kegiatan
+ORDER BY jp.id_kegiatan;
+"""
+
+QUERY_AMBIL_PEMUPUKAN = """
+SELECT id_kegiatan, nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman, xmin::text::bigint AS versi
+FROM Jadwal_Pemupukan WHERE id_kegiatan = %s;
+"""
+
+QUERY_PATCH_PEMUPUKAN = """
+UPDATE Jadwal_Pemupukan jp
+SET tanggal_pemupukan = COALESCE(v.tanggal_pemupukan, jp.tanggal_pemupukan),
+    dosis_per_bibit_tanaman = COALESCE(v.dosis_per_bibit, jp.dosis_per_bibit_tanaman)
+FROM (VALUES %s) AS v(id_kegiatan, tanggal_pemupukan, dosis_per_bibit, versi)
+WHERE jp.id_kegiatan = v.id_kegiatan AND (v.versi IS NULL OR jp.xmin::text::bigint = v.versi)
+RETURNING jp.id_kegiatan, jp.nama_kegiatan, jp.tanggal_pemupukan, jp.dosis_per_bibit_tanaman, jp.id_tanaman,
+          jp.xmin::text::bigint;
+"""
+TEMPLATE_PATCH_PEMUPUKAN = "(%s::integer, %s::date, %s::numeric, %s::bigint)"
+
+# Jadwal (dan kegiatan pemupukan yang terkait) beserta versinya untuk geser_jadwal_massal
+QUERY_JADWAL_UNTUK_GESER = """
+SELECT jt.id_jadwal_tanam, jt.tanggal, jt.xmin::text::bigint FROM Jadwal_Tanam jt WHERE {kondisi};
+"""
+QUERY_PEMUPUKAN_UNTUK_GESER = """
+SELECT id_kegiatan, tanggal_pemupukan, xmin::text::bigint FROM Jadwal_Pemupukan WHERE id_jadwal_tanam = ANY(%s);
+"""
+
+QUERY_TAMBAH_PEMUPUKAN = """
+INSERT INTO Jadwal_Pemupukan (nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman)
+VALUES (%s, %s, %s, %s)
+RETURNING id_kegiatan, nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman;
+"""
+
+QUERY_HAPUS_PUPUK_PESTISIDA_KEGIATAN = "DELETE FROM Pupuk_Pestisida WHERE id_kegiatan = %s;"
+QUERY_HAPUS_PEMUPUKAN = "DELETE FROM Jadwal_Pemupukan WHERE id_kegiatan = %s;"
+QUERY_DAFTAR_ID_KEGIATAN = "SELECT id_kegiatan FROM Jadwal_Pemupukan ORDER BY id_kegiatan;"
+QUERY_CEK_KEGIATAN = "SELECT 1 FROM Jadwal_Pemupukan WHERE id_kegiatan = %s;"
+
+QUERY_LIHAT_STOK = """
+SELECT id_pupukpestisida, nama_barang, jenis, id_kegiatan
+FROM Pupuk_Pestisida ORDER BY id_pupukpestisida;
+"""
+
+QUERY_LIHAT_LAPORAN = """
+SELECT id, id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi
+FROM laporan_masalah ORDER BY id;
+"""
+
+# Pencarian laporan: {sumber_kueri} menambahkan tsquery q jika ada kata kunci. Halaman dipilih
+# dulu hanya dengan id dan skor, ts_headline dihitung untuk baris halaman itu saja
+QUERY_CARI_LAPORAN = """
+WITH cocok AS (
+    SELECT lm.id, {skor} AS skor
+    FROM laporan_masalah lm{sumber_kueri}
+    WHERE {kondisi}
+    ORDER BY {urutan}
+    LIMIT %(batas)s OFFSET %(offset)s
+)
+SELECT lm.id, lm.id_jadwal_tanam, lm.tanggal_masalah, lm.jenis, lm.deskripsi, lm.status_penanganan, lm.solusi,
+       c.skor, {cuplikan}
+FROM cocok c
+JOIN laporan_masalah lm ON lm.id = c.id{sumber_kueri}
+ORDER BY {urutan};
+"""
+
+UKURAN_HALAMAN_LAPORAN = 20
+MAKS_UKURAN_HALAMAN_LAPORAN = 100
+
+QUERY_AMBIL_STOK = """
+SELECT id_pupukpestisida, nama_barang, jenis, id_kegiatan
+FROM Pupuk_Pestisida WHERE id_pupukpestisida = %s;
+"""
+
+QUERY_TAMBAH_STOK = """
+INSERT INTO Pupuk_Pestisida (nama_barang, jenis, id_kegiatan) VALUES (%s, %s, %s)
+RETURNING id_pupukpestisida, nama_barang, jenis, id_kegiatan;
+"""
+
+QUERY_HAPUS_STOK = "DELETE FROM Pupuk_Pestisida WHERE id_pupukpestisida = %s;"
+QUERY_CEK_BARANG_STOK = "SELECT 1 FROM barang_stok WHERE id_barang = %s;"
+
+QUERY_BUAT_TABEL_LAPORAN = """
+CREATE TABLE IF NOT EXISTS laporan_masalah (
+    id SERIAL PRIMARY KEY,
+    id_jadwal_tanam INTEGER NOT NULL,
+    tanggal_masalah DATE NOT NULL,
+    jenis VARCHAR(50) NOT NULL,
+    deskripsi TEXT NOT NULL,
+    status_penanganan VARCHAR(20) NOT NULL CHECK (status_penanganan IN ('Belum', 'Proses', 'Selesai')),
+    solusi TEXT
+);
+"""
+QUERY_TAMBAH_LAPORAN = """
+INSERT INTO laporan_masalah
+(id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi)
+VALUES (%s, %s, %s, %s, %s, %s)
+RETURNING id;
+"""
+QUERY_EDIT_LAPORAN = """
+UPDATE laporan_masalah 
+SET id_jadwal_tanam=%s, tanggal_masalah=%s, jenis=%s, deskripsi=%s, status_penanganan=%s, solusi=%s
+WHERE id=%s;
+"""
+QUERY_HAPUS_LAPORAN = "DELETE FROM laporan_masalah WHERE id=%s;"
+QUERY_UPDATE_STATUS_LAPORAN = """
+UPDATE laporan_masalah 
+SET status_penanganan=%s, solusi=%s
+WHERE id=%s;
+"""
+
+# Rekap hasil panen: hari-hari yang ditandai kotor oleh trigger dihitung ulang dari Hasil_Panen,
+# lalu bulan yang memuat hari tersebut dihitung ulang dari rekap harian
+QUERY_AMBIL_HARI_KOTOR = "WITH kotor AS (DELETE FROM rekap_panen_kotor RETURNING tanggal) SELECT array_agg(tanggal) FROM kotor;"
+
+QUERY_REKAP_PANEN_HARIAN = """
+INSERT INTO rekap_panen_harian (tanggal, id_tanaman, id_lahan, id_petani, jumlah_panen_kg, pendapatan, jumlah_transaksi)
+SELECT hp.tanggal, hp.id_tanaman, jt.id_lahan, l.id_petani,
+       SUM(hp.jumlah_panen_kg), SUM(hp.jumlah_panen_kg * hp.harga_per_kg), COUNT(*)
+FROM Hasil_Panen hp
+JOIN Jadwal_Tanam jt ON hp.id_jadwal_tanam = jt.id_jadwal_tanam
+JOIN Lahan l ON jt.id_lahan = l.id_lahan
+WHERE hp.tanggal = ANY(%s)
+GROUP BY hp.tanggal, hp.id_tanaman, jt.id_lahan, l.id_petani;
+"""
+
+QUERY_REKAP_PANEN_BULANAN = """
+INSERT INTO rekap_panen_bulanan (bulan, id_tanaman, id_lahan, id_petani, jumlah_panen_kg, pendapatan, jumlah_transaksi)
+SELECT date_trunc('month', tanggal)::date, id_tanaman, id_lahan, id_petani,
+       SUM(jumlah_panen_kg), SUM(pendapatan), SUM(jumlah_transaksi)
+FROM rekap_panen_harian
+WHERE tanggal >= %s AND tanggal < %s AND date_trunc('month', tanggal)::date = ANY(%s)
+GROUP BY 1, id_tanaman, id_lahan, id_petani;
+"""
+
+# Dimensi laporan panen: fungsi(periode) -> (kunci, label, join tambahan, urutan);
+# periode = kolom tanggal/bulan tabel rekap yang dibaca
+DIMENSI_LAPORAN_PANEN = {
+    "tanaman": lambda periode: ("r.id_tanaman", "t.nama_tanaman", "JOIN Tanaman t ON t.id_tanaman = r.id_tanaman",
+                                "4 DESC"),
+    "lahan": lambda periode: ("r.id_lahan", "'Lahan ' || r.id_lahan", "", "4 DESC"),
+    "petani": lambda periode: ("r.id_petani", "p.nama_petani", "JOIN Petani p ON p.id_petani = r.id_petani", "4 DESC"),
+    "bulan": lambda periode: (f"date_trunc('month', r.{periode})::date", f"to_char(r.{periode}, 'YYYY-MM')", "", "1"),
+}
+
+QUERY_LAPORAN_PANEN = """
+SELECT {kunci} AS kunci, {label} AS label,
+       SUM(r.jumlah_panen_kg), SUM(r.pendapatan), SUM(r.jumlah_transaksi)
+FROM {tabel} r {join}
+WHERE r.{periode} >= %s AND r.{periode} <= %s
+GROUP BY 1, 2
+ORDER BY {urut};
+"""
+
+# Batas jumlah kejadian per jadwal tanam dalam satu rencana pemupukan berulang
+MAKS_KEJADIAN_PEMUPUKAN = 366
+
+# Kalender pemupukan: multi-row insert (execute_values), id_kegiatan dari sequence
+QUERY_TAMBAH_KALENDER_PEMUPUKAN = """
+INSERT INTO Jadwal_Pemupukan (nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman, id_jadwal_tanam)
+VALUES %s RETURNING id_kegiatan;
+"""
+
+QUERY_JADWAL_UNTUK_KALENDER = """
+SELECT id_jadwal_tanam, id_tanaman, tanggal FROM Jadwal_Tanam
+WHERE id_jadwal_tanam = ANY(%s) ORDER BY id_jadwal_tanam;
+"""
+
+# Range query di atas idx_jadwal_pemupukan_tanggal; jadwal lama (tanpa id_jadwal_tanam) tetap tampil
+QUERY_PEMUPUKAN_JATUH_TEMPO = """
+SELECT jp.id_kegiatan, jp.tanggal_pemupukan, jp.nama_kegiatan, jp.dosis_per_bibit_tanaman,
+       jp.id_tanaman, t.nama_tanaman, jp.id_jadwal_tanam, jt.id_lahan, p.nama_petani
+FROM Jadwal_Pemupukan jp
+JOIN Tanaman t ON jp.id_tanaman = t.id_tanaman
+LEFT JOIN Jadwal_Tanam jt ON jp.id_jadwal_tanam = jt.id_jadwal_tanam
+LEFT JOIN Lahan l ON jt.id_lahan = l.id_lahan
+LEFT JOIN Petani p ON l.id_petani = p.id_petani
+WHERE jp.tanggal_pemupukan >= %s AND jp.tanggal_pemupukan <= %s
+ORDER BY jp.tanggal_pemupukan, jp.id_kegiatan;
+"""
+
+# Pemakaian pupuk terjadwal per kegiatan = dosis per bibit x jumlah bibit jadwal tanamnya
+# (luas lahan / jarak tanam^2, sama dengan PipelinePerencanaan). Hanya kegiatan yang
+# terkait jadwal tanam (Jadwal_Pemupukan.id_jadwal_tanam) yang bisa dihitung.
+SQL_KEBUTUHAN_PEMUPUKAN = """
+SELECT b.id_barang, jp.id_kegiatan, jp.tanggal_pemupukan, jp.nama_kegiatan,
+       jp.dosis_per_bibit_tanaman * floor(l.luas_lahan * %(luas_m2)s / power(t.jarak_antar_tanaman / 100.0, 2)) AS jumlah
+FROM Jadwal_Pemupukan jp
+JOIN Pupuk_Pestisida pp ON pp.id_kegiatan = jp.id_kegiatan
+JOIN barang_stok b ON b.nama_barang = pp.nama_barang AND b.jenis = pp.jenis
+JOIN Jadwal_Tanam jt ON jt.id_jadwal_tanam = jp.id_jadwal_tanam
+JOIN Lahan l ON l.id_lahan = jt.id_lahan
+JOIN Tanaman t ON t.id_tanaman = jt.id_tanaman
+WHERE jp.tanggal_pemupukan > %(dari)s AND jp.tanggal_pemupukan <= %(sampai)s AND t.jarak_antar_tanaman > 0
+"""
+
+# Idempoten: indeks unik parsial (id_kegiatan, id_barang) mencegah pemakaian tercatat dua kali
+QUERY_CATAT_PEMAKAIAN_TERJADWAL = f"""
+INSERT INTO mutasi_stok (id_barang, tanggal, jenis_mutasi, jumlah, id_kegiatan, keterangan)
+SELECT id_barang, tanggal_pemupukan, 'pakai', -jumlah, id_kegiatan, 'Pemakaian terjadwal: ' || nama_kegiatan
+FROM ({SQL_KEBUTUHAN_PEMUPUKAN}) k
+WHERE jumlah > 0
+ON CONFLICT (id_kegiatan, id_barang) WHERE jenis_mutasi = 'pakai' AND id_kegiatan IS NOT NULL DO NOTHING;
+"""
+
+# Kebutuhan kegiatan mendatang yang belum tercatat dibandingkan dengan saldo_stok;
+# tanggal_habis = tanggal pertama kebutuhan kumulatif melebihi saldo
+QUERY_PROYEKSI_KEKURANGAN_STOK = f"""
+WITH kebutuhan AS (
+    SELECT k.id_barang, k.tanggal_pemupukan AS tanggal, SUM(k.jumlah) AS jumlah
+    FROM ({SQL_KEBUTUHAN_PEMUPUKAN}) k
+    WHERE NOT EXISTS (
+        SELECT 1 FROM mutasi_stok m
+        WHERE m.id_kegiatan = k.id_kegiatan AND m.id_barang = k.id_barang AND m.jenis_mutasi = 'pakai'
+    )
+    GROUP BY k.id_barang, k.tanggal_pemupukan
+), berjalan AS (
+    SELECT id_barang, tanggal, SUM(jumlah) OVER (PARTITION BY id_barang ORDER BY tanggal) AS kumulatif
+    FROM kebutuhan
+)
+SELECT b.id_barang, b.nama_barang, b.jenis, b.satuan, COALESCE(s.saldo, 0) AS saldo,
+       MAX(br.kumulatif) AS kebutuhan, COALESCE(s.saldo, 0) - MAX(br.kumulatif) AS sisa,
+       MIN(br.tanggal) FILTER (WHERE br.kumulatif > COALESCE(s.saldo, 0)) AS tanggal_habis
+FROM berjalan br
+JOIN barang_stok b ON b.id_barang = br.id_barang
+LEFT JOIN saldo_stok s ON s.id_barang = br.id_barang
+GROUP BY b.id_barang, b.nama_barang, b.jenis, b.satuan, s.saldo
+HAVING %(semua)s OR COALESCE(s.saldo, 0) < MAX(br.kumulatif)
+ORDER BY tanggal_habis NULLS LAST, b.nama_barang;
+"""
+
+QUERY_SALDO_STOK = """
+SELECT b.id_barang, b.nama_barang, b.jenis, b.satuan, COALESCE(s.saldo, 0), b.stok_minimum
+FROM barang_stok b
+LEFT JOIN saldo_stok s ON s.id_barang = b.id_barang
+WHERE NOT %s OR COALESCE(s.saldo, 0) < b.stok_minimum
+ORDER BY b.nama_barang, b.jenis;
+"""
+
+QUERY_TAMBAH_MUTASI_STOK = """
+INSERT INTO mutasi_stok (id_barang, tanggal, jenis_mutasi, jumlah, keterangan)
+VALUES (%s, %s, %s, %s, %s)
+RETURNING id_mutasi, id_barang, waktu, tanggal, jenis_mutasi, jumlah, id_kegiatan, keterangan;
+"""
+
+QUERY_RIWAYAT_MUTASI_STOK = """
+SELECT id_mutasi, id_barang, waktu, tanggal, jenis_mutasi, jumlah, id_kegiatan, keterangan
+FROM mutasi_stok WHERE id_barang = %s
+ORDER BY waktu DESC, id_mutasi DESC LIMIT %s;
+"""
+
+JENIS_MUTASI_STOK = ("masuk", "pakai", "koreksi")
+
+# Perpindahan status otomatis dalam satu UPDATE. Hanya jadwal yang tanggal mulai atau tanggal
+# panennya (tanggal + durasi_tanam) jatuh di (dari, sampai] yang disentuh; batas bawah tanggal
+# (dari - durasi terpanjang) membuat indeks idx_jadwal_tanam_tanggal bisa dipakai.
+# Status hanya bergerak maju: Terjadwal -> Sedang Berlangsung -> Siap Panen.
+QUERY_PERBARUI_STATUS_JADWAL = """
+UPDATE Jadwal_Tanam jt SET status_jadwal_id = x.status_baru
+FROM (
+    SELECT j.id_jadwal_tanam,
+           CASE WHEN j.tanggal + t.durasi_tanam <= %(sampai)s THEN %(siap_panen)s ELSE %(berlangsung)s END AS status_baru
+    FROM Jadwal_Tanam j
+    JOIN Tanaman t ON t.id_tanaman = j.id_tanaman
+    WHERE j.status_jadwal_id IN (%(terjadwal)s, %(berlangsung)s)
+      AND j.tanggal <= %(sampai)s
+      AND j.tanggal > %(dari)s::date - (SELECT COALESCE(MAX(durasi_tanam), 0) FROM Tanaman)
+      AND (j.tanggal > %(dari)s OR j.tanggal + t.durasi_tanam > %(dari)s)
+) x
+WHERE jt.id_jadwal_tanam = x.id_jadwal_tanam AND x.status_baru > jt.status_jadwal_id
+RETURNING jt.status_jadwal_id;
+"""
+
+# Kolom jadwal tanam untuk pipeline perencanaan; tanggal sebagai jumlah hari sejak 1970-01-01
+# agar seluruh kolom berupa integer dan bisa di-parse langsung ke array
+QUERY_KOLOM_PERENCANAAN = """
+COPY (
+    SELECT jt.id_jadwal_tanam, jt.id_lahan, jt.id_tanaman, jt.tanggal - DATE '1970-01-01'
+    FROM Jadwal_Tanam jt {where}
+) TO STDOUT (FORMAT csv)
+"""
+
+# Total dosis per bibit per jadwal tanam; baris dengan id_jadwal_tanam NULL = kegiatan umum tanaman
+QUERY_DOSIS_PEMUPUKAN = """
+SELECT id_tanaman, id_jadwal_tanam, SUM(dosis_per_bibit_tanaman), COUNT(*)
+FROM Jadwal_Pemupukan GROUP BY id_tanaman, id_jadwal_tanam;
+"""
+
+# Kolom yang boleh diubah lewat edit jadwal tanam / jadwal pemupukan
+KOLOM_EDIT_JADWAL = ("tanggal", "id_lahan", "id_tanaman", "status_jadwal_id")
+
+log_query = logging.getLogger("sipatani.query")
+
+def _teks_query(cur, query) -> str:
+    if isinstance(query, sql.Composable):
+        return query.as_string(cur)
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    return query
+
+class MetrikQuery:
+    # Latensi, jumlah baris dan round-trip per statement, dikelompokkan per operasi user
+    # (aksi menu, rute HTTP, penjadwal) dan jenis perintah SQL
+    def __init__(self, ambang_lambat_ms: float = AMBANG_QUERY_LAMBAT_MS):
+        self.ambang_lambat_ms = ambang_lambat_ms
+        self._lock = threading.Lock()
+        self._lokal = threading.local()
+        self._query: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._operasi: Dict[str, Dict[str, Any]] = {}
+    
+    @contextmanager
+    def operasi(self, nama: str):
+        # Operasi bersarang dihitung sebagai bagian dari operasi terluar
+        if getattr(self._lokal, "operasi", None) is not None:
+            yield
+            return
+        self._lokal.operasi = nama
+        self._lokal.roundtrip = 0
+        mulai = time.perf_counter()
+        try:
+            yield
+        finally:
+            durasi = time.perf_counter() - mulai
+            roundtrip = self._lokal.roundtrip
+            self._lokal.operasi = None
+            with self._lock:
+                st = self._operasi.setdefault(nama, {"jumlah": 0, "durasi": 0.0, "roundtrip": 0})
+                st["jumlah"] += 1
+                st["durasi"] += durasi
+                st["roundtrip"] += roundtrip
+            log_query.debug("Operasi %s: %d round-trip, %.1f ms", nama, roundtrip, durasi * 1000)
+    
+    def bungkus(self, nama: str, fungsi):
+        def terbungkus(*args, **kwargs):
+            with self.operasi(nama):
+                return fungsi(*args, **kwargs)
+        return terbungkus
+    
+    def catat(self, cur, query, durasi: float, error: bool):
+        operasi = getattr(self._lokal, "operasi", None)
+        if operasi is not None:
+            self._lokal.roundtrip += 1
+        teks = _teks_query(cur, query)
+        perintah = (teks.split(None, 1) or ["?"])[0].upper()
+        baris = max(cur.rowcount, 0)
+        lambat = durasi * 1000 >= self.ambang_lambat_ms
+        with self._lock:
+            st = self._query.setdefault((operasi or "-", perintah), {
+                "jumlah": 0, "durasi": 0.0, "baris": 0, "error": 0, "lambat": 0,
+                "bucket": [0] * len(BUCKET_DURASI_QUERY)})
+            st["jumlah"] += 1
+            st["durasi"] += durasi
+            st["baris"] += baris
+            st["error"] += error
+            st["lambat"] += lambat
+            for i, batas in enumerate(BUCKET_DURASI_QUERY):
+                if durasi <= batas:
+                    st["bucket"][i] += 1
+        if lambat:
+            # Satu baris JSON per query lambat agar mudah diolah
+            log_query.warning(json.dumps({
+                "waktu": datetime.datetime.now().isoformat(timespec="milliseconds"),
+                "operasi": operasi, "durasi_ms": round(durasi * 1000, 2), "baris": baris, "error": error,
+                "query": " ".join(teks.split())[:1000],
+            }))
+    
+    def prometheus(self) -> str:
+        with self._lock:
+            query = {k: {**v, "bucket": list(v["bucket"])} for k, v in self._query.items()}
+            operasi = {k: dict(v) for k, v in self._operasi.items()}
+        
+        def label(**isi) -> str:
+            bersih = {k: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for k, v in isi.items()}
+            return "{" + ",".join(f'{k}="{v}"' for k, v in bersih.items()) + "}"
+        
+        baris = [
+            "# HELP sipatani_query_durasi_detik Latensi statement SQL",
+            "# TYPE sipatani_query_durasi_detik histogram",
+        ]
+        for (op, perintah), st in sorted(query.items()):
+            for batas, jumlah in zip(BUCKET_DURASI_QUERY, st["bucket"]):
+                baris.append(f"sipatani_query_durasi_detik_bucket{label(operasi=op, perintah=perintah, le=batas)} {jumlah}")
+            baris.append(f"sipatani_query_durasi_detik_bucket{label(operasi=op, perintah=perintah, le='+Inf')} {st['jumlah']}")
+            baris.append(f"sipatani_query_durasi_detik_sum{label(operasi=op, perintah=perintah)} {st['durasi']:.6f}")
+            baris.append(f"sipatani_query_durasi_detik_count{label(operasi=op, perintah=perintah)} {st['jumlah']}")
+        for nama, kunci, bantuan in (("sipatani_query_baris_total", "baris", "Baris yang dikembalikan/diubah statement"),
+                                     ("sipatani_query_error_total", "error", "Statement yang gagal"),
+                                     ("sipatani_query_lambat_total", "lambat", "Statement di atas ambang slow-query")):
+            baris += [f"# HELP {nama} {bantuan}", f"# TYPE {nama} counter"]
+            baris += [f"{nama}{label(operasi=op, perintah=perintah)} {st[kunci]}"
+                      for (op, perintah), st in sorted(query.items())]
+        for nama, kunci, bantuan in (("sipatani_operasi_total", "jumlah", "Operasi user yang dijalankan"),
+                                     ("sipatani_operasi_durasi_detik_total", "durasi", "Total durasi operasi user"),
+                                     ("sipatani_operasi_roundtrip_total", "roundtrip", "Round-trip database per operasi user")):
+            baris += [f"# HELP {nama} {bantuan}", f"# TYPE {nama} counter"]
+            baris += [f"{nama}{label(operasi=op)} {st[kunci]}" for op, st in sorted(operasi.items())]
+        return "\n".join(baris) + "\n" + registri_query.prometheus()
+
+metrik_query = MetrikQuery()
+
+class RegistriQuery:
+    # Query panas dideklarasikan sekali di sini. CursorTerinstrumentasi mengenali teks query yang terdaftar
+    # dan menjalankannya lewat PREPARE (sekali per koneksi pool) + EXECUTE, jadi parse/plan tidak diulang.
+    # "prepare" = statement baru disiapkan di koneksi itu, "hit" = rencana yang sudah ada dipakai ulang.
+    def __init__(self, query: Dict[str, str], aktif: bool = PREPARED_STATEMENT_AKTIF):
+        self.aktif = aktif
+        self._nama = {teks: f"sipatani_{nama}" for nama, teks in query.items()}
+        self._teks = {f"sipatani_{nama}": teks for nama, teks in query.items()}
+        self._tidak_bisa: set = set()
+        self._lock = threading.Lock()
+        self._statistik = {nama: {"prepare": 0, "hit": 0} for nama in self._teks}
+    
+    def cari(self, query) -> Optional[str]:
+        if not self.aktif or not isinstance(query, str):
+            return None
+        nama = self._nama.get(query)
+        return None if nama in self._tidak_bisa else nama
+    
+    def perintah_prepare(self, nama: str) -> str:
+        return f"PREPARE {nama} AS {sql_asyncpg(self._teks[nama].strip().rstrip(';'))}"
+    
+    def catat(self, nama: str, jenis: str):
+        with self._lock:
+            self._statistik[nama][jenis] += 1
+    
+    def tandai_tidak_bisa(self, nama: str, error: Exception):
+        # Misal tipe parameter tidak bisa disimpulkan server: query ini dijalankan biasa seterusnya
+        self._tidak_bisa.add(nama)
+        log_query.warning("Statement %s tidak bisa di-PREPARE, dijalankan tanpa prepare: %s", nama, error)
+    
+    def statistik(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            salinan = {k: dict(v) for k, v in self._statistik.items()}
+        hasil = []
+        for nama, st in sorted(salinan.items()):
+            total = st["prepare"] + st["hit"]
+            hasil.append({"statement": nama, "prepare": st["prepare"], "hit": st["hit"],
+                          "hit_rate": round(st["hit"] / total, 4) if total else None,
+                          "aktif": self.aktif and nama not in self._tidak_bisa})
+        return hasil
+    
+    def prometheus(self) -> str:
+        baris = [
+            "# HELP sipatani_prepared_statement_total Eksekusi statement terdaftar per hasil cache (prepare/hit)",
+            "# TYPE sipatani_prepared_statement_total counter",
+        ]
+        for st in self.statistik():
+            for hasil in ("prepare", "hit"):
+                baris.append(f'sipatani_prepared_statement_total{{statement="{st["statement"]}",hasil="{hasil}"}} {st[hasil]}')
+        return "\n".join(baris) + "\n"
+
+class CursorTerinstrumentasi(psycopg2.extensions.cursor):
+    # Semua cursor dari pool (termasuk named cursor dan execute_values) melewati catat()
+    def execute(self, query, vars=None):
+        # Named cursor (DECLARE ... CURSOR FOR) tidak bisa memakai EXECUTE, begitu juga parameter bernama
+        nama = registri_query.cari(query) if self.name is None else None
+        if nama is not None and not self.connection.autocommit and (vars is None or isinstance(vars, (tuple, list))):
+            return self._execute_prepared(nama, query, tuple(vars or ()))
+        return self._execute_terukur(query, vars)
+    
+    def _execute_terukur(self, query, vars=None, teks_metrik=None):
+        mulai = time.perf_counter()
+        error = True
+        try:
+            hasil = super().execute(query, vars)
+            error = False
+            return hasil
+        finally:
+            metrik_query.catat(self, teks_metrik or query, time.perf_counter() - mulai, error)
+    
+    def _execute_prepared(self, nama: str, query: str, vars: Tuple):
+        conn = self.connection
+        if nama in conn.statement_siap:
+            registri_query.catat(nama, "hit")
+        elif self._siapkan(nama):
+            registri_query.catat(nama, "prepare")
+        else:
+            return self._execute_terukur(query, vars)
+        argumen = f"({', '.join(['%s'] * len(vars))})" if vars else ""
+        try:
+            # Metrik tetap dicatat dengan teks query asli, bukan "EXECUTE ..."
+            return self._execute_terukur(f"EXECUTE {nama}{argumen};", vars, teks_metrik=query)
+        except psycopg2.Error as e:
+            if e.pgcode == "26000":
+                # Statement hilang dari sesi (misal DISCARD ALL): siapkan lagi di panggilan berikutnya
+                conn.statement_siap.discard(nama)
+            elif e.pgcode == "0A000":
+                # Tipe hasil berubah setelah migrasi skema: buang rencana lama lalu siapkan ulang
+                conn.statement_siap.discard(nama)
+                conn.perlu_dealokasi.add(nama)
+            raise
+    
+    def _siapkan(self, nama: str) -> bool:
+        # Savepoint agar PREPARE yang gagal tidak membatalkan transaksi pemanggil
+        conn = self.connection
+        dealokasi = f"DEALLOCATE {nama}; " if nama in conn.perlu_dealokasi else ""
+        try:
+            self._execute_terukur(f"SAVEPOINT sipatani_prepare; {dealokasi}{registri_query.perintah_prepare(nama)}; "
+                                  "RELEASE SAVEPOINT sipatani_prepare;")
+        except psycopg2.Error as e:
+            if conn.closed:
+                raise
+            super().execute("ROLLBACK TO SAVEPOINT sipatani_prepare;")
+            if e.pgcode is None or not e.pgcode.startswith("42"):
+                raise
+            registri_query.tandai_tidak_bisa(nama, e)
+            return False
+        conn.perlu_dealokasi.discard(nama)
+        conn.statement_siap.add(nama)
+        return True
+    
+    def executemany(self, query, vars_list):
+        mulai = time.perf_counter()
+        error = True
+        try:
+            hasil = super().executemany(query, vars_list)
+            error = False
+            return hasil
+        finally:
+            metrik_query.catat(self, query, time.perf_counter() - mulai, error)
+    
+    def copy_expert(self, sql, file, size=8192):
+        mulai = time.perf_counter()
+        error = True
+        try:
+            hasil = super().copy_expert(sql, file, size)
+            error = False
+            return hasil
+        finally:
+            metrik_query.catat(self, sql, time.perf_counter() - mulai, error)
+
+class KoneksiTerinstrumentasi(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = CursorTerinstrumentasi
+        # Prepared statement hidup selama sesi (tidak ikut rollback), jadi dicatat per koneksi
+        self.statement_siap: set = set()
+        self.perlu_dealokasi: set = set()
+
+# Semua query panas manager/service: satu nama per teks query
+registri_query = RegistriQuery({
+    "lihat_jadwal_halaman": QUERY_LIHAT_JADWAL_HALAMAN,
+    "ambil_jadwal": QUERY_AMBIL_JADWAL,
+    "tambah_jadwal": QUERY_TAMBAH_JADWAL,
+    "hitung_data_terkait": QUERY_HITUNG_DATA_TERKAIT,
+    "jadwal_siap_panen": QUERY_JADWAL_SIAP_PANEN,
+    "catat_hasil_panen_massal": QUERY_CATAT_HASIL_PANEN_MASSAL,
+    "lihat_pemupukan": QUERY_LIHAT_PEMUPUKAN,
+    "ambil_pemupukan": QUERY_AMBIL_PEMUPUKAN,
+    "tambah_pemupukan": QUERY_TAMBAH_PEMUPUKAN,
+    "cek_kegiatan": QUERY_CEK_KEGIATAN,
+    "daftar_id_kegiatan": QUERY_DAFTAR_ID_KEGIATAN,
+    "lihat_stok": QUERY_LIHAT_STOK,
+    "ambil_stok": QUERY_AMBIL_STOK,
+    "tambah_stok": QUERY_TAMBAH_STOK,
+    "hapus_stok": QUERY_HAPUS_STOK,
+    "cek_barang_stok": QUERY_CEK_BARANG_STOK,
+    "saldo_stok": QUERY_SALDO_STOK,
+    "lihat_laporan": QUERY_LIHAT_LAPORAN,
+    "tambah_laporan": QUERY_TAMBAH_LAPORAN,
+    "edit_laporan": QUERY_EDIT_LAPORAN,
+    "hapus_laporan": QUERY_HAPUS_LAPORAN,
+    "update_status_laporan": QUERY_UPDATE_STATUS_LAPORAN,
+})
+
+class ServerMetrik:
+    # Endpoint /metrics (format teks Prometheus) untuk menu interaktif; server API memakai rute /metrics sendiri
+    def __init__(self, metrik: MetrikQuery, host: str = "127.0.0.1", port: int = PORT_METRIK):
+        self.metrik = metrik
+        self.host = host
+        self.port = port
+        self._server = None
+    
+    def mulai(self) -> bool:
+        if self.port <= 0 or self._server is not None:
+            return False
+        metrik = self.metrik
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrik.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            log_query.warning("Endpoint metrik tidak bisa dibuka di %s:%d: %s", self.host, self.port, e)
+            return False
+        threading.Thread(target=self._server.serve_forever, name="server-metrik", daemon=True).start()
+        return True
+    
+    def berhenti(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+class SipataniConnectionPool:
+    def __init__(self, minconn: int = POOL_MIN_KONEKSI, maxconn: int = POOL_MAX_KONEKSI,
+                 batas_idle_detik: float = 30.0, timeout_checkout: float = 30.0, **config):
+        self.config = {**DB_CONFIG, **config}
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.batas_idle_detik = batas_idle_detik
+        self.timeout_checkout = timeout_checkout
+        self._pool = pg_pool.ThreadedConnectionPool(
+            minconn, maxconn, **{"connection_factory": KoneksiTerinstrumentasi, **self.config})
+        # Semaphore membatasi peminjam: thread menunggu, bukan langsung error saat pool habis
+        self._slot = threading.BoundedSemaphore(maxconn)
+        self._terakhir_dipakai: Dict[int, float] = {}
+        self._lock = threading.Lock()
+    
+    def getconn(self, timeout: Optional[float] = None):
+        timeout = self.timeout_checkout if timeout is None else timeout
+        if not self._slot.acquire(timeout=timeout):
+            raise pg_pool.PoolError(f"Pool koneksi penuh ({self.maxconn} koneksi dipakai)")
+        try:
+            # Koneksi yang gagal health check dibuang lalu diganti yang baru
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._cek_kesehatan(conn):
+                    return conn
+                self._buang(conn)
+            raise pg_pool.PoolError("Tidak ada koneksi sehat yang bisa dipinjam dari pool")
+        except Exception:
+            self._slot.release()
+            raise
+    
+    def putconn(self, conn, close: bool = False):
+        try:
+            if close or conn.closed:
+                self._buang(conn)
+            else:
+                with self._lock:
+                    self._terakhir_dipakai[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            self._slot.release()
+    
+    @contextmanager
+    def koneksi(self):
+        conn = self.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            self.putconn(conn)
+    
+    def tutup(self):
+        self._pool.closeall()
+    
+    def _cek_kesehatan(self, conn) -> bool:
+        if conn.closed:
+            return False
+        with self._lock:
+            terakhir = self._terakhir_dipakai.get(id(conn))
+        # Koneksi yang baru saja dikembalikan tidak perlu di-ping lagi
+        if terakhir is not None and time.monotonic() - terakhir < self.batas_idle_detik:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+    
+    def _buang(self, conn):
+        with self._lock:
+            self._terakhir_dipakai.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+_pool_bersama: Dict[Tuple, SipataniConnectionPool] = {}
+_pool_bersama_lock = threading.Lock()
+
+def get_connection_pool(**config) -> SipataniConnectionPool:
+    # Satu pool per konfigurasi koneksi, dipakai bersama oleh semua manager
+    config = {**DB_CONFIG, **config}
+    if "database" in config:
+        config["dbname"] = config.pop("database")
+    kunci = tuple(sorted((k, str(v)) for k, v in config.items()))
+    with _pool_bersama_lock:
+        if kunci not in _pool_bersama:
+            _pool_bersama[kunci] = SipataniConnectionPool(**config)
+        return _pool_bersama[kunci]
+
+def tutup_semua_pool():
+    with _pool_bersama_lock:
+        for pool in _pool_bersama.values():
+            pool.tutup()
+        _pool_bersama.clear()
+
+# Lag dihitung 0 jika semua WAL yang diterima sudah di-replay (primary sedang idle)
+QUERY_STATUS_REPLIKA = """
+SELECT pg_is_in_recovery(),
+       (pg_last_wal_replay_lsn() - '0/0'::pg_lsn)::bigint,
+       CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8 END;
+"""
+QUERY_LSN_TULIS = "SELECT (pg_current_wal_lsn() - '0/0'::pg_lsn)::bigint;"
+
+def _config_replika(spesifikasi: str, dasar: Dict[str, Any]) -> Dict[str, Any]:
+    # Kredensial dan database yang tidak disebut sama dengan primary
+    if "=" in spesifikasi or "://" in spesifikasi:
+        return {**dasar, **psycopg2.extensions.parse_dsn(spesifikasi)}
+    host, _, port = spesifikasi.partition(":")
+    return {**dasar, "host": host, "port": port or dasar["port"]}
+
+class ReplikaBaca:
+    # Satu standby: pool dibuat saat pertama dipakai, status lag di-cache selama interval_cek
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.pool: Optional[SipataniConnectionPool] = None
+        self.lsn_replay: Optional[int] = None
+        self.lag_detik: Optional[float] = None
+        self.error: Optional[str] = None
+        self.dicek_pada = float("-inf")
+        self.turun_sampai = float("-inf")
+        self._lock = threading.Lock()
+    
+    @property
+    def nama(self) -> str:
+        return f"{self.config.get('host')}:{self.config.get('port')}"
+    
+    def layak(self, batas_lag: float, lsn_minimal: Optional[float] = None) -> bool:
+        if self.lag_detik is None or self.lag_detik > batas_lag:
+            return False
+        return lsn_minimal is None or self.lsn_replay >= lsn_minimal
+    
+    def pinjam(self, batas_lag: float, lsn_minimal: Optional[float], interval_cek: float):
+        sekarang = time.monotonic()
+        if sekarang < self.turun_sampai:
+            return None
+        # Status yang masih segar dan jelas tertinggal tidak perlu dicek ulang
+        segar = sekarang - self.dicek_pada < interval_cek
+        if segar and self.lag_detik is not None and self.lag_detik > batas_lag:
+            return None
+        conn = None
+        try:
+            with self._lock:
+                if self.pool is None:
+                    self.pool = get_connection_pool(**self.config)
+            conn = self.pool.getconn()
+            # LSN replay hanya naik, jadi cache yang sudah melewati lsn_minimal tetap valid
+            if not segar or not self.layak(batas_lag, lsn_minimal):
+                self.perbarui_status(conn)
+            if self.layak(batas_lag, lsn_minimal):
+                return conn
+            self.pool.putconn(conn)
+            return None
+        except (psycopg2.Error, pg_pool.PoolError) as e:
+            if conn is not None:
+                self.pool.putconn(conn, close=True)
+            self.error = str(e).strip()
+            self.lag_detik = None
+            # Replika mati dicoba lagi setelah beberapa interval, sementara itu baca ke primary
+            self.turun_sampai = time.monotonic() + interval_cek * 5
+            log_query.warning("Replika %s tidak bisa dipakai: %s", self.nama, self.error)
+            return None
+    
+    def perbarui_status(self, conn):
+        with conn.cursor() as cur:
+            cur.execute(QUERY_STATUS_REPLIKA)
+            dalam_recovery, lsn_replay, lag = cur.fetchone()
+        conn.rollback()
+        with self._lock:
+            self.dicek_pada = time.monotonic()
+            if not dalam_recovery:
+                # Bukan standby (misal sudah di-promote): jangan dipakai, bisa split-brain
+                self.lsn_replay, self.lag_detik = None, None
+                self.error = "bukan standby (pg_is_in_recovery = false)"
+            else:
+                # Belum pernah me-replay transaksi dan masih ada WAL tertunda: lag tidak diketahui
+                self.lsn_replay, self.lag_detik, self.error = lsn_replay, float("inf") if lag is None else lag, None
+
+class RouterKoneksi:
+    # Operasi baca berat dikirim ke replika yang lag-nya dalam toleransi (bergiliran),
+    # semua tulis dan baca lainnya ke primary. Read-your-writes: setelah thread ini menulis,
+    # replika baru dipakai jika sudah me-replay LSN tulisan tersebut. Request API tidak terikat
+    # thread, jadi server HTTP membawa LSN per klien lewat header (atur_lsn_tulis/lsn_tulis).
+    # getconn/putconn/koneksi selalu ke primary, jadi router bisa dipakai di mana pun pool dipakai.
+    def __init__(self, primary: SipataniConnectionPool, replika: Sequence[Dict[str, Any]] = (),
+                 batas_lag_detik: float = BATAS_LAG_REPLIKA_DETIK, interval_cek: float = INTERVAL_CEK_REPLIKA):
+        self.primary = primary
+        self.replika = [ReplikaBaca(config) for config in replika]
+        self.batas_lag_detik = batas_lag_detik
+        self.interval_cek = interval_cek
+        self._giliran = itertools.count()
+        self._lokal = threading.local()
+    
+    def __getattr__(self, nama):
+        # Atribut pool lain (config, maxconn, ...) milik primary
+        if nama == "primary":
+            raise AttributeError(nama)
+        return getattr(self.primary, nama)
+    
+    def getconn(self, timeout: Optional[float] = None):
+        return self.primary.getconn(timeout)
+    
+    def putconn(self, conn, close: bool = False):
+        self.primary.putconn(conn, close)
+    
+    def koneksi(self):
+        return self.primary.koneksi()
+    
+    @contextmanager
+    def koneksi_baca(self, batas_lag: Optional[float] = None):
+        pool, conn = self._pinjam_baca(self.batas_lag_detik if batas_lag is None else batas_lag)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+    
+    def _pinjam_baca(self, batas_lag: float):
+        lsn_minimal = getattr(self._lokal, "lsn_tulis", None)
+        if self.replika:
+            mulai = next(self._giliran)
+            for i in range(len(self.replika)):
+                replika = self.replika[(mulai + i) % len(self.replika)]
+                conn = replika.pinjam(batas_lag, lsn_minimal, self.interval_cek)
+                if conn is not None:
+                    return replika.pool, conn
+        return self.primary, self.primary.getconn()
+    
+    def catat_tulis(self, conn):
+        # Dipanggil setelah commit di primary: LSN saat ini >= LSN commit tulisan tadi
+        if not self.replika:
+            return
+        self._lokal.lsn_tulis = self._lsn_saat_ini(conn)
+    
+    def lsn_primary(self) -> Optional[float]:
+        # Untuk tulisan yang tidak lewat router (backend async)
+        if not self.replika:
+            return None
+        with self.primary.koneksi() as conn:
+            return self._lsn_saat_ini(conn)
+    
+    def _lsn_saat_ini(self, conn) -> float:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(QUERY_LSN_TULIS)
+                lsn = cur.fetchone()[0]
+            conn.rollback()
+            return lsn
+        except psycopg2.Error:
+            # LSN tidak diketahui: baca tetap ke primary sampai tulisan berikutnya
+            if not conn.closed:
+                conn.rollback()
+            return float("inf")
+    
+    def lsn_tulis(self) -> Optional[float]:
+        return getattr(self._lokal, "lsn_tulis", None)
+    
+    def atur_lsn_tulis(self, lsn: Optional[float]):
+        self._lokal.lsn_tulis = lsn
+    
+    def status_replika(self) -> List[Dict[str, Any]]:
+        hasil = []
+        for replika in self.replika:
+            # Paksa cek ulang, termasuk replika yang sedang dianggap mati
+            replika.dicek_pada = replika.turun_sampai = float("-inf")
+            conn = replika.pinjam(float("inf"), None, self.interval_cek)
+            if conn is not None:
+                replika.pool.putconn(conn)
+            hasil.append({"replika": replika.nama, "lag_detik": replika.lag_detik, "lsn_replay": replika.lsn_replay,
+                          "layak": replika.layak(self.batas_lag_detik), "error": replika.error})
+        return hasil
+    
+    def tutup(self):
+        # Pool primary dan replika terdaftar di _pool_bersama, ditutup oleh tutup_semua_pool
+        tutup_semua_pool()
+
+def get_router_koneksi(replika: Optional[Sequence[str]] = None, **config) -> RouterKoneksi:
+    dasar = {**DB_CONFIG, **config}
+    replika = DB_REPLIKA if replika is None else replika
+    return RouterKoneksi(get_connection_pool(**config), [_config_replika(r, dasar) for r in replika])
+
+# Koneksi yang sedang dipinjam thread ini lewat SipataniDatabase (menu interaktif)
+_sesi_lokal = threading.local()
+
 class SipataniDatabase:
-    def __init__(self):
+    def __init__(self, pool: Optional[SipataniConnectionPool] = None):
+        self.pool = pool
         self.connection = None
         self.cursor = None
         
     def connect(self):
         print("Koneksi ke database PostgreSQL")
         try:
-            self.connection = psycopg2.connect(
-                host="localhost",
-                database="sipatani",
-                user="postgres",  # Ganti username PostgreSQL 
-                password="ardan230202",  # Ganti password PostgreSQL 
-                port="5432"
-            )
-            self.cursor = self.connection.cursor()
+            self._pinjam_koneksi()
             print("Koneksi ke database berhasil!")
             return True
         except psycopg2.Error as e:
@@ -36,97 +1188,1501 @@ class SipataniDatabase:
     
     def disconnect(self):
         print("Tutup koneksi database")
-        if self.cursor:
+        self._kembalikan_koneksi()
+        print("Koneksi database ditutup")
+    
+    @contextmanager
+    def sesi(self):
+        # Pinjam koneksi dari pool hanya selama satu operasi
+        self._pinjam_koneksi()
+        try:
+            yield self
+            self.connection.commit()
+            if isinstance(self.pool, RouterKoneksi):
+                self.pool.catat_tulis(self.connection)
+        except Exception:
+            if not self.connection.closed:
+                self.connection.rollback()
+            raise
+        finally:
+            self._kembalikan_koneksi()
+    
+    def _pinjam_koneksi(self):
+        if self.pool is None:
+            self.pool = get_connection_pool()
+        self.connection = self.pool.getconn()
+        self.cursor = self.connection.cursor()
+        # SipataniService di thread yang sama memakai koneksi ini, bukan meminjam lagi
+        _sesi_lokal.koneksi = self.connection
+    
+    def _kembalikan_koneksi(self):
+        if self.cursor and not self.cursor.closed:
             self.cursor.close()
         if self.connection:
-            self.connection.close()
-        print("Koneksi database ditutup")
+            self.pool.putconn(self.connection)
+        _sesi_lokal.koneksi = None
+        self.connection = None
+        self.cursor = None
+
+# Jangan pernah mundur: ID yang sudah dibagikan nextval ke transaksi lain tetap aman
+SQL_SELARASKAN_SEQUENCE = """
+SELECT setval('{nama_seq}', GREATEST(
+    (SELECT COALESCE(MAX({kolom}), {id_awal}) FROM {tabel}),
+    (SELECT CASE WHEN is_called THEN last_value ELSE last_value - 1 END FROM {nama_seq})
+));
+"""
+
+def _sql_sequence_id() -> List[str]:
+    # Sequence dibuat, diselaraskan dengan ID yang sudah ada, lalu dijadikan DEFAULT kolom ID
+    perintah = []
+    for nama_seq, (tabel, kolom, id_awal) in ID_SEQUENCES.items():
+        perintah += [
+            f"CREATE SEQUENCE IF NOT EXISTS {nama_seq} START WITH {id_awal + 1};",
+            SQL_SELARASKAN_SEQUENCE.format(nama_seq=nama_seq, tabel=tabel, kolom=kolom, id_awal=id_awal),
+            f"ALTER TABLE {tabel} ALTER COLUMN {kolom} SET DEFAULT nextval('{nama_seq}');",
+            f"ALTER SEQUENCE {nama_seq} OWNED BY {tabel}.{kolom};",
+        ]
+    return perintah
+
+def selaraskan_sequence(cur, nama_seq: str):
+    # Dipanggil setelah insert dengan ID eksplisit (impor CSV, data sintetis). Sequence belum ada berarti
+    # migrasi belum jalan; migrasi itu sendiri menyelaraskan sequence saat membuatnya.
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (nama_seq,))
+    if cur.fetchone()[0]:
+        tabel, kolom, id_awal = ID_SEQUENCES[nama_seq]
+        cur.execute(SQL_SELARASKAN_SEQUENCE.format(nama_seq=nama_seq, tabel=tabel, kolom=kolom, id_awal=id_awal))
+
+class ReferensiCache:
+    # Query per tabel referensi dan cara mengubah baris menjadi dict
+    QUERY = {
+        "tanaman": (
+            "SELECT id_tanaman, nama_tanaman, durasi_tanam, jarak_antar_tanaman FROM Tanaman ORDER BY nama_tanaman;",
+            lambda row: {"id": row[0], "nama": row[1], "durasi": row[2], "jarak": row[3]},
+        ),
+        "lahan": (
+            """
+            SELECT l.id_lahan, l.luas_lahan, l.jumlah_pegawai, p.nama_petani 
+            FROM Lahan l
+            JOIN Petani p ON l.id_petani = p.id_petani
+            ORDER BY l.id_lahan;
+            """,
+            lambda row: {"id": row[0], "luas": row[1], "pegawai": row[2], "petani": row[3]},
+        ),
+        "status_jadwal": (
+            "SELECT id_status_jadwal, status FROM Status_Jadwal ORDER BY id_status_jadwal;",
+            lambda row: {"id": row[0], "status": row[1]},
+        ),
+    }
+    # Tabel yang berubah (payload NOTIFY) -> cache yang harus dibuang
+    INVALIDASI = {
+        "tanaman": ["tanaman"],
+        "lahan": ["lahan"],
+        "petani": ["lahan"],
+        "status_jadwal": ["status_jadwal"],
+    }
+    
+    def __init__(self, pool: Optional[SipataniConnectionPool] = None, ttl: float = TTL_CACHE_REFERENSI):
+        self.pool = pool
+        self.ttl = ttl
+        self._data: Dict[str, Dict[int, Dict[str, Any]]] = {}
+        self._dimuat: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._conn_listen = None
+    
+    def tanaman(self, cur) -> Dict[int, Dict[str, Any]]:
+        return self.ambil("tanaman", cur)
+    
+    def lahan(self, cur) -> Dict[int, Dict[str, Any]]:
+        return self.ambil("lahan", cur)
+    
+    def status_jadwal(self, cur) -> Dict[int, Dict[str, Any]]:
+        return self.ambil("status_jadwal", cur)
+    
+    def ambil(self, nama: str, cur) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            data = self.segar(nama)
+            if data is None:
+                cur.execute(self.QUERY[nama][0])
+                data = self.isi(nama, cur.fetchall())
+            return data
+    
+    def segar(self, nama: str) -> Optional[Dict[int, Dict[str, Any]]]:
+        # Data cache jika belum kedaluwarsa/di-invalidasi, None jika harus dimuat ulang
+        with self._lock:
+            self._proses_notifikasi()
+            dimuat = self._dimuat.get(nama)
+            if dimuat is None or time.monotonic() - dimuat >= self.ttl:
+                return None
+            return self._data[nama]
+    
+    def isi(self, nama: str, rows) -> Dict[int, Dict[str, Any]]:
+        ke_dict = self.QUERY[nama][1]
+        with self._lock:
+            self._data[nama] = {row[0]: ke_dict(row) for row in rows}
+            self._dimuat[nama] = time.monotonic()
+            return self._data[nama]
+    
+    def invalidasi(self, nama: Optional[str] = None):
+        with self._lock:
+            for kunci in ([nama] if nama else list(self._dimuat)):
+                self._dimuat.pop(kunci, None)
+                self._data.pop(kunci, None)
+    
+    def siapkan_trigger(self, conn):
+        # Trigger per statement mengirim NOTIFY berisi nama tabel yang berubah
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("""
+            CREATE OR REPLACE FUNCTION notify_referensi() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify({channel}, lower(TG_TABLE_NAME));
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            """).format(channel=sql.Literal(CHANNEL_REFERENSI)))
+            for tabel in self.INVALIDASI:
+                nama_trigger = sql.Identifier(f"trg_notify_{tabel}")
+                cur.execute(sql.SQL("DROP TRIGGER IF EXISTS {} ON {};").format(nama_trigger, sql.Identifier(tabel)))
+                cur.execute(sql.SQL("""
+                CREATE TRIGGER {} AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {}
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_referensi();
+                """).format(nama_trigger, sql.Identifier(tabel)))
+        conn.commit()
+    
+    def mulai_listen(self):
+        # Koneksi LISTEN dipinjam dari pool dan ditahan selama cache dipakai
+        conn = self.pool.getconn()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {};").format(sql.Identifier(CHANNEL_REFERENSI)))
+        self._conn_listen = conn
+    
+    def berhenti_listen(self):
+        conn, self._conn_listen = self._conn_listen, None
+        if conn is None:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute("UNLISTEN *;")
+            conn.autocommit = False
+            self.pool.putconn(conn)
+        except psycopg2.Error:
+            self.pool.putconn(conn, close=True)
+    
+    def _proses_notifikasi(self):
+        if self._conn_listen is None:
+            return
+        try:
+            self._conn_listen.poll()
+        except psycopg2.Error:
+            # Koneksi LISTEN putus: buang semua cache dan kembali ke TTL saja
+            self.pool.putconn(self._conn_listen, close=True)
+            self._conn_listen = None
+            self.invalidasi()
+            return
+        while self._conn_listen.notifies:
+            notifikasi = self._conn_listen.notifies.pop(0)
+            for nama in self.INVALIDASI.get(notifikasi.payload, []):
+                self.invalidasi(nama)
+
+class SipataniError(Exception):
+    pass
+
+class DataTidakDitemukan(SipataniError):
+    pass
+
+class ValidasiGagal(SipataniError):
+    pass
+
+class KonflikVersi(SipataniError):
+    pass
+
+# Nilai status_penanganan yang diizinkan untuk laporan_masalah
+STATUS_PENANGANAN = ('Belum', 'Proses', 'Selesai')
+
+# Status jadwal tanam
+STATUS_TERJADWAL = 993
+STATUS_SEDANG_BERLANGSUNG = 994
+STATUS_SIAP_PANEN = 995
+
+# id_kegiatan hasil panen jika tanamannya belum punya kegiatan pemupukan
+ID_KEGIATAN_DEFAULT = 301
+
+# Tipe request/response layanan SIPATANI (tanpa input()/print)
+@dataclass
+class JadwalTanamInput:
+    tanggal: datetime.date
+    id_lahan: int
+    id_tanaman: int
+    status_jadwal_id: int = STATUS_TERJADWAL
+
+@dataclass
+class JadwalTanam:
+    id_jadwal_tanam: int
+    tanggal: datetime.date
+    id_lahan: int
+    id_tanaman: int
+    status_jadwal_id: int
+    versi: Optional[int] = None
+
+@dataclass
+class JadwalTanamDetail:
+    id_jadwal_tanam: int
+    id_lahan: int
+    id_petani: int
+    id_tanaman: int
+    nama_tanaman: str
+    jarak_antar_tanaman: Any
+    jumlah_pegawai: int
+    tanggal_tanam: datetime.date
+    durasi_tanam: int
+    status_jadwal: str
+
+@dataclass
+class HalamanJadwal:
+    data: List[JadwalTanamDetail]
+    # id_terakhir dipakai sebagai parameter halaman berikutnya, None jika sudah habis
+    id_terakhir: Optional[int]
+
+@dataclass
+class PerubahanJadwal:
+    id_jadwal_tanam: int
+    tanggal: Optional[datetime.date] = None
+    id_lahan: Optional[int] = None
+    id_tanaman: Optional[int] = None
+    status_jadwal_id: Optional[int] = None
+    # versi dari ambil_jadwal; jika diisi, patch ditolak bila baris sudah diubah sejak dibaca
+    versi: Optional[int] = None
+
+@dataclass
+class HasilHapusJadwal:
+    id_jadwal_tanam: int
+    hasil_panen: int
+    masalah_tanam: int
+    laporan_masalah: int
+
+@dataclass
+class FilterJadwal:
+    # Semua kriteria yang diisi digabung dengan AND
+    id_jadwal_tanam: Optional[List[int]] = None
+    tanggal_mulai: Optional[datetime.date] = None
+    tanggal_selesai: Optional[datetime.date] = None
+    id_lahan: Optional[int] = None
+    status_jadwal_id: Optional[int] = None
+
+@dataclass
+class HasilHapusMassal:
+    jadwal_tanam: int
+    hasil_panen: int
+    masalah_tanam: int
+    laporan_masalah: int
+
+@dataclass
+class BarisLaporanPanen:
+    kunci: Any
+    label: str
+    jumlah_panen_kg: Decimal
+    pendapatan: Decimal
+    jumlah_transaksi: int
+
+@dataclass
+class JadwalSiapPanen:
+    id_jadwal_tanam: int
+    nama_tanaman: str
+    tanggal_tanam: datetime.date
+    durasi_tanam: int
+    status: str
+
+@dataclass
+class HasilPanenInput:
+    id_jadwal_tanam: int
+    tanggal: datetime.date
+    jumlah_panen_kg: float
+    harga_per_kg: float
+
+@dataclass
+class HasilPanen:
+    id_panen: int
+    tanggal: datetime.date
+    jumlah_panen_kg: float
+    harga_per_kg: float
+    id_tanaman: int
+    id_jadwal_tanam: int
+    id_kegiatan: int
+    total_nilai: float
+
+@dataclass
+class JadwalPemupukanInput:
+    id_tanaman: int
+    jenis: str
+    nama_kegiatan: str
+    nama_pupuk: str
+    interval_hari: int
+    dosis_per_bibit: float
+
+@dataclass
+class KegiatanPemupukan:
+    id_kegiatan: int
+    nama_kegiatan: str
+    tanggal_pemupukan: datetime.date
+    dosis_per_bibit_tanaman: float
+    id_tanaman: int
+    versi: Optional[int] = None
+
+@dataclass
+class JadwalPemupukan:
+    id_kegiatan: int
+    tanaman: str
+    nama_kegiatan: str
+    jenis: str
+    dosis_per_bibit: float
+    tanggal_pemupukan: datetime.date
+
+@dataclass
+class PerubahanJadwalPemupukan:
+    id_kegiatan: int
+    tanggal_pemupukan: Optional[datetime.date] = None
+    dosis_per_bibit: Optional[float] = None
+    versi: Optional[int] = None
+
+@dataclass
+class HasilPatch:
+    jadwal_tanam: List[JadwalTanam]
+    jadwal_pemupukan: List[KegiatanPemupukan]
+
+@dataclass
+class RencanaPemupukanInput:
+    # Rencana berulang yang diterapkan ke setiap jadwal tanam: kejadian ke-k jatuh pada
+    # tanggal tanam + mulai_hari_ke + k * interval_hari
+    id_jadwal_tanam: List[int]
+    jenis: str
+    nama_kegiatan: str
+    nama_pupuk: str
+    dosis_per_bibit: float
+    interval_hari: int
+    jumlah_kejadian: int
+    mulai_hari_ke: int = 0
+
+@dataclass
+class HasilKalenderPemupukan:
+    jumlah_kegiatan: int
+    tanggal_pertama: Optional[datetime.date]
+    tanggal_terakhir: Optional[datetime.date]
+
+@dataclass
+class PemupukanJatuhTempo:
+    id_kegiatan: int
+    tanggal_pemupukan: datetime.date
+    nama_kegiatan: str
+    dosis_per_bibit: Decimal
+    id_tanaman: int
+    nama_tanaman: str
+    id_jadwal_tanam: Optional[int]
+    id_lahan: Optional[int]
+    nama_petani: Optional[str]
+
+@dataclass
+class StokInput:
+    nama_barang: str
+    jenis: str
+    id_kegiatan: int
+
+@dataclass
+class Stok:
+    id_pupukpestisida: int
+    nama_barang: str
+    jenis: str
+    id_kegiatan: int
+
+@dataclass
+class SaldoStok:
+    id_barang: int
+    nama_barang: str
+    jenis: str
+    satuan: str
+    saldo: Decimal
+    stok_minimum: Decimal
+
+@dataclass
+class MutasiStokInput:
+    # jumlah selalu positif untuk masuk/pakai; koreksi boleh negatif
+    id_barang: int
+    jenis_mutasi: str
+    jumlah: float
+    keterangan: Optional[str] = None
+    tanggal: Optional[datetime.date] = None
+
+@dataclass
+class MutasiStok:
+    id_mutasi: int
+    id_barang: int
+    waktu: datetime.datetime
+    tanggal: datetime.date
+    jenis_mutasi: str
+    jumlah: Decimal
+    id_kegiatan: Optional[int]
+    keterangan: Optional[str]
+
+@dataclass
+class KekuranganStok:
+    id_barang: int
+    nama_barang: str
+    jenis: str
+    satuan: str
+    saldo: Decimal
+    kebutuhan: Decimal
+    sisa: Decimal
+    tanggal_habis: Optional[datetime.date]
+
+@dataclass
+class LaporanMasalahInput:
+    id_jadwal_tanam: int
+    tanggal_masalah: datetime.date
+    jenis: str
+    deskripsi: str
+    status_penanganan: str
+    solusi: Optional[str] = None
+
+@dataclass
+class LaporanMasalah:
+    id: int
+    id_jadwal_tanam: int
+    tanggal_masalah: datetime.date
+    jenis: str
+    deskripsi: str
+    status_penanganan: str
+    solusi: Optional[str]
+
+@dataclass
+class FilterLaporan:
+    # Semua kriteria yang diisi digabung dengan AND; kata_kunci memakai sintaks websearch
+    # (contoh: "ulat grayak" -jagung)
+    kata_kunci: Optional[str] = None
+    jenis: Optional[str] = None
+    status_penanganan: Optional[str] = None
+    tanggal_mulai: Optional[datetime.date] = None
+    tanggal_selesai: Optional[datetime.date] = None
+    id_jadwal_tanam: Optional[int] = None
+    halaman: int = 1
+    ukuran_halaman: int = UKURAN_HALAMAN_LAPORAN
+
+@dataclass
+class HasilCariLaporan:
+    id: int
+    id_jadwal_tanam: int
+    tanggal_masalah: datetime.date
+    jenis: str
+    deskripsi: str
+    status_penanganan: str
+    solusi: Optional[str]
+    # skor dan cuplikan hanya terisi jika ada kata kunci
+    skor: Optional[float]
+    cuplikan: Optional[str]
+
+@dataclass
+class HalamanLaporan:
+    data: List[HasilCariLaporan]
+    halaman: int
+    ada_berikutnya: bool
+
+def dari_json(cls, data: Any):
+    # Ubah body JSON menjadi dataclass request, tanggal dalam format ISO (YYYY-MM-DD)
+    if not isinstance(data, dict):
+        raise ValidasiGagal("Body JSON harus berupa object")
+    tipe_field = typing.get_type_hints(cls)
+    tidak_dikenal = sorted(set(data) - set(tipe_field))
+    if tidak_dikenal:
+        raise ValidasiGagal(f"Field tidak dikenal: {', '.join(tidak_dikenal)}")
+    nilai = {}
+    for nama, isi in data.items():
+        tipe = tipe_field[nama]
+        tipe_dasar = next((t for t in typing.get_args(tipe) if t is not type(None)), tipe)
+        if isinstance(isi, str) and tipe_dasar is datetime.date:
+            try:
+                isi = datetime.date.fromisoformat(isi)
+            except ValueError:
+                raise ValidasiGagal(f"Format tanggal {nama} salah! Gunakan YYYY-MM-DD")
+        nilai[nama] = isi
+    try:
+        return cls(**nilai)
+    except TypeError as e:
+        raise ValidasiGagal(str(e))
+
+def _kondisi_filter_jadwal(filter_jadwal: FilterJadwal) -> Tuple[str, list]:
+    kondisi, param = [], []
+    if filter_jadwal.id_jadwal_tanam is not None:
+        kondisi.append("jt.id_jadwal_tanam = ANY(%s)")
+        param.append(list(filter_jadwal.id_jadwal_tanam))
+    if filter_jadwal.tanggal_mulai is not None:
+        kondisi.append("jt.tanggal >= %s")
+        param.append(filter_jadwal.tanggal_mulai)
+    if filter_jadwal.tanggal_selesai is not None:
+        kondisi.append("jt.tanggal <= %s")
+        param.append(filter_jadwal.tanggal_selesai)
+    if filter_jadwal.id_lahan is not None:
+        kondisi.append("jt.id_lahan = %s")
+        param.append(filter_jadwal.id_lahan)
+    if filter_jadwal.status_jadwal_id is not None:
+        kondisi.append("jt.status_jadwal_id = %s")
+        param.append(filter_jadwal.status_jadwal_id)
+    # Tanpa kriteria berarti seluruh tabel, tidak diizinkan
+    if not kondisi:
+        raise ValidasiGagal("Minimal satu kriteria hapus harus diisi")
+    return " AND ".join(kondisi), param
+
+def _query_cari_laporan(filter_laporan: FilterLaporan) -> Tuple[str, Dict[str, Any]]:
+    f = filter_laporan
+    if f.halaman < 1:
+        raise ValidasiGagal("Halaman dimulai dari 1")
+    if not 1 <= f.ukuran_halaman <= MAKS_UKURAN_HALAMAN_LAPORAN:
+        raise ValidasiGagal(f"Ukuran halaman harus 1 sampai {MAKS_UKURAN_HALAMAN_LAPORAN}")
+    if f.status_penanganan is not None and f.status_penanganan not in STATUS_PENANGANAN:
+        raise ValidasiGagal("Status penanganan harus salah satu dari: Belum, Proses, Selesai")
+    
+    kondisi = []
+    param: Dict[str, Any] = {"batas": f.ukuran_halaman + 1, "offset": (f.halaman - 1) * f.ukuran_halaman}
+    kata_kunci = (f.kata_kunci or "").strip()
+    if kata_kunci:
+        kondisi.append("lm.dokumen @@ q")
+        param["kata_kunci"] = kata_kunci
+    for kolom in ("jenis", "status_penanganan", "id_jadwal_tanam"):
+        if getattr(f, kolom) is not None:
+            kondisi.append(f"lm.{kolom} = %({kolom})s")
+            param[kolom] = getattr(f, kolom)
+    if f.tanggal_mulai is not None:
+        kondisi.append("lm.tanggal_masalah >= %(tanggal_mulai)s")
+        param["tanggal_mulai"] = f.tanggal_mulai
+    if f.tanggal_selesai is not None:
+        kondisi.append("lm.tanggal_masalah <= %(tanggal_selesai)s")
+        param["tanggal_selesai"] = f.tanggal_selesai
+    
+    # Konfigurasi 'simple' (tanpa stemming) karena kamus bahasa Indonesia tidak ada di semua versi PostgreSQL
+    if kata_kunci:
+        bagian = {
+            "sumber_kueri": " CROSS JOIN websearch_to_tsquery('simple', %(kata_kunci)s) AS q",
+            "skor": "ts_rank_cd(lm.dokumen, q)",
+            "urutan": "skor DESC, lm.id DESC",
+            "cuplikan": "ts_headline('simple', lm.deskripsi, q, 'MaxFragments=2, MaxWords=20, MinWords=5')",
+        }
+    else:
+        bagian = {"sumber_kueri": "", "skor": "NULL::real", "urutan": "lm.tanggal_masalah DESC, lm.id DESC",
+                  "cuplikan": "NULL::text"}
+    return QUERY_CARI_LAPORAN.format(kondisi=" AND ".join(kondisi) or "TRUE", **bagian), param
+
+def bangun_kalender_pemupukan(rencana: RencanaPemupukanInput,
+                              jadwal: List[Tuple[int, int, datetime.date]]) -> List[Tuple]:
+    # Kembangkan rencana menjadi baris (nama_kegiatan, tanggal, dosis, id_tanaman, id_jadwal_tanam)
+    kejadian = []
+    for id_jadwal_tanam, id_tanaman, tanggal_tanam in jadwal:
+        for k in range(rencana.jumlah_kejadian):
+            tanggal = tanggal_tanam + datetime.timedelta(days=rencana.mulai_hari_ke + k * rencana.interval_hari)
+            kejadian.append((f"{rencana.nama_kegiatan} ke-{k + 1}", tanggal, rencana.dosis_per_bibit,
+                             id_tanaman, id_jadwal_tanam))
+    return kejadian
+
+class SipataniService:
+    def __init__(self, pool: Optional[SipataniConnectionPool] = None, cache: Optional[ReferensiCache] = None,
+                 koneksi=None):
+        self.pool = pool
+        self.cache = cache or ReferensiCache(ttl=0)
+        # Koneksi tetap (misal milik LaporanMasalahDB); jika None koneksi dipinjam dari pool
+        self.koneksi = koneksi
+    
+    @contextmanager
+    def _transaksi(self, nama_cursor: Optional[str] = None, baca: bool = False):
+        # Satu operasi = satu transaksi; pakai koneksi sesi jika thread ini sudah meminjam
+        conn = self.koneksi or getattr(_sesi_lokal, "koneksi", None)
+        router = self.pool if isinstance(self.pool, RouterKoneksi) else None
+        # baca=True: listing/laporan boleh dari replika, kecuali sesi masih punya transaksi terbuka
+        if baca and router is not None and self.koneksi is None and (
+                conn is None or conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE):
+            with router.koneksi_baca() as conn_baca, conn_baca.cursor(name=nama_cursor) as cur:
+                yield cur
+            return
+        dipinjam = conn is None
+        if dipinjam:
+            if self.pool is None:
+                self.pool = get_connection_pool()
+            conn = self.pool.getconn()
+        try:
+            with conn.cursor(name=nama_cursor) as cur:
+                yield cur
+            conn.commit()
+            if router is not None and not baca:
+                router.catat_tulis(conn)
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if dipinjam:
+                self.pool.putconn(conn)
+    
+    # ---- Referensi ----
+    
+    def daftar_tanaman(self) -> List[Dict[str, Any]]:
+        with self._transaksi() as cur:
+            return list(self.cache.tanaman(cur).values())
+    
+    def daftar_lahan(self) -> List[Dict[str, Any]]:
+        with self._transaksi() as cur:
+            return list(self.cache.lahan(cur).values())
+    
+    def daftar_status_jadwal(self) -> List[Dict[str, Any]]:
+        with self._transaksi() as cur:
+            return list(self.cache.status_jadwal(cur).values())
+    
+    def _validasi_referensi(self, cur, id_lahan: Optional[int] = None, id_tanaman: Optional[int] = None,
+                            status_jadwal_id: Optional[int] = None):
+        if id_lahan is not None and id_lahan not in self.cache.lahan(cur):
+            raise ValidasiGagal(f"ID lahan {id_lahan} tidak valid!")
+        if id_tanaman is not None and id_tanaman not in self.cache.tanaman(cur):
+            raise ValidasiGagal(f"ID tanaman {id_tanaman} tidak valid!")
+        if status_jadwal_id is not None and status_jadwal_id not in self.cache.status_jadwal(cur):
+            raise ValidasiGagal(f"Status jadwal {status_jadwal_id} tidak valid!")
+    
+    # ---- Jadwal tanam ----
+    
+    def lihat_jadwal(self, id_terakhir: int = 0, ukuran_halaman: int = UKURAN_HALAMAN_JADWAL) -> HalamanJadwal:
+        # Satu halaman keyset: lanjutkan dari id_jadwal_tanam terakhir yang sudah diterima
+        with self._transaksi(baca=True) as cur:
+            cur.execute(QUERY_LIHAT_JADWAL_HALAMAN, (id_terakhir, ukuran_halaman))
+            data = [JadwalTanamDetail(*row) for row in cur.fetchall()]
+        id_berikutnya = data[-1].id_jadwal_tanam if len(data) == ukuran_halaman else None
+        return HalamanJadwal(data, id_berikutnya)
+    
+    def ambil_jadwal(self, id_jadwal_tanam: int) -> JadwalTanam:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_AMBIL_JADWAL, (id_jadwal_tanam,))
+            row = cur.fetchone()
+        if row is None:
+            raise DataTidakDitemukan(f"Jadwal tanam ID {id_jadwal_tanam} tidak ditemukan!")
+        return JadwalTanam(*row)
+    
+    def tambah_jadwal(self, data: JadwalTanamInput) -> JadwalTanam:
+        with self._transaksi() as cur:
+            self._validasi_referensi(cur, data.id_lahan, data.id_tanaman, data.status_jadwal_id)
+            # ID jadwal dibangkitkan oleh sequence
+            cur.execute(QUERY_TAMBAH_JADWAL, (data.tanggal, data.id_lahan, data.id_tanaman, data.status_jadwal_id))
+            return JadwalTanam(*cur.fetchone())
+    
+    def edit_jadwal(self, perubahan: PerubahanJadwal) -> JadwalTanam:
+        return self.terapkan_patch(jadwal=[perubahan]).jadwal_tanam[0]
+    
+    def terapkan_patch(self, jadwal: Sequence[PerubahanJadwal] = (),
+                       pemupukan: Sequence[PerubahanJadwalPemupukan] = ()) -> HasilPatch:
+        # Satu transaksi, satu UPDATE per tabel; gagal satu baris berarti semua dibatalkan
+        if not jadwal and not pemupukan:
+            raise ValidasiGagal("Tidak ada perubahan yang diberikan")
+        for p in jadwal:
+            if all(getattr(p, k) is None for k in KOLOM_EDIT_JADWAL):
+                raise ValidasiGagal(f"Tidak ada perubahan untuk jadwal tanam ID {p.id_jadwal_tanam}")
+        for p in pemupukan:
+            if p.tanggal_pemupukan is None and p.dosis_per_bibit is None:
+                raise ValidasiGagal(f"Tidak ada perubahan untuk kegiatan ID {p.id_kegiatan}")
+            if p.dosis_per_bibit is not None and p.dosis_per_bibit <= 0:
+                raise ValidasiGagal("Dosis per bibit harus lebih dari 0!")
+        
+        with self._transaksi() as cur:
+            return self._terapkan_patch(cur, jadwal, pemupukan)
+    
+    def _terapkan_patch(self, cur, jadwal: Sequence[PerubahanJadwal],
+                        pemupukan: Sequence[PerubahanJadwalPemupukan]) -> HasilPatch:
+        # Memakai cursor (dan transaksi) pemanggil, tidak meminjam koneksi lain dari pool
+        hasil = HasilPatch([], [])
+        if jadwal:
+            for p in jadwal:
+                self._validasi_referensi(cur, p.id_lahan, p.id_tanaman, p.status_jadwal_id)
+            rows = self._patch_tabel(
+                cur, QUERY_PATCH_JADWAL, TEMPLATE_PATCH_JADWAL,
+                [(p.id_jadwal_tanam, p.tanggal, p.id_lahan, p.id_tanaman, p.status_jadwal_id, p.versi) for p in jadwal],
+                "Jadwal_Tanam", "id_jadwal_tanam", "Jadwal tanam")
+            hasil.jadwal_tanam = [JadwalTanam(*row) for row in rows]
+        if pemupukan:
+            rows = self._patch_tabel(
+                cur, QUERY_PATCH_PEMUPUKAN, TEMPLATE_PATCH_PEMUPUKAN,
+                [(p.id_kegiatan, p.tanggal_pemupukan, p.dosis_per_bibit, p.versi) for p in pemupukan],
+                "Jadwal_Pemupukan", "id_kegiatan", "ID kegiatan")
+            hasil.jadwal_pemupukan = [KegiatanPemupukan(*row) for row in rows]
+        return hasil
+    
+    def _patch_tabel(self, cur, query: str, template: str, baris: List[Tuple], tabel: str, kolom_id: str,
+                     label: str) -> List[Tuple]:
+        ids = [b[0] for b in baris]
+        if len(set(ids)) != len(ids):
+            raise ValidasiGagal(f"{label} yang sama muncul lebih dari sekali dalam satu patch")
+        # page_size = semua baris, jadi tetap satu statement
+        rows = execute_values(cur, query, baris, template=template, page_size=len(baris), fetch=True)
+        diperbarui = {row[0]: row for row in rows}
+        gagal = [i for i in ids if i not in diperbarui]
+        if gagal:
+            # Bedakan baris yang tidak ada dengan baris yang versinya sudah berubah
+            cur.execute(sql.SQL("SELECT {0} FROM {1} WHERE {0} = ANY(%s);").format(
+                sql.Identifier(kolom_id), sql.Identifier(tabel.lower())), (gagal,))
+            ada = {row[0] for row in cur.fetchall()}
+            hilang = [i for i in gagal if i not in ada]
+            if hilang:
+                raise DataTidakDitemukan(f"{label} {', '.join(map(str, hilang))} tidak ditemukan!")
+            raise KonflikVersi(f"{label} {', '.join(map(str, gagal))} sudah diubah pengguna lain, muat ulang lalu coba lagi")
+        return [diperbarui[i] for i in ids]
+    
+    def geser_jadwal_massal(self, filter_jadwal: FilterJadwal, hari: int, ikut_pemupukan: bool = True) -> HasilPatch:
+        # Misal setelah cuaca buruk: semua jadwal yang cocok (dan pemupukannya) mundur/maju sekian hari
+        if hari == 0:
+            raise ValidasiGagal("Jumlah hari tidak boleh 0")
+        kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+        geser = datetime.timedelta(days=hari)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_JADWAL_UNTUK_GESER.format(kondisi=kondisi), param)
+            jadwal = [PerubahanJadwal(i, tanggal=t + geser, versi=v) for i, t, v in cur.fetchall()]
+            pemupukan = []
+            if jadwal and ikut_pemupukan:
+                cur.execute(QUERY_PEMUPUKAN_UNTUK_GESER, ([p.id_jadwal_tanam for p in jadwal],))
+                pemupukan = [PerubahanJadwalPemupukan(i, tanggal_pemupukan=t + geser, versi=v)
+                             for i, t, v in cur.fetchall()]
+            if not jadwal:
+                return HasilPatch([], [])
+            return self._terapkan_patch(cur, jadwal, pemupukan)
+    
+    def hitung_data_terkait(self, id_jadwal_tanam: int) -> Dict[str, int]:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_HITUNG_DATA_TERKAIT, (id_jadwal_tanam,) * 3)
+            hasil_panen, masalah_tanam, laporan_masalah = cur.fetchone()
+        return {"hasil_panen": hasil_panen, "masalah_tanam": masalah_tanam, "laporan_masalah": laporan_masalah}
+    
+    def hapus_jadwal(self, id_jadwal_tanam: int) -> HasilHapusJadwal:
+        hasil = self.hapus_jadwal_massal(FilterJadwal(id_jadwal_tanam=[id_jadwal_tanam]))
+        if hasil.jadwal_tanam == 0:
+            raise DataTidakDitemukan(f"Jadwal tanam ID {id_jadwal_tanam} tidak ditemukan!")
+        return HasilHapusJadwal(id_jadwal_tanam, hasil.hasil_panen, hasil.masalah_tanam, hasil.laporan_masalah)
+    
+    def pratinjau_hapus_massal(self, filter_jadwal: FilterJadwal) -> HasilHapusMassal:
+        kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_PRATINJAU_HAPUS_MASSAL.format(kondisi=kondisi), param)
+            return HasilHapusMassal(*cur.fetchone())
+    
+    def hapus_jadwal_massal(self, filter_jadwal: FilterJadwal) -> HasilHapusMassal:
+        # Jadwal yang cocok dan semua data turunannya terhapus dalam satu statement
+        kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_HAPUS_JADWAL_MASSAL.format(kondisi=kondisi), param)
+            return HasilHapusMassal(*cur.fetchone())
+    
+    # ---- Hasil panen ----
+    
+    def jadwal_siap_panen(self) -> List[JadwalSiapPanen]:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_JADWAL_SIAP_PANEN, (STATUS_SIAP_PANEN,))
+            return [JadwalSiapPanen(*row) for row in cur.fetchall()]
+    
+    def input_hasil_panen(self, data: HasilPanenInput) -> HasilPanen:
+        return self.input_hasil_panen_massal([data])[0]
+    
+    def input_hasil_panen_massal(self, data: List[HasilPanenInput]) -> List[HasilPanen]:
+        # Semua baris dicatat atau tidak sama sekali, dalam satu panggilan fungsi
+        if not data:
+            return []
+        _validasi_hasil_panen(data)
+        with self._transaksi() as cur:
+            try:
+                cur.execute(QUERY_CATAT_HASIL_PANEN_MASSAL, _param_hasil_panen(data))
+            except psycopg2.Error as e:
+                raise _error_fungsi_panen(e.pgcode, e.diag.message_primary or str(e)) from e
+            return [HasilPanen(*row) for row in cur.fetchall()]
+    
+    # ---- Jadwal pemupukan ----
+    
+    def _iter_baris(self, query: str, param=None, ukuran_batch: int = UKURAN_HALAMAN_JADWAL) -> Iterator[Tuple]:
+        # Server-side cursor: baris mengalir dari PostgreSQL per batch, tidak dimuat sekaligus
+        with self._transaksi(nama_cursor=f"iter_{uuid.uuid4().hex[:12]}", baca=True) as cur:
+            cur.itersize = ukuran_batch
+            cur.execute(query, param)
+            yield from cur
+    
+    def iter_jadwal(self, id_terakhir: int = 0, ukuran_batch: int = UKURAN_HALAMAN_JADWAL) -> Iterator[Tuple]:
+        return self._iter_baris(QUERY_LIHAT_JADWAL, (id_terakhir,), ukuran_batch)
+    
+    def iter_jadwal_pemupukan(self) -> Iterator[Tuple]:
+        return self._iter_baris(QUERY_LIHAT_PEMUPUKAN)
+    
+    def lihat_jadwal_pemupukan(self) -> List[JadwalPemupukan]:
+        with self._transaksi(baca=True) as cur:
+            cur.execute(QUERY_LIHAT_PEMUPUKAN)
+            return [JadwalPemupukan(*row) for row in cur.fetchall()]
+    
+    def ambil_jadwal_pemupukan(self, id_kegiatan: int) -> KegiatanPemupukan:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_AMBIL_PEMUPUKAN, (id_kegiatan,))
+            row = cur.fetchone()
+        if row is None:
+            raise DataTidakDitemukan(f"ID kegiatan {id_kegiatan} tidak ditemukan!")
+        return KegiatanPemupukan(*row)
+    
+    def tambah_jadwal_pemupukan(self, data: JadwalPemupukanInput) -> KegiatanPemupukan:
+        if data.jenis not in ("Pupuk", "Pestisida"):
+            raise ValidasiGagal("Jenis harus 'Pupuk' atau 'Pestisida'!")
+        if data.interval_hari <= 0:
+            raise ValidasiGagal("Interval hari harus lebih dari 0!")
+        if data.dosis_per_bibit <= 0:
+            raise ValidasiGagal("Dosis harus lebih dari 0!")
+        # Hitung tanggal pemupukan berdasarkan interval hari dari tanggal sekarang
+        tanggal_pemupukan = datetime.date.today() + datetime.timedelta(days=data.interval_hari)
+        with self._transaksi() as cur:
+            self._validasi_referensi(cur, id_tanaman=data.id_tanaman)
+            cur.execute(QUERY_TAMBAH_PEMUPUKAN, (data.nama_kegiatan, tanggal_pemupukan, data.dosis_per_bibit, data.id_tanaman))
+            kegiatan = KegiatanPemupukan(*cur.fetchone())
+            cur.execute(QUERY_TAMBAH_STOK, (data.nama_pupuk, data.jenis, kegiatan.id_kegiatan))
+        return kegiatan
+    
+    def ubah_jadwal_pemupukan(self, perubahan: PerubahanJadwalPemupukan) -> KegiatanPemupukan:
+        return self.terapkan_patch(pemupukan=[perubahan]).jadwal_pemupukan[0]
+    
+    def hapus_jadwal_pemupukan(self, id_kegiatan: int):
+        with self._transaksi() as cur:
+            cur.execute(QUERY_HAPUS_PUPUK_PESTISIDA_KEGIATAN, (id_kegiatan,))
+            cur.execute(QUERY_HAPUS_PEMUPUKAN, (id_kegiatan,))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"ID kegiatan {id_kegiatan} tidak ditemukan!")
+    
+    def daftar_id_kegiatan(self) -> List[int]:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_DAFTAR_ID_KEGIATAN)
+            return [row[0] for row in cur.fetchall()]
+    
+    def buat_kalender_pemupukan(self, rencana: RencanaPemupukanInput) -> HasilKalenderPemupukan:
+        if rencana.jenis not in ("Pupuk", "Pestisida"):
+            raise ValidasiGagal("Jenis harus 'Pupuk' atau 'Pestisida'!")
+        if rencana.interval_hari <= 0:
+            raise ValidasiGagal("Interval hari harus lebih dari 0!")
+        if not 1 <= rencana.jumlah_kejadian <= MAKS_KEJADIAN_PEMUPUKAN:
+            raise ValidasiGagal(f"Jumlah kejadian harus antara 1 dan {MAKS_KEJADIAN_PEMUPUKAN}!")
+        if rencana.dosis_per_bibit <= 0:
+            raise ValidasiGagal("Dosis harus lebih dari 0!")
+        if not rencana.id_jadwal_tanam:
+            raise ValidasiGagal("Minimal satu ID jadwal tanam harus diisi")
+        with self._transaksi() as cur:
+            cur.execute(QUERY_JADWAL_UNTUK_KALENDER, (list(set(rencana.id_jadwal_tanam)),))
+            jadwal = cur.fetchall()
+            tidak_ada = sorted(set(rencana.id_jadwal_tanam) - {row[0] for row in jadwal})
+            if tidak_ada:
+                raise DataTidakDitemukan(f"Jadwal tanam ID {', '.join(map(str, tidak_ada))} tidak ditemukan!")
+            kejadian = bangun_kalender_pemupukan(rencana, jadwal)
+            # Seluruh kejadian dan stok terkaitnya masuk dengan dua multi-row INSERT
+            id_kegiatan = [row[0] for row in execute_values(
+                cur, QUERY_TAMBAH_KALENDER_PEMUPUKAN, kejadian, page_size=1000, fetch=True)]
+            execute_values(cur, "INSERT INTO Pupuk_Pestisida (nama_barang, jenis, id_kegiatan) VALUES %s;",
+                           [(rencana.nama_pupuk, rencana.jenis, i) for i in id_kegiatan], page_size=1000)
+        tanggal = [k[1] for k in kejadian]
+        return HasilKalenderPemupukan(len(kejadian), min(tanggal), max(tanggal))
+    
+    def pemupukan_jatuh_tempo(self, hari: int = 7, mulai: Optional[datetime.date] = None) -> List[PemupukanJatuhTempo]:
+        if hari < 0:
+            raise ValidasiGagal("Jumlah hari tidak boleh negatif!")
+        mulai = mulai or datetime.date.today()
+        with self._transaksi() as cur:
+            cur.execute(QUERY_PEMUPUKAN_JATUH_TEMPO, (mulai, mulai + datetime.timedelta(days=hari)))
+            return [PemupukanJatuhTempo(*row) for row in cur.fetchall()]
+    
+    # ---- Stok pupuk/pestisida ----
+    
+    def iter_stok(self) -> Iterator[Tuple]:
+        return self._iter_baris(QUERY_LIHAT_STOK)
+    
+    def lihat_stok(self) -> List[Stok]:
+        with self._transaksi(baca=True) as cur:
+            cur.execute(QUERY_LIHAT_STOK)
+            return [Stok(*row) for row in cur.fetchall()]
+    
+    def ambil_stok(self, id_pupukpestisida: int) -> Stok:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_AMBIL_STOK, (id_pupukpestisida,))
+            row = cur.fetchone()
+        if row is None:
+            raise DataTidakDitemukan(f"ID stok {id_pupukpestisida} tidak ditemukan!")
+        return Stok(*row)
+    
+    def tambah_stok(self, data: StokInput) -> Stok:
+        if data.jenis not in ("Pupuk", "Pestisida"):
+            raise ValidasiGagal("Jenis harus 'Pupuk' atau 'Pestisida'!")
+        with self._transaksi() as cur:
+            cur.execute(QUERY_CEK_KEGIATAN, (data.id_kegiatan,))
+            if cur.fetchone() is None:
+                raise ValidasiGagal(f"ID kegiatan {data.id_kegiatan} tidak valid!")
+            cur.execute(QUERY_TAMBAH_STOK, (data.nama_barang, data.jenis, data.id_kegiatan))
+            return Stok(*cur.fetchone())
+    
+    def hapus_stok(self, id_pupukpestisida: int):
+        with self._transaksi() as cur:
+            cur.execute(QUERY_HAPUS_STOK, (id_pupukpestisida,))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"ID stok {id_pupukpestisida} tidak ditemukan!")
+    
+    # ---- Buku besar stok ----
+    
+    def daftar_saldo_stok(self, hanya_menipis: bool = False) -> List[SaldoStok]:
+        # Saldo dibaca dari saldo_stok (dijaga trigger), bukan dijumlah dari mutasi_stok
+        with self._transaksi(baca=True) as cur:
+            cur.execute(QUERY_SALDO_STOK, (hanya_menipis,))
+            return [SaldoStok(*row) for row in cur.fetchall()]
+    
+    def atur_stok_minimum(self, id_barang: int, stok_minimum: float):
+        if stok_minimum < 0:
+            raise ValidasiGagal("Stok minimum tidak boleh negatif!")
+        with self._transaksi() as cur:
+            cur.execute("UPDATE barang_stok SET stok_minimum = %s WHERE id_barang = %s;", (stok_minimum, id_barang))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"ID barang {id_barang} tidak ditemukan!")
+    
+    def catat_mutasi_stok(self, data: MutasiStokInput) -> MutasiStok:
+        if data.jenis_mutasi not in JENIS_MUTASI_STOK:
+            raise ValidasiGagal(f"Jenis mutasi harus salah satu dari: {', '.join(JENIS_MUTASI_STOK)}")
+        if data.jumlah == 0 or (data.jenis_mutasi != "koreksi" and data.jumlah < 0):
+            raise ValidasiGagal("Jumlah harus lebih dari 0 (koreksi boleh negatif, tapi tidak 0)!")
+        jumlah = -data.jumlah if data.jenis_mutasi == "pakai" else data.jumlah
+        with self._transaksi() as cur:
+            cur.execute(QUERY_CEK_BARANG_STOK, (data.id_barang,))
+            if cur.fetchone() is None:
+                raise DataTidakDitemukan(f"ID barang {data.id_barang} tidak ditemukan!")
+            cur.execute(QUERY_TAMBAH_MUTASI_STOK, (data.id_barang, data.tanggal or datetime.date.today(),
+                                                   data.jenis_mutasi, jumlah, data.keterangan))
+            return MutasiStok(*cur.fetchone())
+    
+    def riwayat_mutasi_stok(self, id_barang: int, batas: int = 50) -> List[MutasiStok]:
+        with self._transaksi() as cur:
+            cur.execute(QUERY_RIWAYAT_MUTASI_STOK, (id_barang, batas))
+            return [MutasiStok(*row) for row in cur.fetchall()]
+    
+    def catat_pemakaian_terjadwal(self, sampai: Optional[datetime.date] = None, penuh: bool = False,
+                                  mundur_hari: int = 30) -> int:
+        # Pemakaian kegiatan yang sudah lewat tanggalnya dibukukan ke mutasi_stok; jendela
+        # mundur_hari menangkap kegiatan yang baru dimasukkan dengan tanggal lampau
+        sampai = sampai or datetime.date.today()
+        dari = datetime.date.min if penuh else sampai - datetime.timedelta(days=mundur_hari)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_CATAT_PEMAKAIAN_TERJADWAL, {"luas_m2": LUAS_LAHAN_M2, "dari": dari, "sampai": sampai})
+            return cur.rowcount
+    
+    def proyeksi_kekurangan_stok(self, hari: int = 30, semua: bool = False) -> List[KekuranganStok]:
+        if hari < 0:
+            raise ValidasiGagal("Jumlah hari tidak boleh negatif!")
+        kemarin = datetime.date.today() - datetime.timedelta(days=1)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_PROYEKSI_KEKURANGAN_STOK, {
+                "luas_m2": LUAS_LAHAN_M2, "dari": kemarin, "sampai": kemarin + datetime.timedelta(days=hari + 1),
+                "semua": semua,
+            })
+            return [KekuranganStok(*row) for row in cur.fetchall()]
+    
+    # ---- Status otomatis ----
+    
+    def perbarui_status_jadwal(self, hari_ini: Optional[datetime.date] = None, penuh: bool = False) -> Dict[str, Any]:
+        # Lanjut dari tanggal 'sampai' run terakhir; penuh=True memeriksa semua jadwal
+        # (misal setelah jadwal dengan tanggal lampau dimasukkan)
+        hari_ini = hari_ini or datetime.date.today()
+        mulai = time.perf_counter()
+        with self._transaksi() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (MigrasiSkema.KUNCI_ADVISORY + 2,))
+            dari = None
+            if not penuh:
+                cur.execute("SELECT sampai FROM log_status_otomatis ORDER BY id DESC LIMIT 1;")
+                row = cur.fetchone()
+                dari = row[0] if row else None
+            cur.execute(QUERY_PERBARUI_STATUS_JADWAL, {
+                "dari": dari or datetime.date.min, "sampai": hari_ini, "terjadwal": STATUS_TERJADWAL,
+                "berlangsung": STATUS_SEDANG_BERLANGSUNG, "siap_panen": STATUS_SIAP_PANEN,
+            })
+            status_baru = [row[0] for row in cur.fetchall()]
+            hasil = {
+                "dari": dari, "sampai": hari_ini,
+                "jumlah_berlangsung": status_baru.count(STATUS_SEDANG_BERLANGSUNG),
+                "jumlah_siap_panen": status_baru.count(STATUS_SIAP_PANEN),
+                "durasi_ms": round((time.perf_counter() - mulai) * 1000, 1),
+            }
+            cur.execute("""
+            INSERT INTO log_status_otomatis (dari, sampai, jumlah_berlangsung, jumlah_siap_panen, durasi_ms)
+            VALUES (%(dari)s, %(sampai)s, %(jumlah_berlangsung)s, %(jumlah_siap_panen)s, %(durasi_ms)s);
+            """, hasil)
+        return hasil
+    
+    # ---- Analitik panen ----
+    
+    def segarkan_rekap_panen(self) -> int:
+        # Hitung ulang hanya hari yang berubah sejak penyegaran terakhir
+        with self._transaksi() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (MigrasiSkema.KUNCI_ADVISORY + 1,))
+            cur.execute(QUERY_AMBIL_HARI_KOTOR)
+            hari = cur.fetchone()[0]
+            if not hari:
+                return 0
+            bulan = sorted({h.replace(day=1) for h in hari})
+            cur.execute("DELETE FROM rekap_panen_harian WHERE tanggal = ANY(%s);", (hari,))
+            cur.execute(QUERY_REKAP_PANEN_HARIAN, (hari,))
+            cur.execute("DELETE FROM rekap_panen_bulanan WHERE bulan = ANY(%s);", (bulan,))
+            batas_akhir = max(hari).replace(day=1) + datetime.timedelta(days=32)
+            cur.execute(QUERY_REKAP_PANEN_BULANAN, (bulan[0], batas_akhir.replace(day=1), bulan))
+        return len(hari)
+    
+    def laporan_panen(self, dimensi: str = "tanaman", mulai: Optional[datetime.date] = None,
+                      selesai: Optional[datetime.date] = None, segarkan: bool = True) -> List[BarisLaporanPanen]:
+        if dimensi not in DIMENSI_LAPORAN_PANEN:
+            raise ValidasiGagal(f"Dimensi harus salah satu dari: {', '.join(DIMENSI_LAPORAN_PANEN)}")
+        if mulai and selesai and mulai > selesai:
+            raise ValidasiGagal("Tanggal mulai harus sebelum tanggal selesai!")
+        if segarkan:
+            self.segarkan_rekap_panen()
+        # Rentang yang pas per bulan cukup dibaca dari rekap bulanan
+        per_bulan = (mulai is None or mulai.day == 1) and (
+            selesai is None or (selesai + datetime.timedelta(days=1)).day == 1)
+        tabel, periode = ("rekap_panen_bulanan", "bulan") if per_bulan else ("rekap_panen_harian", "tanggal")
+        kunci, label, join, urut = DIMENSI_LAPORAN_PANEN[dimensi](periode)
+        query = QUERY_LAPORAN_PANEN.format(kunci=kunci, label=label, join=join, urut=urut, tabel=tabel,
+                                           periode=periode)
+        with self._transaksi() as cur:
+            cur.execute(query, (mulai or datetime.date.min, selesai or datetime.date.max))
+            return [BarisLaporanPanen(*row) for row in cur.fetchall()]
+    
+    # ---- Laporan masalah ----
+    
+    def siapkan_tabel_laporan(self):
+        with self._transaksi() as cur:
+            cur.execute(QUERY_BUAT_TABEL_LAPORAN)
+    
+    def lihat_laporan(self) -> List[LaporanMasalah]:
+        with self._transaksi(baca=True) as cur:
+            cur.execute(QUERY_LIHAT_LAPORAN)
+            return [LaporanMasalah(*row) for row in cur.fetchall()]
+    
+    def cari_laporan(self, filter_laporan: FilterLaporan) -> HalamanLaporan:
+        query, param = _query_cari_laporan(filter_laporan)
+        with self._transaksi(baca=True) as cur:
+            cur.execute(query, param)
+            rows = cur.fetchall()
+        # Satu baris ekstra diambil hanya untuk mengetahui apakah ada halaman berikutnya
+        ukuran = filter_laporan.ukuran_halaman
+        return HalamanLaporan([HasilCariLaporan(*row) for row in rows[:ukuran]], filter_laporan.halaman,
+                              len(rows) > ukuran)
+    
+    def tambah_laporan(self, data: LaporanMasalahInput) -> LaporanMasalah:
+        self._validasi_status_penanganan(data.status_penanganan)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_TAMBAH_LAPORAN, (data.id_jadwal_tanam, data.tanggal_masalah, data.jenis, data.deskripsi,
+                  data.status_penanganan, data.solusi))
+            return LaporanMasalah(cur.fetchone()[0], **asdict(data))
+    
+    def edit_laporan(self, id_laporan: int, data: LaporanMasalahInput) -> LaporanMasalah:
+        self._validasi_status_penanganan(data.status_penanganan)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_EDIT_LAPORAN, (data.id_jadwal_tanam, data.tanggal_masalah, data.jenis, data.deskripsi,
+                  data.status_penanganan, data.solusi, id_laporan))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
+        return LaporanMasalah(id_laporan, **asdict(data))
+    
+    def hapus_laporan(self, id_laporan: int):
+        with self._transaksi() as cur:
+            cur.execute(QUERY_HAPUS_LAPORAN, (id_laporan,))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
+    
+    def update_status_solusi(self, id_laporan: int, status_penanganan: str, solusi: Optional[str]):
+        self._validasi_status_penanganan(status_penanganan)
+        with self._transaksi() as cur:
+            cur.execute(QUERY_UPDATE_STATUS_LAPORAN, (status_penanganan, solusi, id_laporan))
+            if cur.rowcount == 0:
+                raise DataTidakDitemukan(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
+    
+    def _validasi_status_penanganan(self, status_penanganan: str):
+        if status_penanganan not in STATUS_PENANGANAN:
+            raise ValidasiGagal("Status penanganan harus salah satu dari: Belum, Proses, Selesai")
+
+def _validasi_hasil_panen(data: List[HasilPanenInput]):
+    for d in data:
+        if d.jumlah_panen_kg <= 0:
+            raise ValidasiGagal("Jumlah panen harus lebih dari 0!")
+        if d.harga_per_kg <= 0:
+            raise ValidasiGagal("Harga harus lebih dari 0!")
+
+def _param_hasil_panen(data: List[HasilPanenInput]) -> Tuple:
+    return ([d.id_jadwal_tanam for d in data], [d.tanggal for d in data],
+            [d.jumlah_panen_kg for d in data], [d.harga_per_kg for d in data], STATUS_SIAP_PANEN, ID_KEGIATAN_DEFAULT)
+
+def _error_fungsi_panen(pgcode: Optional[str], pesan: str) -> Exception:
+    # RAISE di catat_hasil_panen_massal memakai SQLSTATE no_data_found / invalid_parameter_value
+    if pgcode == "P0002":
+        return DataTidakDitemukan(pesan)
+    if pgcode == "22023":
+        return ValidasiGagal(pesan)
+    return SipataniError(pesan)
+
+@functools.lru_cache(maxsize=None)
+def sql_asyncpg(query: str) -> str:
+    # asyncpg memakai placeholder $1, $2, ... sedangkan query bersama ditulis dengan %s (psycopg2)
+    nomor = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda m: f"${next(nomor)}", query)
+
+def _jumlah_baris(status: str) -> int:
+    # Status perintah asyncpg berbentuk "DELETE 3" / "UPDATE 1"
+    return int(status.split()[-1])
+
+ERROR_DATABASE_ASYNC = (asyncpg.PostgresError, asyncpg.InterfaceError) if asyncpg else ()
+
+class AsyncSipataniBackend:
+    # Padanan asyncio dari SipataniService untuk jadwal tanam, pemupukan dan stok.
+    # Tiap operasi meminjam koneksi sendiri dari pool asyncpg, jadi operasi yang
+    # saling lepas bisa berjalan bersamaan (asyncio.gather) dalam satu proses.
+    def __init__(self, min_size: int = POOL_MIN_KONEKSI, max_size: int = POOL_MAX_KONEKSI,
+                 cache: Optional[ReferensiCache] = None, **config):
+        if asyncpg is None:
+            raise SipataniError("Library asyncpg belum terinstall: pip install asyncpg")
+        self.config = {**DB_CONFIG, **config}
+        self.min_size = min_size
+        self.max_size = max_size
+        self.cache = cache or ReferensiCache(ttl=0)
+        self.pool = None
+    
+    async def buka(self) -> "AsyncSipataniBackend":
+        if self.pool is None:
+            self.pool = await asyncpg.create_pool(
+                host=self.config["host"], port=int(self.config["port"]), user=self.config["user"],
+                password=self.config["password"], database=self.config["dbname"],
+                min_size=self.min_size, max_size=self.max_size,
+            )
+        return self
+    
+    async def tutup(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+    
+    async def __aenter__(self) -> "AsyncSipataniBackend":
+        return await self.buka()
+    
+    async def __aexit__(self, *exc):
+        await self.tutup()
+    
+    async def _fetch(self, query: str, *args) -> list:
+        async with self.pool.acquire() as conn:
+            return await conn.fetch(sql_asyncpg(query), *args)
+    
+    async def _fetchrow(self, query: str, *args):
+        async with self.pool.acquire() as conn:
+            return await conn.fetchrow(sql_asyncpg(query), *args)
+    
+    # ---- Referensi ----
+    
+    async def _referensi(self, nama: str) -> Dict[int, Dict[str, Any]]:
+        data = self.cache.segar(nama)
+        if data is None:
+            data = self.cache.isi(nama, await self._fetch(ReferensiCache.QUERY[nama][0]))
+        return data
+    
+    async def daftar_tanaman(self) -> List[Dict[str, Any]]:
+        return list((await self._referensi("tanaman")).values())
+    
+    async def daftar_lahan(self) -> List[Dict[str, Any]]:
+        return list((await self._referensi("lahan")).values())
+    
+    async def daftar_status_jadwal(self) -> List[Dict[str, Any]]:
+        return list((await self._referensi("status_jadwal")).values())
+    
+    async def referensi(self) -> Dict[str, List[Dict[str, Any]]]:
+        # Ketiga daftar referensi dimuat bersamaan
+        tanaman, lahan, status = await asyncio.gather(
+            self.daftar_tanaman(), self.daftar_lahan(), self.daftar_status_jadwal())
+        return {"tanaman": tanaman, "lahan": lahan, "status_jadwal": status}
+    
+    async def _validasi_referensi(self, id_lahan: Optional[int] = None, id_tanaman: Optional[int] = None,
+                                  status_jadwal_id: Optional[int] = None):
+        lahan, tanaman, status = await asyncio.gather(
+            self._referensi("lahan"), self._referensi("tanaman"), self._referensi("status_jadwal"))
+        if id_lahan is not None and id_lahan not in lahan:
+            raise ValidasiGagal(f"ID lahan {id_lahan} tidak valid!")
+        if id_tanaman is not None and id_tanaman not in tanaman:
+            raise ValidasiGagal(f"ID tanaman {id_tanaman} tidak valid!")
+        if status_jadwal_id is not None and status_jadwal_id not in status:
+            raise ValidasiGagal(f"Status jadwal {status_jadwal_id} tidak valid!")
+    
+    # ---- Jadwal tanam ----
+    
+    async def lihat_jadwal(self, id_terakhir: int = 0, ukuran_halaman: int = UKURAN_HALAMAN_JADWAL) -> HalamanJadwal:
+        rows = await self._fetch(QUERY_LIHAT_JADWAL_HALAMAN, id_terakhir, ukuran_halaman)
+        data = [JadwalTanamDetail(*row) for row in rows]
+        id_berikutnya = data[-1].id_jadwal_tanam if len(data) == ukuran_halaman else None
+        return HalamanJadwal(data, id_berikutnya)
+    
+    async def ambil_jadwal(self, id_jadwal_tanam: int) -> JadwalTanam:
+        row = await self._fetchrow(QUERY_AMBIL_JADWAL, id_jadwal_tanam)
+        if row is None:
+            raise DataTidakDitemukan(f"Jadwal tanam ID {id_jadwal_tanam} tidak ditemukan!")
+        return JadwalTanam(*row)
+    
+    async def tambah_jadwal(self, data: JadwalTanamInput) -> JadwalTanam:
+        await self._validasi_referensi(data.id_lahan, data.id_tanaman, data.status_jadwal_id)
+        row = await self._fetchrow(QUERY_TAMBAH_JADWAL, data.tanggal, data.id_lahan, data.id_tanaman, data.status_jadwal_id)
+        return JadwalTanam(*row)
+    
+    async def edit_jadwal(self, perubahan: PerubahanJadwal) -> JadwalTanam:
+        kolom = {nama: getattr(perubahan, nama) for nama in KOLOM_EDIT_JADWAL if getattr(perubahan, nama) is not None}
+        if not kolom:
+            raise ValidasiGagal("Tidak ada perubahan yang diberikan")
+        await self._validasi_referensi(perubahan.id_lahan, perubahan.id_tanaman, perubahan.status_jadwal_id)
+        row = await self._patch_satu(
+            QUERY_PATCH_JADWAL, TEMPLATE_PATCH_JADWAL,
+            (perubahan.id_jadwal_tanam, perubahan.tanggal, perubahan.id_lahan, perubahan.id_tanaman,
+             perubahan.status_jadwal_id, perubahan.versi),
+            QUERY_AMBIL_JADWAL, "Jadwal tanam ID")
+        return JadwalTanam(*row)
+    
+    async def _patch_satu(self, query: str, template: str, baris: Tuple, query_ambil: str, label: str):
+        # Statement yang sama dengan SipataniService.terapkan_patch, termasuk cek versi (xmin)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                row = await conn.fetchrow(sql_asyncpg(query.replace("(VALUES %s)", f"(VALUES {template})")), *baris)
+                if row is None:
+                    if await conn.fetchrow(sql_asyncpg(query_ambil), baris[0]) is None:
+                        raise DataTidakDitemukan(f"{label} {baris[0]} tidak ditemukan!")
+                    raise KonflikVersi(f"{label} {baris[0]} sudah diubah pengguna lain, muat ulang lalu coba lagi")
+        return row
+    
+    async def hitung_data_terkait(self, id_jadwal_tanam: int) -> Dict[str, int]:
+        hasil_panen, masalah_tanam, laporan_masalah = await self._fetchrow(
+            QUERY_HITUNG_DATA_TERKAIT, *(id_jadwal_tanam,) * 3)
+        return {"hasil_panen": hasil_panen, "masalah_tanam": masalah_tanam, "laporan_masalah": laporan_masalah}
+    
+    async def pratinjau_hapus_jadwal(self, id_jadwal_tanam: int) -> Tuple[JadwalTanam, Dict[str, int], Dict[str, List[Dict[str, Any]]]]:
+        # Konfirmasi hapus: jadwal, jumlah data terkait dan daftar referensi dimuat bersamaan
+        return await asyncio.gather(
+            self.ambil_jadwal(id_jadwal_tanam), self.hitung_data_terkait(id_jadwal_tanam), self.referensi())
+    
+    async def hapus_jadwal(self, id_jadwal_tanam: int) -> HasilHapusJadwal:
+        hasil = await self.hapus_jadwal_massal(FilterJadwal(id_jadwal_tanam=[id_jadwal_tanam]))
+        if hasil.jadwal_tanam == 0:
+            raise DataTidakDitemukan(f"Jadwal tanam ID {id_jadwal_tanam} tidak ditemukan!")
+        return HasilHapusJadwal(id_jadwal_tanam, hasil.hasil_panen, hasil.masalah_tanam, hasil.laporan_masalah)
+    
+    async def pratinjau_hapus_massal(self, filter_jadwal: FilterJadwal) -> HasilHapusMassal:
+        kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+        return HasilHapusMassal(*await self._fetchrow(QUERY_PRATINJAU_HAPUS_MASSAL.format(kondisi=kondisi), *param))
+    
+    async def hapus_jadwal_massal(self, filter_jadwal: FilterJadwal) -> HasilHapusMassal:
+        kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+        return HasilHapusMassal(*await self._fetchrow(QUERY_HAPUS_JADWAL_MASSAL.format(kondisi=kondisi), *param))
+    
+    # ---- Hasil panen ----
+    
+    async def jadwal_siap_panen(self) -> List[JadwalSiapPanen]:
+        return [JadwalSiapPanen(*row) for row in await self._fetch(QUERY_JADWAL_SIAP_PANEN, STATUS_SIAP_PANEN)]
+    
+    async def input_hasil_panen(self, data: HasilPanenInput) -> HasilPanen:
+        return (await self.input_hasil_panen_massal([data]))[0]
+    
+    async def input_hasil_panen_massal(self, data: List[HasilPanenInput]) -> List[HasilPanen]:
+        if not data:
+            return []
+        _validasi_hasil_panen(data)
+        try:
+            rows = await self._fetch(QUERY_CATAT_HASIL_PANEN_MASSAL, *_param_hasil_panen(data))
+        except asyncpg.PostgresError as e:
+            raise _error_fungsi_panen(e.sqlstate, e.message) from e
+        return [HasilPanen(*row) for row in rows]
+    
+    # ---- Jadwal pemupukan ----
+    
+    async def lihat_jadwal_pemupukan(self) -> List[JadwalPemupukan]:
+        return [JadwalPemupukan(*row) for row in await self._fetch(QUERY_LIHAT_PEMUPUKAN)]
+    
+    async def ambil_jadwal_pemupukan(self, id_kegiatan: int) -> KegiatanPemupukan:
+        row = await self._fetchrow(QUERY_AMBIL_PEMUPUKAN, id_kegiatan)
+        if row is None:
+            raise DataTidakDitemukan(f"ID kegiatan {id_kegiatan} tidak ditemukan!")
+        return KegiatanPemupukan(*row)
+    
+    async def tambah_jadwal_pemupukan(self, data: JadwalPemupukanInput) -> KegiatanPemupukan:
+        if data.jenis not in ("Pupuk", "Pestisida"):
+            raise ValidasiGagal("Jenis harus 'Pupuk' atau 'Pestisida'!")
+        if data.interval_hari <= 0:
+            raise ValidasiGagal("Interval hari harus lebih dari 0!")
+        if data.dosis_per_bibit <= 0:
+            raise ValidasiGagal("Dosis harus lebih dari 0!")
+        tanggal_pemupukan = datetime.date.today() + datetime.timedelta(days=data.interval_hari)
+        await self._validasi_referensi(id_tanaman=data.id_tanaman)
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                kegiatan = KegiatanPemupukan(*await conn.fetchrow(
+                    sql_asyncpg(QUERY_TAMBAH_PEMUPUKAN), data.nama_kegiatan, tanggal_pemupukan, data.dosis_per_bibit, data.id_tanaman))
+                await conn.execute(sql_asyncpg(QUERY_TAMBAH_STOK), data.nama_pupuk, data.jenis, kegiatan.id_kegiatan)
+        return kegiatan
+    
+    async def ubah_jadwal_pemupukan(self, perubahan: PerubahanJadwalPemupukan) -> KegiatanPemupukan:
+        if perubahan.tanggal_pemupukan is None and perubahan.dosis_per_bibit is None:
+            raise ValidasiGagal("Tidak ada perubahan yang diberikan")
+        if perubahan.dosis_per_bibit is not None and perubahan.dosis_per_bibit <= 0:
+            raise ValidasiGagal("Dosis per bibit harus lebih dari 0!")
+        row = await self._patch_satu(
+            QUERY_PATCH_PEMUPUKAN, TEMPLATE_PATCH_PEMUPUKAN,
+            (perubahan.id_kegiatan, perubahan.tanggal_pemupukan, perubahan.dosis_per_bibit, perubahan.versi),
+            QUERY_AMBIL_PEMUPUKAN, "ID kegiatan")
+        return KegiatanPemupukan(*row)
+    
+    async def hapus_jadwal_pemupukan(self, id_kegiatan: int):
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(sql_asyncpg(QUERY_HAPUS_PUPUK_PESTISIDA_KEGIATAN), id_kegiatan)
+                if _jumlah_baris(await conn.execute(sql_asyncpg(QUERY_HAPUS_PEMUPUKAN), id_kegiatan)) == 0:
+                    raise DataTidakDitemukan(f"ID kegiatan {id_kegiatan} tidak ditemukan!")
+    
+    async def daftar_id_kegiatan(self) -> List[int]:
+        return [row[0] for row in await self._fetch(QUERY_DAFTAR_ID_KEGIATAN)]
+    
+    # ---- Stok pupuk/pestisida ----
+    
+    async def lihat_stok(self) -> List[Stok]:
+        return [Stok(*row) for row in await self._fetch(QUERY_LIHAT_STOK)]
+    
+    async def ambil_stok(self, id_pupukpestisida: int) -> Stok:
+        row = await self._fetchrow(QUERY_AMBIL_STOK, id_pupukpestisida)
+        if row is None:
+            raise DataTidakDitemukan(f"ID stok {id_pupukpestisida} tidak ditemukan!")
+        return Stok(*row)
+    
+    async def tambah_stok(self, data: StokInput) -> Stok:
+        if data.jenis not in ("Pupuk", "Pestisida"):
+            raise ValidasiGagal("Jenis harus 'Pupuk' atau 'Pestisida'!")
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if await conn.fetchrow(sql_asyncpg(QUERY_CEK_KEGIATAN), data.id_kegiatan) is None:
+                    raise ValidasiGagal(f"ID kegiatan {data.id_kegiatan} tidak valid!")
+                return Stok(*await conn.fetchrow(sql_asyncpg(QUERY_TAMBAH_STOK), data.nama_barang, data.jenis, data.id_kegiatan))
+    
+    async def hapus_stok(self, id_pupukpestisida: int):
+        async with self.pool.acquire() as conn:
+            if _jumlah_baris(await conn.execute(sql_asyncpg(QUERY_HAPUS_STOK), id_pupukpestisida)) == 0:
+                raise DataTidakDitemukan(f"ID stok {id_pupukpestisida} tidak ditemukan!")
+
+class TabelBertahap:
+    # Pengganti tabulate(tablefmt="grid") untuk listing besar: lebar kolom diambil dari sampel
+    # baris pertama, lalu setiap baris langsung ditulis begitu keluar dari cursor
+    def __init__(self, headers: List[str], lebar: Optional[List[int]] = None, sampel: int = 100,
+                 lebar_maks: int = 40, pager: Optional[bool] = None, output=None):
+        self.headers = headers
+        self.lebar = lebar
+        self.sampel = sampel
+        self.lebar_maks = lebar_maks
+        self.output = output or sys.stdout
+        # Pager hanya aktif jika input dan output sama-sama terminal
+        self.pager = (self.output.isatty() and sys.stdin.isatty()) if pager is None else pager
+    
+    @staticmethod
+    def _teks(nilai) -> str:
+        return "" if nilai is None else str(nilai).replace("\n", " ")
+    
+    def _hitung_lebar(self, sampel_baris: List[Sequence]) -> List[int]:
+        lebar = [len(h) for h in self.headers]
+        for baris in sampel_baris:
+            for i, nilai in enumerate(baris):
+                lebar[i] = max(lebar[i], len(self._teks(nilai)))
+        return [min(l, self.lebar_maks) for l in lebar]
+    
+    def _sel(self, nilai, lebar: int) -> str:
+        teks = self._teks(nilai)
+        if len(teks) > lebar:
+            teks = teks[:lebar - 1] + "…"
+        # Angka rata kanan seperti tabulate
+        if isinstance(nilai, (int, float, Decimal)) and not isinstance(nilai, bool):
+            return teks.rjust(lebar)
+        return teks.ljust(lebar)
+    
+    def _baris(self, nilai: Sequence, lebar: List[int]) -> str:
+        return "| " + " | ".join(self._sel(v, l) for v, l in zip(nilai, lebar)) + " |\n"
+    
+    def render(self, rows: Iterable[Sequence]) -> int:
+        rows = iter(rows)
+        sampel = list(itertools.islice(rows, self.sampel))
+        if not sampel:
+            return 0
+        lebar = self.lebar or self._hitung_lebar(sampel)
+        garis = "+" + "+".join("-" * (l + 2) for l in lebar) + "+\n"
+        self.output.write(garis + self._baris(self.headers, lebar) + garis.replace("-", "="))
+        
+        tinggi_layar = max(shutil.get_terminal_size().lines - 2, 5)
+        total = 0
+        try:
+            for baris in itertools.chain(sampel, rows):
+                self.output.write(self._baris(baris, lebar))
+                total += 1
+                if self.pager and total % tinggi_layar == 0:
+                    self.output.flush()
+                    if input("-- Enter untuk lanjut, 'q' untuk berhenti --").strip().lower() == "q":
+                        break
+        finally:
+            self.output.write(garis)
+            self.output.flush()
+        return total
 
 class JadwalTanamManager:
-    def __init__(self, db: SipataniDatabase):
+    def __init__(self, db: SipataniDatabase, cache: Optional[ReferensiCache] = None,
+                 service: Optional[SipataniService] = None):
         self.db = db
+        # Tanpa cache bersama, data referensi selalu dibaca ulang (TTL 0)
+        self.cache = cache or ReferensiCache(ttl=0)
+        self.service = service or SipataniService(db.pool, self.cache)
     
-    def lihat_semua_jadwal(self) -> List[Dict[str, Any]]:
+    def lihat_semua_jadwal(self, ukuran_halaman: int = UKURAN_HALAMAN_JADWAL, interaktif: bool = True) -> int:
         print("Fitur 1.1: Lihat Semua Jadwal dengan jarak tanaman")
         try:
-            query = """
-            SELECT 
-                jt.id_jadwal_tanam,
-                jt.id_lahan,
-                l.id_petani,
-                jt.id_tanaman,
-                t.nama_tanaman,
-                t.jarak_antar_tanaman,
-                l.jumlah_pegawai,
-                jt.tanggal as tanggal_tanam,
-                t.durasi_tanam,
-                s.status as status_jadwal
-            FROM Jadwal_Tanam jt
-            JOIN Lahan l ON jt.id_lahan = l.id_lahan
-            JOIN Tanaman t ON jt.id_tanaman = t.id_tanaman
-            JOIN Status_Jadwal s ON jt.status_jadwal_id = s.id_status_jadwal
-            ORDER BY jt.id_jadwal_tanam;
-            """
-            
-            self.db.cursor.execute(query)
-            results = self.db.cursor.fetchall()
+            print("\nSEMUA JADWAL TANAM")
+            print("=" * 80)
+            # Baris ditulis per halaman, memori tetap konstan berapapun jumlah jadwal
+            with closing(self.iter_halaman_jadwal(ukuran_halaman=ukuran_halaman)) as halaman_iter:
+                tabel = TabelBertahap(KOLOM_LIHAT_JADWAL, pager=None if interaktif else False)
+                total = tabel.render(itertools.chain.from_iterable(halaman_iter))
             
-            columns = [
-                "ID Jadwal", "ID Lahan", "ID Petani", "ID Tanaman", 
-                "Nama Tanaman", "Jarak Tanaman (cm)", "Jumlah Pegawai", 
-                "Tanggal Tanam", "Durasi (hari)", "Status Jadwal"
-            ]
-            
-            if results:
-                print("\nSEMUA JADWAL TANAM")
-                print("=" * 80)
-                print(tabulate(results, headers=columns, tablefmt="grid"))
-                return [dict(zip([col.lower().replace(' ', '_') for col in columns], row)) for row in results]
-            else:
+            if total == 0:
                 print("Tidak ada jadwal tanam yang ditemukan")
-                return []
+            return total
                 
         except psycopg2.Error as e:
             print(f"Error mengambil data jadwal: {e}")
-            return []
+            self.db.connection.rollback()
+            return 0
+    
+    def iter_halaman_jadwal(self, id_terakhir: int = 0, ukuran_halaman: int = UKURAN_HALAMAN_JADWAL) -> Iterator[List[Tuple]]:
+        # Satu query keyset per halaman, masing-masing transaksi pendek (bisa dari replika baca): selama
+        # pager menunggu input() tidak ada cursor atau transaksi yang tetap terbuka di database
+        while id_terakhir is not None:
+            halaman = self.service.lihat_jadwal(id_terakhir, ukuran_halaman)
+            if halaman.data:
+                yield [astuple(jadwal) for jadwal in halaman.data]
+            id_terakhir = halaman.id_terakhir
     
     def get_tanaman_list(self) -> List[Dict[str, Any]]:
+        return list(self.get_tanaman_map().values())
+    
+    def get_lahan_list(self) -> List[Dict[str, Any]]:
+        return list(self.get_lahan_map().values())
+    
+    def get_tanaman_map(self) -> Dict[int, Dict[str, Any]]:
         print("Ambil daftar tanaman yang tersedia")
         try:
-            query = "SELECT id_tanaman, nama_tanaman, durasi_tanam, jarak_antar_tanaman FROM Tanaman ORDER BY nama_tanaman;"
-            self.db.cursor.execute(query)
-            results = self.db.cursor.fetchall()
-            return [{"id": row[0], "nama": row[1], "durasi": row[2], "jarak": row[3]} for row in results]
+            return self.cache.tanaman(self.db.cursor)
         except psycopg2.Error as e:
             print(f"Error mengambil daftar tanaman: {e}")
-            return []
+            return {}
     
-    def get_lahan_list(self) -> List[Dict[str, Any]]:
+    def get_lahan_map(self) -> Dict[int, Dict[str, Any]]:
         print("Ambil daftar lahan yang tersedia")
         try:
-            query = """
-            SELECT l.id_lahan, l.luas_lahan, l.jumlah_pegawai, p.nama_petani 
-            FROM Lahan l
-            JOIN Petani p ON l.id_petani = p.id_petani
-            ORDER BY l.id_lahan;
-            """
-            self.db.cursor.execute(query)
-            results = self.db.cursor.fetchall()
-            return [{"id": row[0], "luas": row[1], "pegawai": row[2], "petani": row[3]} for row in results]
+            return self.cache.lahan(self.db.cursor)
         except psycopg2.Error as e:
             print(f"Error mengambil daftar lahan: {e}")
-            return []
+            return {}
     
-    def get_next_jadwal_id(self) -> int:
-        print("Ambil ID jadwal tanam berikutnya")
+    def get_status_map(self) -> Dict[int, Dict[str, Any]]:
         try:
-            query = "SELECT COALESCE(MAX(id_jadwal_tanam), 8000) + 1 FROM Jadwal_Tanam;"
-            self.db.cursor.execute(query)
-            result = self.db.cursor.fetchone()
-            return result[0] if result else 8001
+            return self.cache.status_jadwal(self.db.cursor)
         except psycopg2.Error as e:
-            print(f"Error mengambil ID berikutnya: {e}")
-            return 8001
+            print(f"Error mengambil daftar status jadwal: {e}")
+            return {}
     
     def tambah_jadwal_baru(self) -> bool:
         print("Fitur 1.2: Tambah Jadwal Baru")
@@ -135,20 +2691,20 @@ class JadwalTanamManager:
             print("=" * 40)
             
             # Tampilkan daftar tanaman
-            tanaman_list = self.get_tanaman_list()
-            if not tanaman_list:
+            tanaman_map = self.get_tanaman_map()
+            if not tanaman_map:
                 print("Tidak ada data tanaman")
                 return False
             
             print("\nDAFTAR TANAMAN:")
-            for t in tanaman_list:
+            for t in tanaman_map.values():
                 print(f"ID: {t['id']} | {t['nama']} | Durasi: {t['durasi']} hari | Jarak: {t['jarak']} cm")
             
             # Input ID tanaman
             while True:
                 try:
                     id_tanaman = int(input("\nPilih ID Tanaman: "))
-                    tanaman_dipilih = next((t for t in tanaman_list if t['id'] == id_tanaman), None)
+                    tanaman_dipilih = tanaman_map.get(id_tanaman)
                     if tanaman_dipilih:
                         break
                     else:
@@ -157,20 +2713,20 @@ class JadwalTanamManager:
                     print("Masukkan angka yang valid!")
             
             # Tampilkan daftar lahan
-            lahan_list = self.get_lahan_list()
-            if not lahan_list:
+            lahan_map = self.get_lahan_map()
+            if not lahan_map:
                 print("Tidak ada data lahan")
                 return False
             
             print(f"\nDAFTAR LAHAN:")
-            for l in lahan_list:
+            for l in lahan_map.values():
                 print(f"ID: {l['id']} | Luas: {l['luas']} m² | Pegawai: {l['pegawai']} | Petani: {l['petani']}")
             
             # Input ID lahan
             while True:
                 try:
                     id_lahan = int(input("\nPilih ID Lahan: "))
-                    lahan_dipilih = next((l for l in lahan_list if l['id'] == id_lahan), None)
+                    lahan_dipilih = lahan_map.get(id_lahan)
                     if lahan_dipilih:
                         break
                     else:
@@ -185,38 +2741,38 @@ class JadwalTanamManager:
                     tanggal_tanam = datetime.datetime.strptime(tanggal_str, "%Y-%m-%d").date()
                     break
                 except ValueError:
-                    print("Format tanggal salah! Gunakan YYYY-MM-DD")
-            
-            # Generate ID jadwal baru
-            id_jadwal_baru = self.get_next_jadwal_id()
-            
-            # Status default: Terjadwal (993)
-            status_id = 993
-            
-            # Insert ke database
-            query = """
-            INSERT INTO Jadwal_Tanam (id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id)
-            VALUES (%s, %s, %s, %s, %s);
-            """
+                    print("Format tanggal salah! Gunakan YYYY-MM-DD")
             
-            self.db.cursor.execute(query, (id_jadwal_baru, tanggal_tanam, id_lahan, id_tanaman, status_id))
-            self.db.connection.commit()
+            # Status default: Terjadwal (993)
+            jadwal = self.service.tambah_jadwal(JadwalTanamInput(tanggal_tanam, id_lahan, id_tanaman))
             
             print(f"\nJadwal tanam berhasil ditambahkan!")
-            print(f"ID Jadwal: {id_jadwal_baru}")
+            print(f"ID Jadwal: {jadwal.id_jadwal_tanam}")
             print(f"Tanaman: {tanaman_dipilih['nama']}")
-            print(f"Lahan: {id_lahan}")
-            print(f"Tanggal Tanam: {tanggal_tanam}")
+            print(f"Lahan: {jadwal.id_lahan}")
+            print(f"Tanggal Tanam: {jadwal.tanggal}")
             print(f"Durasi: {tanaman_dipilih['durasi']} hari")
             print(f"Jarak Antar Tanaman: {tanaman_dipilih['jarak']} cm")
             
             return True
             
-        except psycopg2.Error as e:
+        except (psycopg2.Error, SipataniError) as e:
             print(f"Error menambah jadwal: {e}")
             self.db.connection.rollback()
             return False
     
+    def _pilih_jadwal(self, prompt: str) -> int:
+        # Ulangi input sampai ID jadwal yang ada di database dimasukkan
+        while True:
+            try:
+                id_jadwal = int(input(prompt))
+                self.service.ambil_jadwal(id_jadwal)
+                return id_jadwal
+            except ValueError:
+                print("Masukkan angka yang valid!")
+            except DataTidakDitemukan:
+                print("ID jadwal tidak ditemukan!")
+    
     def edit_jadwal(self) -> bool:
         print("Fitur 1.3: Edit Jadwal")
         try:
@@ -224,26 +2780,14 @@ class JadwalTanamManager:
             print("=" * 30)
             
             # Tampilkan jadwal yang ada
-            jadwal_list = self.lihat_semua_jadwal()
-            if not jadwal_list:
+            jumlah_jadwal = self.lihat_semua_jadwal()
+            if not jumlah_jadwal:
                 return False
             
             # Pilih jadwal yang akan diedit
-            while True:
-                try:
-                    id_jadwal = int(input("\nMasukkan ID Jadwal yang akan diedit: "))
-                    
-                    # Cek apakah jadwal ada
-                    query = "SELECT * FROM Jadwal_Tanam WHERE id_jadwal_tanam = %s;"
-                    self.db.cursor.execute(query, (id_jadwal,))
-                    jadwal = self.db.cursor.fetchone()
-                    
-                    if jadwal:
-                        break
-                    else:
-                        print("ID jadwal tidak ditemukan!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+            id_jadwal = self._pilih_jadwal("\nMasukkan ID Jadwal yang akan diedit: ")
+            # Versi saat dipilih: edit ditolak jika ada yang mengubah jadwal ini sementara user mengetik
+            versi = self.service.ambil_jadwal(id_jadwal).versi
             
             print(f"\nMengedit jadwal ID: {id_jadwal}")
             print("Pilih yang ingin diedit:")
@@ -260,58 +2804,56 @@ class JadwalTanamManager:
                         tanggal_baru = input("Tanggal baru (YYYY-MM-DD): ")
                         tanggal_obj = datetime.datetime.strptime(tanggal_baru, "%Y-%m-%d").date()
                         
-                        query = "UPDATE Jadwal_Tanam SET tanggal = %s WHERE id_jadwal_tanam = %s;"
-                        self.db.cursor.execute(query, (tanggal_obj, id_jadwal))
-                        self.db.connection.commit()
+                        self.service.edit_jadwal(PerubahanJadwal(id_jadwal, versi=versi, tanggal=tanggal_obj))
                         print("Tanggal berhasil diupdate!")
                         return True
                     except ValueError:
                         print("Format tanggal salah!")
             
             elif pilihan == "2":
-                lahan_list = self.get_lahan_list()
+                lahan_map = self.get_lahan_map()
                 print("\nDAFTAR LAHAN:")
-                for l in lahan_list:
+                for l in lahan_map.values():
                     print(f"ID: {l['id']} | Luas: {l['luas']} m² | Pegawai: {l['pegawai']}")
                 
                 try:
                     id_lahan_baru = int(input("ID Lahan baru: "))
-                    query = "UPDATE Jadwal_Tanam SET id_lahan = %s WHERE id_jadwal_tanam = %s;"
-                    self.db.cursor.execute(query, (id_lahan_baru, id_jadwal))
-                    self.db.connection.commit()
+                    if id_lahan_baru not in lahan_map:
+                        print("ID lahan tidak valid!")
+                        return False
+                    self.service.edit_jadwal(PerubahanJadwal(id_jadwal, versi=versi, id_lahan=id_lahan_baru))
                     print("ID Lahan berhasil diupdate!")
                     return True
                 except ValueError:
                     print("Masukkan angka yang valid!")
             
             elif pilihan == "3":
-                tanaman_list = self.get_tanaman_list()
+                tanaman_map = self.get_tanaman_map()
                 print("\nDAFTAR TANAMAN:")
-                for t in tanaman_list:
+                for t in tanaman_map.values():
                     print(f"ID: {t['id']} | {t['nama']}")
                 
                 try:
                     id_tanaman_baru = int(input("ID Tanaman baru: "))
-                    query = "UPDATE Jadwal_Tanam SET id_tanaman = %s WHERE id_jadwal_tanam = %s;"
-                    self.db.cursor.execute(query, (id_tanaman_baru, id_jadwal))
-                    self.db.connection.commit()
+                    if id_tanaman_baru not in tanaman_map:
+                        print("ID tanaman tidak valid!")
+                        return False
+                    self.service.edit_jadwal(PerubahanJadwal(id_jadwal, versi=versi, id_tanaman=id_tanaman_baru))
                     print("ID Tanaman berhasil diupdate!")
                     return True
                 except ValueError:
                     print("Masukkan angka yang valid!")
             
             elif pilihan == "4":
+                status_map = self.get_status_map()
                 print("\nSTATUS JADWAL:")
-                print("993 - Terjadwal")
-                print("994 - Sedang Berlangsung") 
-                print("995 - Siap Panen")
+                for st in status_map.values():
+                    print(f"{st['id']} - {st['status']}")
                 
                 try:
                     status_baru = int(input("ID Status baru: "))
-                    if status_baru in [993, 994, 995]:
-                        query = "UPDATE Jadwal_Tanam SET status_jadwal_id = %s WHERE id_jadwal_tanam = %s;"
-                        self.db.cursor.execute(query, (status_baru, id_jadwal))
-                        self.db.connection.commit()
+                    if status_baru in status_map:
+                        self.service.edit_jadwal(PerubahanJadwal(id_jadwal, versi=versi, status_jadwal_id=status_baru))
                         print("Status berhasil diupdate!")
                         return True
                     else:
@@ -322,7 +2864,7 @@ class JadwalTanamManager:
             else:
                 print("Pilihan tidak valid!")
                 
-        except psycopg2.Error as e:
+        except (psycopg2.Error, SipataniError) as e:
             print(f"Error mengedit jadwal: {e}")
             self.db.connection.rollback()
             return False
@@ -334,40 +2876,18 @@ class JadwalTanamManager:
             print("=" * 30)
             
             # Tampilkan jadwal yang ada
-            jadwal_list = self.lihat_semua_jadwal()
-            if not jadwal_list:
+            jumlah_jadwal = self.lihat_semua_jadwal()
+            if not jumlah_jadwal:
                 return False
             
-            while True:
-                try:
-                    id_jadwal = int(input("\nMasukkan ID Jadwal yang akan dihapus: "))
-                    
-                    # Cek apakah jadwal ada
-                    query = "SELECT * FROM Jadwal_Tanam WHERE id_jadwal_tanam = %s;"
-                    self.db.cursor.execute(query, (id_jadwal,))
-                    jadwal = self.db.cursor.fetchone()
-                    
-                    if jadwal:
-                        break
-                    else:
-                        print("ID jadwal tidak ditemukan!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+            id_jadwal = self._pilih_jadwal("\nMasukkan ID Jadwal yang akan dihapus: ")
             
             # Konfirmasi penghapusan
             konfirmasi = input(f"\nYakin ingin menghapus jadwal ID {id_jadwal}? (y/n): ")
             
             if konfirmasi.lower() == 'y':
                 # Cek apakah ada data terkait di tabel lain
-                query_check = """
-                SELECT COUNT(*) FROM Hasil_Panen WHERE id_jadwal_tanam = %s
-                UNION ALL
-                SELECT COUNT(*) FROM Masalah_Tanam WHERE id_jadwal_tanam = %s;
-                """
-                self.db.cursor.execute(query_check, (id_jadwal, id_jadwal))
-                results = self.db.cursor.fetchall()
-                
-                total_terkait = sum([row[0] for row in results])
+                total_terkait = sum(self.service.hitung_data_terkait(id_jadwal).values())
                 
                 if total_terkait > 0:
                     print(f"Jadwal ini memiliki {total_terkait} data terkait di tabel lain.")
@@ -376,14 +2896,8 @@ class JadwalTanamManager:
                         print("Penghapusan dibatalkan")
                         return False
                 
-                # Hapus data terkait terlebih dahulu
-                self.db.cursor.execute("DELETE FROM Hasil_Panen WHERE id_jadwal_tanam = %s;", (id_jadwal,))
-                self.db.cursor.execute("DELETE FROM Masalah_Tanam WHERE id_jadwal_tanam = %s;", (id_jadwal,))
-                
-                # Hapus jadwal
-                query = "DELETE FROM Jadwal_Tanam WHERE id_jadwal_tanam = %s;"
-                self.db.cursor.execute(query, (id_jadwal,))
-                self.db.connection.commit()
+                # Data terkait dihapus terlebih dahulu dalam satu transaksi
+                self.service.hapus_jadwal(id_jadwal)
                 
                 print(f"Jadwal ID {id_jadwal} berhasil dihapus!")
                 return True
@@ -391,7 +2905,85 @@ class JadwalTanamManager:
                 print("Penghapusan dibatalkan")
                 return False
                 
-        except psycopg2.Error as e:
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menghapus jadwal: {e}")
+            self.db.connection.rollback()
+            return False
+    
+    def _input_filter_jadwal(self) -> FilterJadwal:
+        filter_jadwal = FilterJadwal()
+        daftar_id = input("Daftar ID Jadwal (pisahkan dengan koma): ").strip()
+        if daftar_id:
+            filter_jadwal.id_jadwal_tanam = [int(x) for x in daftar_id.split(",") if x.strip()]
+        for nama, label in (("tanggal_mulai", "Tanggal tanam dari"), ("tanggal_selesai", "Tanggal tanam sampai")):
+            tanggal_str = input(f"{label} (YYYY-MM-DD): ").strip()
+            if tanggal_str:
+                setattr(filter_jadwal, nama, datetime.datetime.strptime(tanggal_str, "%Y-%m-%d").date())
+        id_lahan = input("ID Lahan: ").strip()
+        if id_lahan:
+            filter_jadwal.id_lahan = int(id_lahan)
+        status_jadwal_id = input("ID Status Jadwal: ").strip()
+        if status_jadwal_id:
+            filter_jadwal.status_jadwal_id = int(status_jadwal_id)
+        return filter_jadwal
+    
+    def geser_jadwal_massal(self) -> bool:
+        print("Fitur 1.12: Geser Jadwal Massal")
+        try:
+            print("\nGESER JADWAL TANAM MASSAL")
+            print("=" * 30)
+            print("Kosongkan kriteria yang tidak dipakai")
+            filter_jadwal = self._input_filter_jadwal()
+            hari = int(input("Geser berapa hari (negatif = maju): "))
+            ikut_pemupukan = input("Ikut geser jadwal pemupukan terkait? (y/n): ").lower() == 'y'
+            
+            hasil = self.service.geser_jadwal_massal(filter_jadwal, hari, ikut_pemupukan)
+            if not hasil.jadwal_tanam:
+                print("Tidak ada jadwal yang cocok dengan kriteria")
+                return False
+            print(f"\n{len(hasil.jadwal_tanam)} jadwal tanam dan {len(hasil.jadwal_pemupukan)} "
+                  f"jadwal pemupukan digeser {hari} hari")
+            return True
+        except ValueError:
+            print("Input tidak valid! ID dan hari harus angka, tanggal berformat YYYY-MM-DD")
+            return False
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menggeser jadwal: {e}")
+            self.db.connection.rollback()
+            return False
+    
+    def hapus_jadwal_massal(self) -> bool:
+        print("Fitur 1.9: Hapus Jadwal Massal")
+        try:
+            print("\nHAPUS JADWAL TANAM MASSAL")
+            print("=" * 30)
+            print("Kosongkan kriteria yang tidak dipakai")
+            
+            filter_jadwal = self._input_filter_jadwal()
+            
+            # Tampilkan jumlah data yang akan terhapus sebelum konfirmasi
+            pratinjau = self.service.pratinjau_hapus_massal(filter_jadwal)
+            if pratinjau.jadwal_tanam == 0:
+                print("Tidak ada jadwal yang cocok dengan kriteria")
+                return False
+            print(f"\nAkan dihapus: {pratinjau.jadwal_tanam} jadwal tanam, "
+                  f"{pratinjau.hasil_panen} hasil panen, {pratinjau.masalah_tanam} masalah tanam, "
+                  f"{pratinjau.laporan_masalah} laporan masalah")
+            if input("Lanjutkan penghapusan? (y/n): ").lower() != 'y':
+                print("Penghapusan dibatalkan")
+                return False
+            
+            hasil = self.service.hapus_jadwal_massal(filter_jadwal)
+            print("\nPenghapusan selesai!")
+            print(tabulate([["Jadwal_Tanam", hasil.jadwal_tanam], ["Hasil_Panen", hasil.hasil_panen],
+                            ["Masalah_Tanam", hasil.masalah_tanam], ["laporan_masalah", hasil.laporan_masalah]],
+                           headers=["Tabel", "Baris Dihapus"], tablefmt="grid"))
+            return True
+            
+        except ValueError:
+            print("Input tidak valid! ID harus angka dan tanggal berformat YYYY-MM-DD")
+            return False
+        except (psycopg2.Error, SipataniError) as e:
             print(f"Error menghapus jadwal: {e}")
             self.db.connection.rollback()
             return False
@@ -403,22 +2995,7 @@ class JadwalTanamManager:
             print("=" * 30)
             
             # Tampilkan jadwal yang berstatus "Siap Panen"
-            query = """
-            SELECT 
-                jt.id_jadwal_tanam,
-                t.nama_tanaman,
-                jt.tanggal as tanggal_tanam,
-                t.durasi_tanam,
-                s.status
-            FROM Jadwal_Tanam jt
-            JOIN Tanaman t ON jt.id_tanaman = t.id_tanaman
-            JOIN Status_Jadwal s ON jt.status_jadwal_id = s.id_status_jadwal
-            WHERE jt.status_jadwal_id = 995
-            ORDER BY jt.id_jadwal_tanam;
-            """
-            
-            self.db.cursor.execute(query)
-            jadwal_siap_panen = self.db.cursor.fetchall()
+            jadwal_siap_panen = {j.id_jadwal_tanam: j for j in self.service.jadwal_siap_panen()}
             
             if not jadwal_siap_panen:
                 print("Tidak ada jadwal yang siap panen")
@@ -426,14 +3003,13 @@ class JadwalTanamManager:
             
             print("\nJADWAL SIAP PANEN:")
             headers = ["ID Jadwal", "Tanaman", "Tanggal Tanam", "Durasi (hari)", "Status"]
-            print(tabulate(jadwal_siap_panen, headers=headers, tablefmt="grid"))
+            print(tabulate([astuple(j) for j in jadwal_siap_panen.values()], headers=headers, tablefmt="grid"))
             
             # Pilih jadwal
             while True:
                 try:
                     id_jadwal = int(input("\nPilih ID Jadwal untuk input hasil panen: "))
-                    jadwal_dipilih = next((j for j in jadwal_siap_panen if j[0] == id_jadwal), None)
-                    if jadwal_dipilih:
+                    if id_jadwal in jadwal_siap_panen:
                         break
                     else:
                         print("ID jadwal tidak valid atau tidak siap panen!")
@@ -449,355 +3025,2661 @@ class JadwalTanamManager:
                     tanggal_obj = datetime.datetime.strptime(tanggal_panen, "%Y-%m-%d").date()
                     break
                 except ValueError:
-                    print("Format tanggal salah!")
-            
+                    print("Format tanggal salah!")
+            
+            while True:
+                try:
+                    jumlah_panen = float(input("Jumlah Panen (kg): "))
+                    if jumlah_panen > 0:
+                        break
+                    else:
+                        print("Jumlah panen harus lebih dari 0!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+            
+            while True:
+                try:
+                    harga_per_kg = float(input("Harga per kg (Rp): "))
+                    if harga_per_kg > 0:
+                        break
+                    else:
+                        print("Harga harus lebih dari 0!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+            
+            panen = self.service.input_hasil_panen(HasilPanenInput(id_jadwal, tanggal_obj, jumlah_panen, harga_per_kg))
+            
+            print(f"\nHasil panen berhasil dicatat!")
+            print(f"ID Panen: {panen.id_panen}")
+            print(f"Tanggal Panen: {panen.tanggal}")
+            print(f"Jumlah Panen: {panen.jumlah_panen_kg} kg")
+            print(f"Harga per kg: Rp {panen.harga_per_kg:,.0f}")
+            print(f"Total Nilai: Rp {panen.total_nilai:,.0f}")
+            
+            return True
+            
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error input hasil panen: {e}")
+            self.db.connection.rollback()
+            return False
+
+    def laporan_panen(self) -> bool:
+        print("Fitur 1.10: Laporan Hasil Panen")
+        try:
+            print("\nLAPORAN HASIL PANEN")
+            print("=" * 30)
+            dimensi = input(f"Kelompokkan per ({'/'.join(DIMENSI_LAPORAN_PANEN)}) [tanaman]: ").strip().lower() or "tanaman"
+            rentang = []
+            for label in ("Dari tanggal", "Sampai tanggal"):
+                tanggal_str = input(f"{label} (YYYY-MM-DD, kosongkan jika semua): ").strip()
+                rentang.append(datetime.datetime.strptime(tanggal_str, "%Y-%m-%d").date() if tanggal_str else None)
+            
+            baris = self.service.laporan_panen(dimensi, *rentang)
+            if not baris:
+                print("Belum ada data hasil panen pada rentang tersebut")
+                return False
+            print(tabulate(
+                [[b.label, f"{b.jumlah_panen_kg:,.2f}", f"Rp {b.pendapatan:,.0f}", b.jumlah_transaksi] for b in baris],
+                headers=[dimensi.capitalize(), "Total Panen (kg)", "Pendapatan", "Jumlah Panen"], tablefmt="grid"))
+            print(f"\nTotal pendapatan: Rp {sum(b.pendapatan for b in baris):,.0f}")
+            return True
+            
+        except ValueError:
+            print("Format tanggal salah! Gunakan YYYY-MM-DD")
+            return False
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error laporan hasil panen: {e}")
+            self.db.connection.rollback()
+            return False
+
+class Jadwal_Pemupukan:
+    def __init__(self, db: SipataniDatabase, service: Optional[SipataniService] = None):
+        self.db = db
+        self.service = service or SipataniService(db.pool)
+        self.perencanaan = PipelinePerencanaan(db.pool) if np is not None else None
+
+    def _tampilkan_jadwal_pemupukan(self) -> int:
+        print("\nJADWAL PEMUPUKAN")
+        print("=" * 80)
+        columns = ["ID Kegiatan", "ID/Nama Tanaman", "Nama Kegiatan", "Jenis", "Dosis per Bibit", "Tanggal Pemupukan"]
+        with closing(self.service.iter_jadwal_pemupukan()) as baris:
+            jumlah = TabelBertahap(columns).render(baris)
+        if jumlah == 0:
+            print("Tidak ada jadwal pemupukan yang ditemukan")
+        return jumlah
+
+    def _pilih_kegiatan(self, prompt: str) -> int:
+        while True:
+            try:
+                id_kegiatan = int(input(prompt))
+                self.service.ambil_jadwal_pemupukan(id_kegiatan)
+                return id_kegiatan
+            except ValueError:
+                print("Masukkan angka yang valid!")
+            except DataTidakDitemukan:
+                print("ID kegiatan tidak ditemukan!")
+
+    def lihat_JadwalPemupukan(self):
+        print("1: Lihat Jadwal Pemupukan")
+        try:
+            self._tampilkan_jadwal_pemupukan()
+        except psycopg2.Error as e:
+            print(f"Error mengambil jadwal pemupukan: {e}")
+
+    def tambah_JadwalPemupukan(self):
+        print("2: Tambah Jadwal Pemupukan")
+        try:
+            print("\nTAMBAH JADWAL PEMUPUKAN")
+            print("=" * 40)
+
+            tanaman_map = {t["id"]: t for t in sorted(self.service.daftar_tanaman(), key=lambda t: t["id"])}
+            if not tanaman_map:
+                print("Tidak ada data tanaman")
+                return
+
+            print("\nDAFTAR TANAMAN:")
+            for t in tanaman_map.values():
+                print(f"ID: {t['id']} | Nama: {t['nama']}")
+
+            while True:
+                try:
+                    id_tanaman = int(input("\nPilih ID Tanaman: "))
+                    if id_tanaman in tanaman_map:
+                        break
+                    else:
+                        print("ID tanaman tidak valid!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+
+            while True:
+                jenis = input("Jenis (Pupuk/Pestisida): ").strip().capitalize()
+                if jenis in ["Pupuk", "Pestisida"]:
+                    break
+                print("Jenis harus 'Pupuk' atau 'Pestisida'! Coba lagi.")
+
+            nama_kegiatan = input("Nama Kegiatan (misal: Pupuk awal, Pestisida): ").strip()
+            nama_pupuk = input("Nama Pupuk/Pestisida (misal: Pupuk Organik, Pestisida): ").strip()
+            while True:
+                try:
+                    interval_hari = int(input("Waktu Pemupukan (interval hari, misal: 5): "))
+                    if interval_hari > 0:
+                        break
+                    else:
+                        print("Interval hari harus lebih dari 0!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+
+            while True:
+                try:
+                    dosis_per_bibit = float(input("Dosis per Bibit (ml atau gr per tanaman): "))
+                    if dosis_per_bibit > 0:
+                        break
+                    else:
+                        print("Dosis harus lebih dari 0!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+
+            kegiatan = self.service.tambah_jadwal_pemupukan(JadwalPemupukanInput(
+                id_tanaman, jenis, nama_kegiatan, nama_pupuk, interval_hari, dosis_per_bibit
+            ))
+            print(f"\nJadwal pemupukan berhasil ditambahkan! ID Kegiatan: {kegiatan.id_kegiatan}")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menambah jadwal pemupukan: {e}")
+
+    def ubah_JadwalPemupukan(self):
+        print("3: Ubah Jadwal Pemupukan")
+        try:
+            print("\nUBAH JADWAL PEMUPUKAN")
+            print("=" * 30)
+            self._tampilkan_jadwal_pemupukan()
+
+            id_kegiatan = self._pilih_kegiatan("\nMasukkan ID Kegiatan yang akan diubah: ")
+            versi = self.service.ambil_jadwal_pemupukan(id_kegiatan).versi
+
+            print("\nPilih yang ingin diubah:")
+            print("1. Tanggal Pemupukan")
+            print("2. Dosis per Bibit")
+            pilihan = input("Pilihan (1-2): ")
+
+            if pilihan == "1":
+                while True:
+                    try:
+                        tanggal_baru = input("Tanggal baru (YYYY-MM-DD): ")
+                        tanggal_obj = datetime.datetime.strptime(tanggal_baru, "%Y-%m-%d").date()
+                        break
+                    except ValueError:
+                        print("Format tanggal salah! Gunakan YYYY-MM-DD")
+                self.service.ubah_jadwal_pemupukan(PerubahanJadwalPemupukan(id_kegiatan, versi=versi, tanggal_pemupukan=tanggal_obj))
+                print("Tanggal pemupukan berhasil diubah!")
+
+            elif pilihan == "2":
+                while True:
+                    try:
+                        dosis_baru = float(input("Dosis per Bibit baru (ml atau gr per tanaman): "))
+                        if dosis_baru > 0:
+                            break
+                        else:
+                            print("Dosis per bibit harus lebih dari 0!")
+                    except ValueError:
+                        print("Masukkan angka yang valid!")
+                self.service.ubah_jadwal_pemupukan(PerubahanJadwalPemupukan(id_kegiatan, versi=versi, dosis_per_bibit=dosis_baru))
+                print("Dosis per bibit berhasil diubah!")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error mengubah jadwal pemupukan: {e}")
+
+    def hapus_JadwalPemupukan(self):
+        print("4: Hapus Jadwal Pemupukan")
+        try:
+            print("\nHAPUS JADWAL PEMUPUKAN")
+            print("=" * 30)
+            self._tampilkan_jadwal_pemupukan()
+
+            id_kegiatan = self._pilih_kegiatan("\nMasukkan ID Kegiatan yang akan dihapus: ")
+
+            konfirmasi = input(f"Yakin ingin menghapus jadwal ID {id_kegiatan}? (ya/tidak): ")
+            if konfirmasi.lower() == 'ya':
+                self.service.hapus_jadwal_pemupukan(id_kegiatan)
+                print(f"Jadwal pemupukan ID {id_kegiatan} berhasil dihapus!")
+            else:
+                print("Penghapusan dibatalkan")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menghapus jadwal pemupukan: {e}")
+
+    def lihatStok_pp(self):
+        print("5: Lihat Stok Pupuk/Pestisida")
+        try:
+            print("\nSTOK PUPUK/PESTISIDA")
+            print("=" * 80)
+            with closing(self.service.iter_stok()) as baris:
+                jumlah = TabelBertahap(["ID", "Nama Barang", "Jenis", "ID Kegiatan"]).render(baris)
+            if jumlah == 0:
+                print("Tidak ada stok pupuk/pestisida yang ditemukan")
+            self._tampilkan_saldo(self.service.daftar_saldo_stok())
+        except psycopg2.Error as e:
+            print(f"Error mengambil stok: {e}")
+    
+    def _tampilkan_saldo(self, saldo: List[SaldoStok]):
+        if not saldo:
+            return
+        print("\nSALDO STOK PER BARANG")
+        print(tabulate(
+            [[s.id_barang, s.nama_barang, s.jenis, f"{s.saldo:,.2f} {s.satuan}", f"{s.stok_minimum:,.2f}",
+              "MENIPIS" if s.saldo < s.stok_minimum else "OK"] for s in saldo],
+            headers=["ID Barang", "Nama Barang", "Jenis", "Saldo", "Minimum", "Status"], tablefmt="grid"))
+    
+    def catat_mutasi_stok(self):
+        print("11: Catat Mutasi Stok")
+        try:
+            self._tampilkan_saldo(self.service.daftar_saldo_stok())
+            id_barang = self._input_angka("\nID Barang: ")
+            while True:
+                jenis_mutasi = input("Jenis mutasi (masuk/pakai/koreksi/minimum): ").strip().lower()
+                if jenis_mutasi in JENIS_MUTASI_STOK + ("minimum",):
+                    break
+                print("Jenis mutasi tidak valid!")
+            if jenis_mutasi == "minimum":
+                stok_minimum = self._input_angka("Stok minimum baru: ", float, 0)
+                self.service.atur_stok_minimum(id_barang, stok_minimum)
+                print(f"Stok minimum barang ID {id_barang} diubah menjadi {stok_minimum:,.2f}")
+                return
+            batas = float("-inf") if jenis_mutasi == "koreksi" else 0.01
+            jumlah = self._input_angka("Jumlah (koreksi boleh negatif): " if jenis_mutasi == "koreksi" else "Jumlah: ",
+                                       float, batas)
+            keterangan = input("Keterangan (opsional): ").strip() or None
+            mutasi = self.service.catat_mutasi_stok(MutasiStokInput(id_barang, jenis_mutasi, jumlah, keterangan))
+            print(f"\nMutasi ID {mutasi.id_mutasi} dicatat ({mutasi.jumlah:+,.2f})")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error mencatat mutasi stok: {e}")
+    
+    def lihat_kekurangan_stok(self):
+        print("12: Stok Menipis dan Proyeksi Kekurangan")
+        try:
+            menipis = self.service.daftar_saldo_stok(hanya_menipis=True)
+            if menipis:
+                print("\nSTOK DI BAWAH MINIMUM")
+                self._tampilkan_saldo(menipis)
+            else:
+                print("\nTidak ada stok di bawah minimum")
+            
+            hari = self._input_angka("\nProyeksi kebutuhan untuk berapa hari ke depan: ", int, 0)
+            kekurangan = self.service.proyeksi_kekurangan_stok(hari)
+            if not kekurangan:
+                print(f"Stok mencukupi untuk semua pemupukan terjadwal {hari} hari ke depan")
+                return
+            print(f"\nPROYEKSI KEKURANGAN STOK ({hari} hari)")
+            print(tabulate(
+                [[k.id_barang, k.nama_barang, k.jenis, f"{k.saldo:,.2f}", f"{k.kebutuhan:,.2f}", f"{k.sisa:,.2f}",
+                  k.tanggal_habis] for k in kekurangan],
+                headers=["ID Barang", "Nama Barang", "Jenis", "Saldo", "Kebutuhan", "Sisa", "Habis Pada"], tablefmt="grid"))
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menghitung kekurangan stok: {e}")
+
+    def tambah_stok(self):
+        print("6: Tambah Stok")
+        try:
+            print("\nTAMBAH STOK PUPUK/PESTISIDA")
+            print("=" * 40)
+            nama_barang = input("Nama Barang: ").strip()
+            while True:
+                jenis = input("Jenis (Pupuk/Pestisida): ").strip().capitalize()
+                if jenis in ["Pupuk", "Pestisida"]:
+                    break
+                print("Jenis harus 'Pupuk' atau 'Pestisida'! Coba lagi.")
+            kegiatan_list = set(self.service.daftar_id_kegiatan())
+            if not kegiatan_list:
+                print("Tidak ada jadwal pemupukan yang tersedia untuk stok!")
+                return
+            print("\nDAFTAR ID KEGIATAN TERSEDIA:")
+            for id_kegiatan in sorted(kegiatan_list):
+                print(f"ID Kegiatan: {id_kegiatan}")
+            while True:
+                try:
+                    id_kegiatan = int(input("\nPilih ID Kegiatan untuk stok: "))
+                    if id_kegiatan in kegiatan_list:
+                        break
+                    else:
+                        print("ID kegiatan tidak valid!")
+                except ValueError:
+                    print("Masukkan angka yang valid!")
+            self.service.tambah_stok(StokInput(nama_barang, jenis, id_kegiatan))
+            print(f"Stok {nama_barang} berhasil ditambahkan!")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menambah stok: {e}")
+
+    def hapus_stok(self):
+        print("7: Hapus Stok")
+        try:
+            print("\nHAPUS STOK PUPUK/PESTISIDA")
+            print("=" * 30)
+            self.lihatStok_pp()
+
             while True:
                 try:
-                    jumlah_panen = float(input("Jumlah Panen (kg): "))
-                    if jumlah_panen > 0:
-                        break
-                    else:
-                        print("Jumlah panen harus lebih dari 0!")
+                    id_pupukpestisida = int(input("\nMasukkan ID Stok yang akan dihapus: "))
+                    self.service.ambil_stok(id_pupukpestisida)
+                    break
                 except ValueError:
                     print("Masukkan angka yang valid!")
-            
+                except DataTidakDitemukan:
+                    print("ID stok tidak ditemukan!")
+
+            konfirmasi = input(f"Yakin ingin menghapus stok ID {id_pupukpestisida}? (ya/tidak): ")
+            if konfirmasi.lower() == 'ya':
+                self.service.hapus_stok(id_pupukpestisida)
+                print(f"Stok ID {id_pupukpestisida} berhasil dihapus!")
+            else:
+                print("Penghapusan dibatalkan")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menghapus stok: {e}")
+
+    def _input_angka(self, prompt: str, tipe=int, minimum=1):
+        while True:
+            try:
+                nilai = tipe(input(prompt))
+                if nilai >= minimum:
+                    return nilai
+                print(f"Nilai minimal {minimum}!")
+            except ValueError:
+                print("Masukkan angka yang valid!")
+    
+    def buat_kalender_pemupukan(self):
+        print("9: Kalender Pemupukan Berulang")
+        try:
+            print("\nKALENDER PEMUPUKAN BERULANG")
+            print("=" * 40)
             while True:
                 try:
-                    harga_per_kg = float(input("Harga per kg (Rp): "))
-                    if harga_per_kg > 0:
+                    daftar_id = [int(x) for x in input("ID Jadwal Tanam (pisahkan dengan koma): ").split(",") if x.strip()]
+                    if daftar_id:
                         break
-                    else:
-                        print("Harga harus lebih dari 0!")
+                    print("Minimal satu ID jadwal tanam!")
                 except ValueError:
                     print("Masukkan angka yang valid!")
+            while True:
+                jenis = input("Jenis (Pupuk/Pestisida): ").strip().capitalize()
+                if jenis in ["Pupuk", "Pestisida"]:
+                    break
+                print("Jenis harus 'Pupuk' atau 'Pestisida'! Coba lagi.")
+            nama_kegiatan = input("Nama Kegiatan (misal: Pupuk susulan): ").strip()
+            nama_pupuk = input("Nama Pupuk/Pestisida: ").strip()
+            dosis_per_bibit = self._input_angka("Dosis per Bibit (ml atau gr per tanaman): ", float, 0.01)
+            mulai_hari_ke = self._input_angka("Kejadian pertama pada hari ke- (setelah tanggal tanam): ", int, 0)
+            interval_hari = self._input_angka("Interval antar kejadian (hari): ")
+            jumlah_kejadian = self._input_angka("Jumlah kejadian per jadwal: ")
             
-            # Ambil ID tanaman dari jadwal
-            query_tanaman = "SELECT id_tanaman FROM Jadwal_Tanam WHERE id_jadwal_tanam = %s;"
-            self.db.cursor.execute(query_tanaman, (id_jadwal,))
-            id_tanaman = self.db.cursor.fetchone()[0]
-            
-            # Generate ID panen baru
-            query_max_id = "SELECT COALESCE(MAX(id_panen), 5000) + 1 FROM Hasil_Panen;"
-            self.db.cursor.execute(query_max_id)
-            id_panen_baru = self.db.cursor.fetchone()[0]
+            hasil = self.service.buat_kalender_pemupukan(RencanaPemupukanInput(
+                daftar_id, jenis, nama_kegiatan, nama_pupuk, dosis_per_bibit, interval_hari, jumlah_kejadian, mulai_hari_ke
+            ))
+            print(f"\n{hasil.jumlah_kegiatan} kegiatan pemupukan dibuat "
+                  f"({hasil.tanggal_pertama} s/d {hasil.tanggal_terakhir})")
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error membuat kalender pemupukan: {e}")
+    
+    def lihat_jatuh_tempo(self):
+        print("10: Pemupukan Jatuh Tempo")
+        try:
+            hari = self._input_angka("Tampilkan kegiatan untuk berapa hari ke depan: ", int, 0)
+            hasil = self.service.pemupukan_jatuh_tempo(hari)
+            if not hasil:
+                print(f"Tidak ada pemupukan dalam {hari} hari ke depan")
+                return
+            print(f"\nPEMUPUKAN JATUH TEMPO ({len(hasil)} kegiatan)")
+            columns = ["ID Kegiatan", "Tanggal", "Kegiatan", "Dosis/Bibit", "ID Tanaman", "Tanaman",
+                       "ID Jadwal", "ID Lahan", "Petani"]
+            print(tabulate([astuple(row) for row in hasil], headers=columns, tablefmt="grid"))
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error mengambil pemupukan jatuh tempo: {e}")
+    
+    def proyeksi_kebutuhan(self):
+        print("8: Proyeksi Kebutuhan Pupuk dan Panen")
+        if self.perencanaan is None:
+            print("Fitur ini membutuhkan numpy: pip install numpy")
+            return
+        try:
+            proyeksi = self.perencanaan.hitung()
+            if not len(proyeksi.id_jadwal_tanam):
+                print("Belum ada jadwal tanam")
+                return
+            print(f"\n{len(proyeksi.id_jadwal_tanam):,} jadwal dihitung "
+                  f"(muat {proyeksi.durasi_muat * 1000:.0f} ms, hitung {proyeksi.durasi_hitung * 1000:.0f} ms)")
             
-            # Ambil id_kegiatan dari jadwal pemupukan (ambil yang terakhir untuk tanaman ini)
-            query_kegiatan = """
-            SELECT id_kegiatan FROM Jadwal_Pemupukan 
-            WHERE id_tanaman = %s 
-            ORDER BY id_kegiatan DESC LIMIT 1;
-            """
-            self.db.cursor.execute(query_kegiatan, (id_tanaman,))
-            result_kegiatan = self.db.cursor.fetchone()
-            id_kegiatan = result_kegiatan[0] if result_kegiatan else 301  # Default jika tidak ada
+            per_lahan = sorted(proyeksi.ringkasan_per_lahan(), key=lambda r: r["dosis_total"], reverse=True)
+            print("\nKEBUTUHAN PUPUK PER LAHAN (20 terbesar)")
+            print(tabulate([list(r.values()) for r in per_lahan[:20]],
+                           headers=["ID Lahan", "Jumlah Jadwal", "Jumlah Bibit", "Total Dosis"], tablefmt="grid"))
             
-            # Insert hasil panen
-            query_insert = """
-            INSERT INTO Hasil_Panen (id_panen, tanggal, jumlah_panen_kg, harga_per_kg, id_tanaman, id_jadwal_tanam, id_kegiatan)
-            VALUES (%s, %s, %s, %s, %s, %s, %s);
-            """
+            print("\nPERKIRAAN PANEN PER BULAN")
+            print(tabulate([list(r.values()) for r in proyeksi.panen_per_bulan()],
+                           headers=["Bulan", "Jumlah Jadwal"], tablefmt="grid"))
+        except (psycopg2.Error, SipataniError) as e:
+            print(f"Error menghitung proyeksi: {e}")
+
+class ImporMassalManager:
+    # Kolom CSV yang diterima: nama kolom -> wajib ada di header
+    KOLOM_CSV_JADWAL = {"id_jadwal_tanam": False, "tanggal": True, "id_lahan": True,
+                        "id_tanaman": True, "status_jadwal_id": False}
+    KOLOM_CSV_PANEN = {"id_panen": False, "id_jadwal_tanam": True, "tanggal": True,
+                       "jumlah_panen_kg": True, "harga_per_kg": True}
+    MAKS_CONTOH_ERROR = 20
+    
+    def __init__(self, db: SipataniDatabase):
+        self.db = db
+    
+    def impor_jadwal_tanam(self, path_csv: str) -> Dict[str, int]:
+        print("Fitur 1.7: Impor Jadwal Tanam dari CSV")
+        cur = self.db.cursor
+        try:
+            mulai = time.perf_counter()
+            cur.execute("""
+            CREATE TEMP TABLE staging_jadwal_tanam (
+                baris BIGINT GENERATED ALWAYS AS IDENTITY,
+                id_jadwal_tanam INTEGER,
+                tanggal DATE,
+                id_lahan INTEGER,
+                id_tanaman INTEGER,
+                status_jadwal_id INTEGER
+            ) ON COMMIT DROP;
+            """)
+            jumlah_baris = self._copy_ke_staging(path_csv, "staging_jadwal_tanam", self.KOLOM_CSV_JADWAL)
             
-            self.db.cursor.execute(query_insert, (
-                id_panen_baru, tanggal_obj, jumlah_panen, harga_per_kg, 
-                id_tanaman, id_jadwal, id_kegiatan
-            ))
+            # Validasi foreign key dan ID ganda sekaligus untuk semua baris (status default: Terjadwal)
+            cur.execute("""
+            SELECT s.baris,
+                   CASE WHEN s.kembar > 1 THEN 'id_jadwal_tanam ' || s.id_jadwal_tanam || ' muncul lebih dari sekali'
+                        WHEN s.tanggal IS NULL THEN 'tanggal kosong'
+                        WHEN l.id_lahan IS NULL THEN 'id_lahan ' || COALESCE(s.id_lahan::text, '-') || ' tidak ada'
+                        WHEN t.id_tanaman IS NULL THEN 'id_tanaman ' || COALESCE(s.id_tanaman::text, '-') || ' tidak ada'
+                        ELSE 'status_jadwal_id ' || s.status_jadwal_id || ' tidak ada'
+                   END AS alasan,
+                   COUNT(*) OVER () AS total_error
+            FROM (
+                SELECT st.*, CASE WHEN st.id_jadwal_tanam IS NULL THEN 1
+                                  ELSE COUNT(*) OVER (PARTITION BY st.id_jadwal_tanam) END AS kembar
+                FROM staging_jadwal_tanam st
+            ) s
+            LEFT JOIN Lahan l ON s.id_lahan = l.id_lahan
+            LEFT JOIN Tanaman t ON s.id_tanaman = t.id_tanaman
+            LEFT JOIN Status_Jadwal sj ON COALESCE(s.status_jadwal_id, %s) = sj.id_status_jadwal
+            WHERE s.kembar > 1 OR s.tanggal IS NULL OR l.id_lahan IS NULL OR t.id_tanaman IS NULL
+               OR sj.id_status_jadwal IS NULL
+            ORDER BY s.baris
+            LIMIT %s;
+            """, (STATUS_TERJADWAL, self.MAKS_CONTOH_ERROR))
+            if self._laporkan_error(cur.fetchall()):
+                self.db.connection.rollback()
+                return {"dibaca": jumlah_baris, "dimasukkan": 0}
             
+            # Merge: baris dengan ID yang sudah ada diperbarui, sisanya mendapat ID dari sequence
+            cur.execute("""
+            WITH diperbarui AS (
+                UPDATE Jadwal_Tanam jt
+                SET tanggal = s.tanggal, id_lahan = s.id_lahan, id_tanaman = s.id_tanaman,
+                    status_jadwal_id = COALESCE(s.status_jadwal_id, jt.status_jadwal_id)
+                FROM staging_jadwal_tanam s
+                WHERE s.id_jadwal_tanam = jt.id_jadwal_tanam
+                RETURNING jt.id_jadwal_tanam
+            ),
+            dimasukkan AS (
+                INSERT INTO Jadwal_Tanam (id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id)
+                SELECT COALESCE(s.id_jadwal_tanam, nextval('jadwal_tanam_id_seq')),
+                       s.tanggal, s.id_lahan, s.id_tanaman, COALESCE(s.status_jadwal_id, %s)
+                FROM staging_jadwal_tanam s
+                WHERE NOT EXISTS (SELECT 1 FROM Jadwal_Tanam jt WHERE jt.id_jadwal_tanam = s.id_jadwal_tanam)
+                ORDER BY s.baris
+                RETURNING id_jadwal_tanam
+            )
+            SELECT (SELECT COUNT(*) FROM diperbarui), (SELECT COUNT(*) FROM dimasukkan);
+            """, (STATUS_TERJADWAL,))
+            jumlah_update, jumlah_insert = cur.fetchone()
+            selaraskan_sequence(cur, "jadwal_tanam_id_seq")
             self.db.connection.commit()
             
-            # Hitung total nilai panen
-            total_nilai = jumlah_panen * harga_per_kg
+            return self._laporkan_hasil(jumlah_baris, jumlah_insert, jumlah_update, mulai)
+        
+        except (psycopg2.Error, OSError, ValueError) as e:
+            print(f"Error impor jadwal tanam: {e}")
+            self.db.connection.rollback()
+            return {"dibaca": 0, "dimasukkan": 0}
+    
+    def impor_hasil_panen(self, path_csv: str) -> Dict[str, int]:
+        print("Fitur 1.8: Impor Hasil Panen dari CSV")
+        cur = self.db.cursor
+        try:
+            mulai = time.perf_counter()
+            cur.execute("""
+            CREATE TEMP TABLE staging_hasil_panen (
+                baris BIGINT GENERATED ALWAYS AS IDENTITY,
+                id_panen INTEGER,
+                id_jadwal_tanam INTEGER,
+                tanggal DATE,
+                jumlah_panen_kg NUMERIC,
+                harga_per_kg NUMERIC
+            ) ON COMMIT DROP;
+            """)
+            jumlah_baris = self._copy_ke_staging(path_csv, "staging_hasil_panen", self.KOLOM_CSV_PANEN)
             
-            print(f"\nHasil panen berhasil dicatat!")
-            print(f"ID Panen: {id_panen_baru}")
-            print(f"Tanggal Panen: {tanggal_obj}")
-            print(f"Jumlah Panen: {jumlah_panen} kg")
-            print(f"Harga per kg: Rp {harga_per_kg:,.0f}")
-            print(f"Total Nilai: Rp {total_nilai:,.0f}")
+            # Validasi sama dengan catat_hasil_panen_massal (termasuk status Siap Panen) ditambah ID ganda
+            cur.execute("""
+            SELECT s.baris,
+                   CASE WHEN s.kembar > 1 THEN 'id_panen ' || s.id_panen || ' muncul lebih dari sekali'
+                        WHEN jt.id_jadwal_tanam IS NULL THEN 'id_jadwal_tanam ' || COALESCE(s.id_jadwal_tanam::text, '-') || ' tidak ada'
+                        WHEN s.tanggal IS NULL THEN 'tanggal kosong'
+                        WHEN COALESCE(s.jumlah_panen_kg, 0) <= 0 THEN 'jumlah_panen_kg harus lebih dari 0'
+                        WHEN COALESCE(s.harga_per_kg, 0) <= 0 THEN 'harga_per_kg harus lebih dari 0'
+                        ELSE 'jadwal tanam ' || jt.id_jadwal_tanam || ' belum siap panen'
+                   END AS alasan,
+                   COUNT(*) OVER () AS total_error
+            FROM (
+                SELECT st.*, CASE WHEN st.id_panen IS NULL THEN 1
+                                  ELSE COUNT(*) OVER (PARTITION BY st.id_panen) END AS kembar
+                FROM staging_hasil_panen st
+            ) s
+            LEFT JOIN Jadwal_Tanam jt ON s.id_jadwal_tanam = jt.id_jadwal_tanam
+            WHERE s.kembar > 1 OR jt.id_jadwal_tanam IS NULL OR s.tanggal IS NULL
+               OR COALESCE(s.jumlah_panen_kg, 0) <= 0 OR COALESCE(s.harga_per_kg, 0) <= 0
+               OR jt.status_jadwal_id <> %s
+            ORDER BY s.baris
+            LIMIT %s;
+            """, (STATUS_SIAP_PANEN, self.MAKS_CONTOH_ERROR))
+            if self._laporkan_error(cur.fetchall()):
+                self.db.connection.rollback()
+                return {"dibaca": jumlah_baris, "dimasukkan": 0}
             
-            return True
+            # id_tanaman diambil dari jadwal, id_kegiatan dari jadwal pemupukan terakhir tanaman tsb
+            cur.execute("""
+            WITH sumber AS (
+                SELECT s.baris, s.id_panen, s.tanggal, s.jumlah_panen_kg, s.harga_per_kg,
+                       jt.id_tanaman, s.id_jadwal_tanam, COALESCE(k.id_kegiatan, %s) AS id_kegiatan
+                FROM staging_hasil_panen s
+                JOIN Jadwal_Tanam jt ON s.id_jadwal_tanam = jt.id_jadwal_tanam
+                LEFT JOIN (
+                    SELECT id_tanaman, MAX(id_kegiatan) AS id_kegiatan
+                    FROM Jadwal_Pemupukan
+                    GROUP BY id_tanaman
+                ) k ON jt.id_tanaman = k.id_tanaman
+            ),
+            diperbarui AS (
+                UPDATE Hasil_Panen hp
+                SET tanggal = s.tanggal, jumlah_panen_kg = s.jumlah_panen_kg, harga_per_kg = s.harga_per_kg,
+                    id_tanaman = s.id_tanaman, id_jadwal_tanam = s.id_jadwal_tanam, id_kegiatan = s.id_kegiatan
+                FROM sumber s
+                WHERE s.id_panen = hp.id_panen
+                RETURNING hp.id_panen
+            ),
+            dimasukkan AS (
+                INSERT INTO Hasil_Panen (id_panen, tanggal, jumlah_panen_kg, harga_per_kg, id_tanaman, id_jadwal_tanam, id_kegiatan)
+                SELECT COALESCE(s.id_panen, nextval('hasil_panen_id_seq')), s.tanggal, s.jumlah_panen_kg,
+                       s.harga_per_kg, s.id_tanaman, s.id_jadwal_tanam, s.id_kegiatan
+                FROM sumber s
+                WHERE NOT EXISTS (SELECT 1 FROM Hasil_Panen hp WHERE hp.id_panen = s.id_panen)
+                ORDER BY s.baris
+                RETURNING id_panen
+            )
+            SELECT (SELECT COUNT(*) FROM diperbarui), (SELECT COUNT(*) FROM dimasukkan);
+            """, (ID_KEGIATAN_DEFAULT,))
+            jumlah_update, jumlah_insert = cur.fetchone()
+            selaraskan_sequence(cur, "hasil_panen_id_seq")
+            self.db.connection.commit()
             
-        except psycopg2.Error as e:
-            print(f"Error input hasil panen: {e}")
+            return self._laporkan_hasil(jumlah_baris, jumlah_insert, jumlah_update, mulai)
+        
+        except (psycopg2.Error, OSError, ValueError) as e:
+            print(f"Error impor hasil panen: {e}")
             self.db.connection.rollback()
+            return {"dibaca": 0, "dimasukkan": 0}
+    
+    def _copy_ke_staging(self, path_csv: str, tabel_staging: str, kolom_csv: Dict[str, bool]) -> int:
+        # Header CSV menentukan urutan kolom, isi file di-stream lewat COPY FROM STDIN.
+        # utf-8-sig membuang BOM dari Excel, kalau tidak nama kolom pertama tidak dikenali
+        with open(path_csv, newline="", encoding="utf-8-sig") as f:
+            header = [kol.strip().lower() for kol in next(csv.reader([f.readline()]), [])]
+            tidak_dikenal = [kol for kol in header if kol not in kolom_csv]
+            kurang = [kol for kol, wajib in kolom_csv.items() if wajib and kol not in header]
+            if tidak_dikenal or kurang:
+                raise ValueError(f"Header CSV tidak valid (tidak dikenal: {tidak_dikenal}, kurang: {kurang})")
+            
+            perintah = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+                sql.Identifier(tabel_staging), sql.SQL(", ").join(map(sql.Identifier, header)))
+            self.db.cursor.copy_expert(perintah.as_string(self.db.connection), f)
+        
+        self.db.cursor.execute(sql.SQL("SELECT COUNT(*) FROM {};").format(sql.Identifier(tabel_staging)))
+        return self.db.cursor.fetchone()[0]
+    
+    def _laporkan_error(self, baris_error: List[Tuple]) -> bool:
+        if not baris_error:
             return False
+        print(f"\nImpor dibatalkan: {baris_error[0][2]} baris tidak valid. Contoh:")
+        for baris, alasan, _ in baris_error:
+            print(f"Baris {baris}: {alasan}")
+        return True
+    
+    def _laporkan_hasil(self, jumlah_baris: int, jumlah_insert: int, jumlah_update: int, mulai: float) -> Dict[str, int]:
+        durasi = time.perf_counter() - mulai
+        print(f"\nImpor selesai dalam {durasi:.2f} detik ({jumlah_baris / max(durasi, 1e-9):,.0f} baris/detik)")
+        print(f"Baris dibaca: {jumlah_baris}")
+        print(f"Baris baru: {jumlah_insert}")
+        print(f"Baris diperbarui: {jumlah_update}")
+        return {"dibaca": jumlah_baris, "dimasukkan": jumlah_insert, "diperbarui": jumlah_update}
 
-class Jadwal_Pemupukan:
-    def __init__(self, conn, cur):
-        self.conn = conn
-        self.cur = cur
+class EksporData:
+    # Ekspor listing ke file dengan memori terbatas: CSV langsung dari COPY TO STDOUT,
+    # JSON Lines dan Parquet dari server-side cursor per batch
+    SUMBER = {
+        "jadwal": (QUERY_LIHAT_JADWAL, (0,)),
+        "pemupukan": (QUERY_LIHAT_PEMUPUKAN, None),
+        "stok": (QUERY_LIHAT_STOK, None),
+        "saldo-stok": (QUERY_SALDO_STOK, (False,)),
+        "laporan": (QUERY_LIHAT_LAPORAN, None),
+    }
+    FORMAT = ("csv", "jsonl", "parquet")
+    UKURAN_BATCH = 10_000
+    
+    def __init__(self, pool: Optional[SipataniConnectionPool] = None, ukuran_batch: int = UKURAN_BATCH):
+        self.pool = pool
+        self.ukuran_batch = ukuran_batch
+    
+    @classmethod
+    def tebak_format(cls, path: str) -> str:
+        ekstensi = os.path.splitext(path)[1].lower().lstrip(".")
+        ekstensi = {"ndjson": "jsonl", "pq": "parquet"}.get(ekstensi, ekstensi)
+        if ekstensi not in cls.FORMAT:
+            raise ValidasiGagal(f"Format tidak dikenali dari '{path}', pilih salah satu: {', '.join(cls.FORMAT)}")
+        return ekstensi
+    
+    def ekspor(self, sumber: str, path: str, format: Optional[str] = None) -> Dict[str, Any]:
+        if sumber not in self.SUMBER:
+            raise ValidasiGagal(f"Sumber harus salah satu dari: {', '.join(self.SUMBER)}")
+        format = format or self.tebak_format(path)
+        if format not in self.FORMAT:
+            raise ValidasiGagal(f"Format harus salah satu dari: {', '.join(self.FORMAT)}")
+        if format == "parquet" and pa is None:
+            raise SipataniError("Library pyarrow belum terinstall: pip install pyarrow")
+        if self.pool is None:
+            self.pool = get_connection_pool()
+        
+        query, param = self.SUMBER[sumber]
+        tulis = {"csv": self._ke_csv, "jsonl": self._ke_jsonl, "parquet": self._ke_parquet}[format]
+        mulai = time.perf_counter()
+        # Ditulis ke file sementara dulu agar file tujuan tidak pernah setengah jadi
+        sementara = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            koneksi = self.pool.koneksi_baca() if isinstance(self.pool, RouterKoneksi) else self.pool.koneksi()
+            with koneksi as conn:
+                baris = tulis(conn, query.strip().rstrip(";"), param, sementara)
+            os.replace(sementara, path)
+        finally:
+            if os.path.exists(sementara):
+                os.remove(sementara)
+        durasi = time.perf_counter() - mulai
+        return {"sumber": sumber, "format": format, "path": path, "baris": baris,
+                "byte": os.path.getsize(path), "durasi_detik": round(durasi, 3)}
+    
+    def _ke_csv(self, conn, query: str, param, path: str) -> Optional[int]:
+        with conn.cursor() as cur, open(path, "wb") as f:
+            perintah = cur.mogrify(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", param).decode()
+            cur.copy_expert(perintah, f)
+            return cur.rowcount if cur.rowcount >= 0 else None
+    
+    @contextmanager
+    def _cursor_server(self, conn, query: str, param):
+        with conn.cursor(name=f"ekspor_{uuid.uuid4().hex[:12]}") as cur:
+            cur.itersize = self.ukuran_batch
+            cur.execute(query, param)
+            yield cur
+    
+    def _ke_jsonl(self, conn, query: str, param, path: str) -> int:
+        baris = 0
+        with self._cursor_server(conn, query, param) as cur, open(path, "w", encoding="utf-8") as f:
+            while True:
+                batch = cur.fetchmany(self.ukuran_batch)
+                if not batch:
+                    break
+                kolom = [d.name for d in cur.description]
+                f.writelines(json.dumps(dict(zip(kolom, row)), default=_ke_json, ensure_ascii=False) + "\n"
+                             for row in batch)
+                baris += len(batch)
+        return baris
+    
+    def _ke_parquet(self, conn, query: str, param, path: str) -> int:
+        baris = 0
+        writer = None
+        try:
+            with self._cursor_server(conn, query, param) as cur:
+                while True:
+                    batch = cur.fetchmany(self.ukuran_batch)
+                    if writer is None:
+                        # Skema dari tipe kolom PostgreSQL, bukan ditebak dari batch pertama
+                        skema = self._skema_arrow(cur.description)
+                        writer = pq.ParquetWriter(path, skema)
+                    if not batch:
+                        break
+                    writer.write_table(self._tabel_arrow(skema, batch))
+                    baris += len(batch)
+        finally:
+            if writer is not None:
+                writer.close()
+        return baris
+    
+    @staticmethod
+    def _skema_arrow(description) -> "pa.Schema":
+        # OID tipe PostgreSQL -> tipe Arrow; NUMERIC disimpan sebagai double, tipe lain sebagai string
+        peta = {16: pa.bool_(), 20: pa.int64(), 21: pa.int64(), 23: pa.int64(), 700: pa.float64(),
+                701: pa.float64(), 1700: pa.float64(), 1082: pa.date32(), 1114: pa.timestamp("us"),
+                1184: pa.timestamp("us", tz="UTC")}
+        return pa.schema([(d.name, peta.get(d.type_code, pa.string())) for d in description])
+    
+    @staticmethod
+    def _tabel_arrow(skema: "pa.Schema", batch: List[Tuple]) -> "pa.Table":
+        kolom = []
+        for field, nilai in zip(skema, zip(*batch)):
+            if pa.types.is_floating(field.type):
+                nilai = [None if v is None else float(v) for v in nilai]
+            elif pa.types.is_string(field.type):
+                nilai = [None if v is None else str(v) for v in nilai]
+            kolom.append(pa.array(nilai, type=field.type))
+        return pa.Table.from_arrays(kolom, schema=skema)
+    
+    def ekspor_interaktif(self):
+        print("Fitur 1.11: Ekspor Data")
+        try:
+            print(f"Sumber tersedia: {', '.join(self.SUMBER)}")
+            sumber = input("Sumber data: ").strip().lower()
+            path = input(f"Path file tujuan ({'/'.join(self.FORMAT)}): ").strip()
+            hasil = self.ekspor(sumber, path)
+            baris = "?" if hasil["baris"] is None else f"{hasil['baris']:,}"
+            print(f"\n{baris} baris diekspor ke {hasil['path']} ({hasil['byte']:,} byte, {hasil['durasi_detik']} detik)")
+        except (psycopg2.Error, SipataniError, OSError) as e:
+            print(f"Error ekspor data: {e}")
 
-    def lihat_JadwalPemupukan(self):
-        print("1: Lihat Jadwal Pemupukan")
+@dataclass
+class ProyeksiPerencanaan:
+    # Satu elemen array = satu jadwal tanam
+    id_jadwal_tanam: Any
+    id_lahan: Any
+    id_tanaman: Any
+    tanggal_tanam: Any
+    tanggal_panen: Any
+    jumlah_bibit: Any
+    dosis_total: Any
+    durasi_muat: float
+    durasi_hitung: float
+    
+    def ringkasan_per_lahan(self) -> List[Dict[str, Any]]:
+        # ID lahan berupa integer, jadi bincount cukup (tanpa sort/unique)
+        jumlah_jadwal = np.bincount(self.id_lahan)
+        bibit = np.bincount(self.id_lahan, weights=self.jumlah_bibit)
+        dosis = np.bincount(self.id_lahan, weights=self.dosis_total)
+        return [{"id_lahan": int(l), "jumlah_jadwal": int(jumlah_jadwal[l]), "jumlah_bibit": int(bibit[l]),
+                 "dosis_total": round(float(dosis[l]), 2)} for l in np.flatnonzero(jumlah_jadwal)]
+    
+    def panen_per_bulan(self) -> List[Dict[str, Any]]:
+        if not len(self.tanggal_panen):
+            return []
+        bulan = self.tanggal_panen.astype("datetime64[M]").astype(np.int64)
+        awal = bulan.min()
+        jumlah = np.bincount(bulan - awal)
+        return [{"bulan": str(np.datetime64(int(awal + i), "M")), "jumlah_jadwal": int(jumlah[i])}
+                for i in np.flatnonzero(jumlah)]
+    
+    def ke_dataframe(self):
+        if pd is None:
+            raise SipataniError("Library pandas belum terinstall: pip install pandas")
+        return pd.DataFrame({
+            "id_jadwal_tanam": self.id_jadwal_tanam, "id_lahan": self.id_lahan, "id_tanaman": self.id_tanaman,
+            "tanggal_tanam": self.tanggal_tanam, "tanggal_panen": self.tanggal_panen,
+            "jumlah_bibit": self.jumlah_bibit, "dosis_total": self.dosis_total,
+        })
+
+def _tabel_lookup(ids, nilai, kosong=0):
+    # Array yang diindeks langsung dengan ID, pengganti join/dict per baris
+    lut = np.full(int(ids.max()) + 1 if len(ids) else 1, kosong, dtype=np.asarray(nilai).dtype)
+    lut[ids] = nilai
+    return lut
+
+class PipelinePerencanaan:
+    # Proyeksi jumlah bibit, kebutuhan pupuk dan tanggal panen untuk semua jadwal sekaligus:
+    # kolom dimuat massal lewat COPY lalu dihitung dengan operasi array numpy
+    def __init__(self, pool: Optional[SipataniConnectionPool] = None, luas_lahan_m2: float = LUAS_LAHAN_M2):
+        if np is None:
+            raise SipataniError("Library numpy belum terinstall: pip install numpy")
+        self.pool = pool
+        self.luas_lahan_m2 = luas_lahan_m2
+    
+    def hitung(self, filter_jadwal: Optional[FilterJadwal] = None) -> ProyeksiPerencanaan:
+        if self.pool is None:
+            self.pool = get_connection_pool()
+        mulai = time.perf_counter()
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            where = ""
+            if filter_jadwal is not None:
+                kondisi, param = _kondisi_filter_jadwal(filter_jadwal)
+                where = cur.mogrify("WHERE " + kondisi, param).decode()
+            buffer = io.BytesIO()
+            cur.copy_expert(QUERY_KOLOM_PERENCANAAN.format(where=where), buffer)
+            cur.execute("SELECT id_lahan, luas_lahan FROM Lahan;")
+            lahan = cur.fetchall()
+            cur.execute("SELECT id_tanaman, durasi_tanam, jarak_antar_tanaman FROM Tanaman;")
+            tanaman = cur.fetchall()
+            cur.execute(QUERY_DOSIS_PEMUPUKAN)
+            dosis = cur.fetchall()
+        jadwal = self._parse_kolom(buffer)
+        durasi_muat = time.perf_counter() - mulai
+        
+        mulai = time.perf_counter()
+        hasil = self.proyeksikan(jadwal, lahan, tanaman, dosis)
+        hasil.durasi_muat = durasi_muat
+        hasil.durasi_hitung = time.perf_counter() - mulai
+        return hasil
+    
+    def proyeksikan(self, jadwal, lahan: List[Tuple], tanaman: List[Tuple], dosis: List[Tuple]) -> ProyeksiPerencanaan:
+        # jadwal: array (n, 4) [id_jadwal, id_lahan, id_tanaman, hari sejak 1970-01-01]
+        # dosis: baris QUERY_DOSIS_PEMUPUKAN (id_tanaman, id_jadwal_tanam, total dosis, jumlah kegiatan)
+        id_jadwal, id_lahan, id_tanaman, hari_tanam = np.asarray(jadwal, dtype=np.int64).reshape(-1, 4).T
+        if len(id_jadwal):
+            lahan_id = np.array([r[0] for r in lahan], dtype=np.int64)
+            tanaman_id = np.array([r[0] for r in tanaman], dtype=np.int64)
+            luas = _tabel_lookup(lahan_id, np.array([float(r[1]) for r in lahan]))[id_lahan]
+            durasi = _tabel_lookup(tanaman_id, np.array([r[1] for r in tanaman], dtype=np.int64))[id_tanaman]
+            jarak_m = _tabel_lookup(tanaman_id, np.array([float(r[2]) for r in tanaman]))[id_tanaman] / 100
+            # Kegiatan yang terikat ke jadwal hanya dihitung untuk jadwal itu; kegiatan tanpa id_jadwal_tanam
+            # berlaku untuk semua jadwal tanamannya. Tanpa kegiatan = 0
+            lut_dosis = _tabel_lookup(tanaman_id, np.zeros(len(tanaman_id)))
+            lut_dosis_jadwal = np.zeros(int(id_jadwal.max()) + 1)
+            if dosis:
+                dosis_tanaman = np.array([r[0] for r in dosis], dtype=np.int64)
+                dosis_jadwal = np.array([-1 if r[1] is None else r[1] for r in dosis], dtype=np.int64)
+                dosis_total = np.array([float(r[2]) for r in dosis])
+                umum = dosis_jadwal < 0
+                lut_dosis[dosis_tanaman[umum]] = dosis_total[umum]
+                terikat = ~umum & (dosis_jadwal < len(lut_dosis_jadwal))
+                lut_dosis_jadwal[dosis_jadwal[terikat]] = dosis_total[terikat]
+            dosis_bibit = lut_dosis[id_tanaman] + lut_dosis_jadwal[id_jadwal]
+        else:
+            luas = jarak_m = dosis_bibit = np.zeros(0)
+            durasi = np.zeros(0, dtype=np.int64)
+        
+        # Jumlah bibit = luas lahan / (jarak tanam)^2, jarak 0 dianggap tidak diketahui
+        with np.errstate(divide="ignore", invalid="ignore"):
+            jumlah_bibit = np.where(jarak_m > 0, np.floor(luas * self.luas_lahan_m2 / jarak_m ** 2), 0).astype(np.int64)
+        tanggal_tanam = hari_tanam.astype("datetime64[D]")
+        return ProyeksiPerencanaan(
+            id_jadwal_tanam=id_jadwal, id_lahan=id_lahan, id_tanaman=id_tanaman,
+            tanggal_tanam=tanggal_tanam, tanggal_panen=tanggal_tanam + durasi.astype("timedelta64[D]"),
+            jumlah_bibit=jumlah_bibit, dosis_total=jumlah_bibit * dosis_bibit,
+            durasi_muat=0.0, durasi_hitung=0.0,
+        )
+    
+    def _parse_kolom(self, buffer: io.BytesIO):
+        if not buffer.getbuffer().nbytes:
+            return np.zeros((0, 4), dtype=np.int64)
+        buffer.seek(0)
+        if pd is not None:
+            return pd.read_csv(buffer, header=None, dtype=np.int64, engine="c").to_numpy()
+        return np.loadtxt(buffer, delimiter=",", dtype=np.int64, ndmin=2)
+
+log_status = logging.getLogger("sipatani.status")
+
+class PenjadwalStatus:
+    # Thread background yang menjalankan perbarui_status_jadwal() secara berkala
+    def __init__(self, service: SipataniService, interval_detik: float = INTERVAL_STATUS_OTOMATIS):
+        self.service = service
+        self.interval_detik = interval_detik
+        self._berhenti = threading.Event()
+        self._thread = None
+    
+    def jalankan_sekali(self, penuh: bool = False) -> Optional[Dict[str, Any]]:
         try:
-            query = """
-            SELECT 
-                jp.id_kegiatan,
-                t.id_tanaman || ' / ' || t.nama_tanaman AS tanaman,
-                jp.nama_kegiatan,
-                pp.jenis,
-                jp.dosis_per_bibit_tanaman AS dosis_per_bibit,
-                jp.tanggal_pemupukan AS waktu_pemupukan
-            FROM Jadwal_Pemupukan jp
-            JOIN Tanaman t ON jp.id_tanaman = t.id_tanaman
-            JOIN Pupuk_Pestisida pp ON jp.id_kegiatan = pp.id_kegiatan
-            ORDER BY jp.id_kegiatan;
-            """
-            self.cur.execute(query)
-            results = self.cur.fetchall()
-            
-            if results:
-                print("\nJADWAL PEMUPUKAN")
-                print("=" * 80)
-                columns = ["ID Kegiatan", "ID/Nama Tanaman", "Nama Kegiatan", "Jenis", "Waktu Pemupukan", "Dosis per Bibit"]
-                print(tabulate([list(row) for row in results], headers=columns, tablefmt="grid"))
-            else:
-                print("Tidak ada jadwal pemupukan yang ditemukan")
+            hasil = self.service.perbarui_status_jadwal(penuh=penuh)
         except psycopg2.Error as e:
-            print(f"Error mengambil jadwal pemupukan: {e}")
-
-    def tambah_JadwalPemupukan(self):
-        print("2: Tambah Jadwal Pemupukan")
+            log_status.error("Gagal memperbarui status jadwal: %s", e)
+            return None
+        log_status.info("Status jadwal %s..%s: %d -> Sedang Berlangsung, %d -> Siap Panen (%.1f ms)",
+                        hasil["dari"], hasil["sampai"], hasil["jumlah_berlangsung"],
+                        hasil["jumlah_siap_panen"], hasil["durasi_ms"])
+        return hasil
+    
+    def catat_pemakaian_sekali(self, penuh: bool = False) -> Optional[int]:
         try:
-            print("\nTAMBAH JADWAL PEMUPUKAN")
-            print("=" * 40)
+            jumlah = self.service.catat_pemakaian_terjadwal(penuh=penuh)
+        except psycopg2.Error as e:
+            log_status.error("Gagal mencatat pemakaian stok terjadwal: %s", e)
+            return None
+        log_status.info("Pemakaian stok terjadwal: %d mutasi dicatat", jumlah)
+        return jumlah
+    
+    def rawat_partisi_sekali(self) -> Optional[int]:
+        try:
+            jumlah = ManajerPartisi(self.service.pool or get_connection_pool()).siapkan_mendatang()
+        except psycopg2.Error as e:
+            log_status.error("Gagal menyiapkan partisi mendatang: %s", e)
+            return None
+        if jumlah:
+            log_status.info("Partisi mendatang: %d partisi baru dibuat", jumlah)
+        return jumlah
+    
+    def mulai(self):
+        if self.interval_detik <= 0 or self._thread is not None:
+            return
+        self._berhenti.clear()
+        self._thread = threading.Thread(target=self._loop, name="penjadwal-status", daemon=True)
+        self._thread.start()
+    
+    def berhenti(self):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._berhenti.set()
+            thread.join()
+    
+    def _loop(self):
+        while not self._berhenti.is_set():
+            with metrik_query.operasi("penjadwal status"):
+                self.jalankan_sekali()
+                self.catat_pemakaian_sekali()
+                self.rawat_partisi_sekali()
+            self._berhenti.wait(self.interval_detik)
 
-            self.cur.execute("SELECT id_tanaman, nama_tanaman FROM Tanaman ORDER BY id_tanaman")
-            tanaman_list = self.cur.fetchall()
-            if not tanaman_list:
-                print("Tidak ada data tanaman")
-                return
+# Event dibaca urut (xid, id_event) dan hanya dari transaksi yang xid-nya di bawah xmin snapshot:
+# semua transaksi itu sudah selesai, jadi tidak ada event baru yang bisa muncul di belakang offset.
+# Urutan id_event saja tidak cukup karena BIGSERIAL dibagikan sebelum commit.
+QUERY_BATCH_PERUBAHAN = """
+SELECT id_event, xid::text::bigint, waktu, tabel, operasi, kunci, data
+FROM event_perubahan
+WHERE (xid, id_event) > (%(xid)s::text::xid8, %(id_event)s)
+  AND xid < pg_snapshot_xmin(pg_current_snapshot())
+  AND (%(tabel)s::text[] IS NULL OR tabel = ANY(%(tabel)s))
+ORDER BY xid, id_event
+LIMIT %(batas)s;
+"""
+QUERY_KUNCI_OFFSET_KONSUMEN = """
+INSERT INTO offset_konsumen (nama) VALUES (%s) ON CONFLICT (nama) DO NOTHING;
+SELECT xid::text::bigint, id_event FROM offset_konsumen WHERE nama = %s FOR UPDATE;
+"""
+QUERY_SIMPAN_OFFSET_KONSUMEN = """
+UPDATE offset_konsumen SET xid = %s::text::xid8, id_event = %s, diperbarui_pada = now() WHERE nama = %s;
+"""
+# Hanya event lama yang sudah dilewati semua konsumen terdaftar yang dihapus
+QUERY_BERSIHKAN_PERUBAHAN = """
+DELETE FROM event_perubahan e
+WHERE e.waktu < now() - make_interval(days => %s)
+  AND NOT EXISTS (SELECT 1 FROM offset_konsumen o WHERE (o.xid, o.id_event) < (e.xid, e.id_event));
+"""
 
-            print("\nDAFTAR TANAMAN:")
-            for t in tanaman_list:
-                print(f"ID: {t['id_tanaman']} | Nama: {t['nama_tanaman']}")
+@dataclass
+class EventPerubahan:
+    id_event: int
+    xid: int
+    waktu: datetime.datetime
+    tabel: str
+    operasi: str
+    kunci: int
+    data: Dict[str, Any]
 
-            while True:
-                try:
-                    id_tanaman = int(input("\nPilih ID Tanaman: "))
-                    tanaman_dipilih = next((t for t in tanaman_list if t['id_tanaman'] == id_tanaman), None)
-                    if tanaman_dipilih:
-                        break
-                    else:
-                        print("ID tanaman tidak valid!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+class SinkJsonl:
+    # Tiap event satu baris JSON, di-fsync sebelum offset konsumen disimpan
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+    
+    def kirim(self, events: List[EventPerubahan]):
+        self._file.writelines(json.dumps(e, default=_ke_json, ensure_ascii=False) + "\n" for e in events)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+    
+    def tutup(self):
+        self._file.close()
 
-            while True:
-                jenis = input("Jenis (Pupuk/Pestisida): ").strip().capitalize()
-                if jenis in ["Pupuk", "Pestisida"]:
-                    break
-                print("Jenis harus 'Pupuk' atau 'Pestisida'! Coba lagi.")
+class SinkAntrian:
+    # Pengganti message queue lokal: konsumen di proses yang sama (cache, analitik) membaca dari queue.
+    # Queue penuh menahan konsumen CDC (backpressure), offset baru disimpan setelah semua masuk.
+    def __init__(self, maks: int = 10_000, timeout: Optional[float] = None):
+        self.antrian: "queue.Queue[EventPerubahan]" = queue.Queue(maks)
+        self.timeout = timeout
+    
+    def kirim(self, events: List[EventPerubahan]):
+        for e in events:
+            try:
+                self.antrian.put(e, timeout=self.timeout)
+            except queue.Full:
+                raise SipataniError(f"Antrian event penuh ({self.antrian.maxsize}), event {e.id_event} belum terkirim")
+    
+    def tutup(self):
+        pass
 
-            nama_kegiatan = input("Nama Kegiatan (misal: Pupuk awal, Pestisida): ").strip()
-            nama_pupuk = input("Nama Pupuk/Pestisida (misal: Pupuk Organik, Pestisida): ").strip()
-            while True:
+log_cdc = logging.getLogger("sipatani.cdc")
+
+class KonsumenPerubahan:
+    # Mengalirkan event_perubahan ke sink per batch. Offset (xid, id_event) per nama konsumen disimpan
+    # di offset_konsumen dalam transaksi yang sama dengan pembacaan batch, setelah sink menerima batch:
+    # at-least-once, setelah restart konsumen melanjutkan dari offset terakhir.
+    def __init__(self, pool: SipataniConnectionPool, nama: str, sink, tabel: Optional[Sequence[str]] = None,
+                 ukuran_batch: int = UKURAN_BATCH_CDC, interval_poll: float = INTERVAL_POLL_CDC):
+        tidak_dikenal = sorted(set(tabel or ()) - set(TABEL_CDC))
+        if tidak_dikenal:
+            raise ValidasiGagal(f"Tabel CDC harus salah satu dari: {', '.join(TABEL_CDC)}")
+        self.pool = pool
+        self.nama = nama
+        self.sink = sink
+        self.tabel = list(tabel) if tabel else None
+        self.ukuran_batch = ukuran_batch
+        self.interval_poll = interval_poll
+        self._berhenti = threading.Event()
+        self._thread = None
+    
+    def proses_batch(self) -> int:
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            # FOR UPDATE: dua proses dengan nama konsumen sama tidak mengirim batch yang sama
+            cur.execute(QUERY_KUNCI_OFFSET_KONSUMEN, (self.nama, self.nama))
+            xid, id_event = cur.fetchone()
+            cur.execute(QUERY_BATCH_PERUBAHAN, {"xid": xid, "id_event": id_event, "tabel": self.tabel,
+                                                "batas": self.ukuran_batch})
+            events = [EventPerubahan(*row) for row in cur.fetchall()]
+            if not events:
+                return 0
+            self.sink.kirim(events)
+            cur.execute(QUERY_SIMPAN_OFFSET_KONSUMEN, (events[-1].xid, events[-1].id_event, self.nama))
+        return len(events)
+    
+    def proses_semua(self) -> int:
+        total = 0
+        while not self._berhenti.is_set():
+            jumlah = self.proses_batch()
+            total += jumlah
+            if jumlah < self.ukuran_batch:
+                break
+        return total
+    
+    def jalankan(self):
+        # LISTEN hanya untuk membangunkan; data selalu diambil dari tabel mulai offset
+        conn = self.pool.getconn()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {};").format(sql.Identifier(CHANNEL_PERUBAHAN)))
+            while not self._berhenti.is_set():
                 try:
-                    interval_hari = int(input("Waktu Pemupukan (interval hari, misal: 5): "))
-                    if interval_hari > 0:
-                        break
-                    else:
-                        print("Interval hari harus lebih dari 0!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+                    jumlah = self.proses_semua()
+                except (psycopg2.Error, SipataniError, OSError) as e:
+                    # Offset tidak maju, batch yang sama dicoba lagi setelah jeda
+                    log_cdc.error("Konsumen %s gagal mengirim batch: %s", self.nama, e)
+                    jumlah = 0
+                if jumlah:
+                    log_cdc.info("Konsumen %s: %d event terkirim", self.nama, jumlah)
+                if select.select([conn], [], [], self.interval_poll) != ([], [], []):
+                    conn.poll()
+                    conn.notifies.clear()
+            with conn.cursor() as cur:
+                cur.execute("UNLISTEN *;")
+            conn.autocommit = False
+            self.pool.putconn(conn)
+        except BaseException:
+            self.pool.putconn(conn, close=True)
+            raise
+    
+    def mulai(self):
+        if self._thread is not None:
+            return
+        self._berhenti.clear()
+        self._thread = threading.Thread(target=self.jalankan, name=f"cdc-{self.nama}", daemon=True)
+        self._thread.start()
+    
+    def berhenti(self):
+        self._berhenti.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+    
+    def bersihkan(self, simpan_hari: int) -> int:
+        if simpan_hari < 0:
+            raise ValidasiGagal("Jumlah hari tidak boleh negatif!")
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            cur.execute(QUERY_BERSIHKAN_PERUBAHAN, (simpan_hari,))
+            return cur.rowcount
 
-            while True:
+class MigrasiSkema:
+    # Daftar migrasi berversi; versi yang sudah tercatat di schema_migrasi tidak dijalankan lagi.
+    # Migrasi yang sudah dirilis tidak boleh diubah, perubahan skema selalu berupa versi baru.
+    MIGRASI = [
+        # Versi 0 ditambahkan belakangan: versi 1, 3, 8 dan 10 membutuhkan laporan_masalah, yang dulu hanya
+        # dibuat saat aplikasi mulai, sehingga perintah migrasi/cdc/partisi gagal di database baru
+        (0, "Tabel laporan_masalah", [QUERY_BUAT_TABEL_LAPORAN]),
+        (1, "Indeks foreign key ke jadwal tanam dan kegiatan pemupukan", [
+            "CREATE INDEX IF NOT EXISTS idx_hasil_panen_jadwal ON Hasil_Panen (id_jadwal_tanam);",
+            "CREATE INDEX IF NOT EXISTS idx_masalah_tanam_jadwal ON Masalah_Tanam (id_jadwal_tanam);",
+            "CREATE INDEX IF NOT EXISTS idx_pupuk_pestisida_kegiatan ON Pupuk_Pestisida (id_kegiatan);",
+            "CREATE INDEX IF NOT EXISTS idx_laporan_masalah_jadwal ON laporan_masalah (id_jadwal_tanam);",
+        ]),
+        (2, "Indeks filter jadwal tanam dan kegiatan pemupukan terakhir per tanaman", [
+            # Parsial: hanya jadwal siap panen (status 995) yang dicari saat input hasil panen
+            f"CREATE INDEX IF NOT EXISTS idx_jadwal_tanam_siap_panen ON Jadwal_Tanam (id_jadwal_tanam) "
+            f"WHERE status_jadwal_id = {STATUS_SIAP_PANEN};",
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_tanam_status ON Jadwal_Tanam (status_jadwal_id, id_jadwal_tanam);",
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_tanam_tanggal ON Jadwal_Tanam (tanggal);",
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_tanam_lahan ON Jadwal_Tanam (id_lahan);",
+            # WHERE id_tanaman = %s ORDER BY id_kegiatan DESC LIMIT 1 cukup membaca satu entri indeks
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_pemupukan_tanaman ON Jadwal_Pemupukan (id_tanaman, id_kegiatan DESC);",
+        ]),
+        (3, "Perbarui statistik planner setelah indeks baru", [
+            "ANALYZE Jadwal_Tanam, Hasil_Panen, Masalah_Tanam, Jadwal_Pemupukan, Pupuk_Pestisida, laporan_masalah;",
+        ]),
+        (4, "Rekap hasil panen harian/bulanan dengan penanda hari kotor", [
+            """CREATE TABLE IF NOT EXISTS rekap_panen_harian (
+                tanggal DATE NOT NULL, id_tanaman INTEGER NOT NULL, id_lahan INTEGER NOT NULL, id_petani INTEGER NOT NULL,
+                jumlah_panen_kg NUMERIC NOT NULL, pendapatan NUMERIC NOT NULL, jumlah_transaksi INTEGER NOT NULL,
+                PRIMARY KEY (tanggal, id_tanaman, id_lahan, id_petani));""",
+            """CREATE TABLE IF NOT EXISTS rekap_panen_bulanan (
+                bulan DATE NOT NULL, id_tanaman INTEGER NOT NULL, id_lahan INTEGER NOT NULL, id_petani INTEGER NOT NULL,
+                jumlah_panen_kg NUMERIC NOT NULL, pendapatan NUMERIC NOT NULL, jumlah_transaksi INTEGER NOT NULL,
+                PRIMARY KEY (bulan, id_tanaman, id_lahan, id_petani));""",
+            "CREATE TABLE IF NOT EXISTS rekap_panen_kotor (tanggal DATE PRIMARY KEY);",
+            # Trigger per statement: satu INSERT ... ON CONFLICT per statement, bukan per baris
+            """CREATE OR REPLACE FUNCTION tandai_rekap_panen() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO rekap_panen_kotor SELECT DISTINCT tanggal FROM baru ON CONFLICT DO NOTHING;
+                END IF;
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    INSERT INTO rekap_panen_kotor SELECT DISTINCT tanggal FROM lama ON CONFLICT DO NOTHING;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_rekap_panen_insert AFTER INSERT ON Hasil_Panen
+            REFERENCING NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION tandai_rekap_panen();""",
+            """CREATE TRIGGER trg_rekap_panen_update AFTER UPDATE ON Hasil_Panen
+            REFERENCING OLD TABLE AS lama NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION tandai_rekap_panen();""",
+            """CREATE TRIGGER trg_rekap_panen_delete AFTER DELETE ON Hasil_Panen
+            REFERENCING OLD TABLE AS lama FOR EACH STATEMENT EXECUTE FUNCTION tandai_rekap_panen();""",
+            # Pindah lahan / pindah pemilik lahan mengubah atribusi panen yang sudah ada
+            """CREATE OR REPLACE FUNCTION tandai_rekap_panen_jadwal() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO rekap_panen_kotor
+                SELECT DISTINCT hp.tanggal FROM Hasil_Panen hp
+                JOIN baru b ON hp.id_jadwal_tanam = b.id_jadwal_tanam
+                JOIN lama l ON l.id_jadwal_tanam = b.id_jadwal_tanam
+                WHERE b.id_lahan IS DISTINCT FROM l.id_lahan
+                ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_rekap_panen_jadwal AFTER UPDATE ON Jadwal_Tanam
+            REFERENCING OLD TABLE AS lama NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION tandai_rekap_panen_jadwal();""",
+            """CREATE OR REPLACE FUNCTION tandai_rekap_panen_lahan() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO rekap_panen_kotor
+                SELECT DISTINCT hp.tanggal FROM Hasil_Panen hp
+                JOIN Jadwal_Tanam jt ON hp.id_jadwal_tanam = jt.id_jadwal_tanam
+                JOIN baru b ON jt.id_lahan = b.id_lahan
+                JOIN lama l ON l.id_lahan = b.id_lahan
+                WHERE b.id_petani IS DISTINCT FROM l.id_petani
+                ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_rekap_panen_lahan AFTER UPDATE ON Lahan
+            REFERENCING OLD TABLE AS lama NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION tandai_rekap_panen_lahan();""",
+            # Semua hari yang sudah ada dibangun pada penyegaran pertama
+            "INSERT INTO rekap_panen_kotor SELECT DISTINCT tanggal FROM Hasil_Panen ON CONFLICT DO NOTHING;",
+        ]),
+        (5, "Log penjadwal status otomatis jadwal tanam", [
+            """CREATE TABLE IF NOT EXISTS log_status_otomatis (
+                id SERIAL PRIMARY KEY,
+                waktu TIMESTAMP NOT NULL DEFAULT now(),
+                dari DATE,
+                sampai DATE NOT NULL,
+                jumlah_berlangsung INTEGER NOT NULL,
+                jumlah_siap_panen INTEGER NOT NULL,
+                durasi_ms NUMERIC(10, 1) NOT NULL);""",
+        ]),
+        (6, "Kalender pemupukan: kaitkan kegiatan ke jadwal tanam dan indeks tanggal", [
+            # SET NULL: hapus (massal) jadwal tanam tidak ikut menghapus riwayat pemupukan
+            """ALTER TABLE Jadwal_Pemupukan ADD COLUMN IF NOT EXISTS id_jadwal_tanam INTEGER
+                REFERENCES Jadwal_Tanam (id_jadwal_tanam) ON DELETE SET NULL;""",
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_pemupukan_tanggal ON Jadwal_Pemupukan (tanggal_pemupukan);",
+            "CREATE INDEX IF NOT EXISTS idx_jadwal_pemupukan_jadwal ON Jadwal_Pemupukan (id_jadwal_tanam);",
+        ]),
+        (7, "Buku besar stok: barang_stok, mutasi_stok (append-only) dan saldo_stok", [
+            """CREATE TABLE IF NOT EXISTS barang_stok (
+                id_barang SERIAL PRIMARY KEY,
+                nama_barang VARCHAR(100) NOT NULL,
+                jenis VARCHAR(20) NOT NULL,
+                satuan VARCHAR(20) NOT NULL DEFAULT 'gr/ml',
+                stok_minimum NUMERIC NOT NULL DEFAULT 0 CHECK (stok_minimum >= 0),
+                UNIQUE (nama_barang, jenis));""",
+            "INSERT INTO barang_stok (nama_barang, jenis) SELECT DISTINCT nama_barang, jenis FROM Pupuk_Pestisida ON CONFLICT DO NOTHING;",
+            """CREATE TABLE IF NOT EXISTS mutasi_stok (
+                id_mutasi BIGSERIAL PRIMARY KEY,
+                id_barang INTEGER NOT NULL REFERENCES barang_stok (id_barang),
+                waktu TIMESTAMP NOT NULL DEFAULT now(),
+                tanggal DATE NOT NULL DEFAULT CURRENT_DATE,
+                jenis_mutasi VARCHAR(10) NOT NULL CHECK (jenis_mutasi IN ('masuk', 'pakai', 'koreksi')),
+                jumlah NUMERIC NOT NULL CHECK (jumlah <> 0),
+                id_kegiatan INTEGER,
+                keterangan TEXT);""",
+            "CREATE INDEX IF NOT EXISTS idx_mutasi_stok_barang ON mutasi_stok (id_barang, waktu);",
+            """CREATE UNIQUE INDEX IF NOT EXISTS idx_mutasi_stok_pemakaian ON mutasi_stok (id_kegiatan, id_barang)
+                WHERE jenis_mutasi = 'pakai' AND id_kegiatan IS NOT NULL;""",
+            """CREATE TABLE IF NOT EXISTS saldo_stok (
+                id_barang INTEGER PRIMARY KEY REFERENCES barang_stok (id_barang),
+                saldo NUMERIC NOT NULL DEFAULT 0,
+                diperbarui_pada TIMESTAMP NOT NULL DEFAULT now());""",
+            "CREATE INDEX IF NOT EXISTS idx_saldo_stok_saldo ON saldo_stok (saldo);",
+            """CREATE OR REPLACE FUNCTION tolak_ubah_mutasi_stok() RETURNS trigger AS $$
+            BEGIN
+                RAISE EXCEPTION 'mutasi_stok bersifat append-only, gunakan mutasi koreksi';
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_mutasi_stok_append_only BEFORE UPDATE OR DELETE OR TRUNCATE ON mutasi_stok
+            FOR EACH STATEMENT EXECUTE FUNCTION tolak_ubah_mutasi_stok();""",
+            # Saldo berjalan: satu upsert per statement, dijumlah per barang dari transition table
+            """CREATE OR REPLACE FUNCTION perbarui_saldo_stok() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO saldo_stok (id_barang, saldo)
+                SELECT id_barang, SUM(jumlah) FROM baru GROUP BY id_barang
+                ON CONFLICT (id_barang) DO UPDATE
+                SET saldo = saldo_stok.saldo + EXCLUDED.saldo, diperbarui_pada = now();
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_mutasi_stok_saldo AFTER INSERT ON mutasi_stok
+            REFERENCING NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION perbarui_saldo_stok();""",
+            # Barang baru otomatis terdaftar saat dipakai di Pupuk_Pestisida
+            """CREATE OR REPLACE FUNCTION daftarkan_barang_stok() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO barang_stok (nama_barang, jenis)
+                SELECT DISTINCT nama_barang, jenis FROM baru ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE TRIGGER trg_pupuk_pestisida_barang AFTER INSERT ON Pupuk_Pestisida
+            REFERENCING NEW TABLE AS baru FOR EACH STATEMENT EXECUTE FUNCTION daftarkan_barang_stok();""",
+        ]),
+        (8, "Pencarian laporan_masalah: kolom tsvector + GIN dan indeks kolom filter", [
+            # Bobot: jenis (A) > deskripsi (B) > solusi (C); kolom generated selalu sinkron dengan isinya
+            """ALTER TABLE laporan_masalah ADD COLUMN IF NOT EXISTS dokumen tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(jenis, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(deskripsi, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(solusi, '')), 'C')) STORED;""",
+            "CREATE INDEX IF NOT EXISTS idx_laporan_masalah_dokumen ON laporan_masalah USING GIN (dokumen);",
+            "CREATE INDEX IF NOT EXISTS idx_laporan_masalah_jenis ON laporan_masalah (jenis, tanggal_masalah);",
+            "CREATE INDEX IF NOT EXISTS idx_laporan_masalah_status ON laporan_masalah (status_penanganan, tanggal_masalah);",
+            "CREATE INDEX IF NOT EXISTS idx_laporan_masalah_tanggal ON laporan_masalah (tanggal_masalah);",
+            "ANALYZE laporan_masalah;",
+        ]),
+        (9, "Fungsi catat_hasil_panen_massal/catat_hasil_panen: input panen dalam satu round-trip", [
+            # Validasi dulu agar semua baris dicatat atau tidak sama sekali, baris salah pertama dilaporkan
+            """CREATE OR REPLACE FUNCTION catat_hasil_panen_massal(
+                p_id_jadwal_tanam INTEGER[], p_tanggal DATE[], p_jumlah_panen_kg NUMERIC[], p_harga_per_kg NUMERIC[],
+                p_status_siap_panen INTEGER, p_kegiatan_default INTEGER DEFAULT 301)
+            RETURNS TABLE (id_panen INTEGER, tanggal DATE, jumlah_panen_kg NUMERIC, harga_per_kg NUMERIC,
+                           id_tanaman INTEGER, id_jadwal_tanam INTEGER, id_kegiatan INTEGER, total_nilai NUMERIC) AS $$
+            #variable_conflict use_column
+            DECLARE
+                v_salah RECORD;
+            BEGIN
+                SELECT i.urutan, i.id_jadwal, i.tgl, i.jumlah, i.harga, jt.id_jadwal_tanam IS NULL AS tidak_ada
+                INTO v_salah
+                FROM unnest(p_id_jadwal_tanam, p_tanggal, p_jumlah_panen_kg, p_harga_per_kg)
+                     WITH ORDINALITY AS i(id_jadwal, tgl, jumlah, harga, urutan)
+                LEFT JOIN Jadwal_Tanam jt ON jt.id_jadwal_tanam = i.id_jadwal
+                WHERE jt.id_jadwal_tanam IS NULL OR jt.status_jadwal_id <> p_status_siap_panen OR i.tgl IS NULL
+                   OR i.jumlah IS NULL OR i.jumlah <= 0 OR i.harga IS NULL OR i.harga <= 0
+                ORDER BY i.urutan LIMIT 1;
+                IF FOUND THEN
+                    IF v_salah.tidak_ada THEN
+                        RAISE EXCEPTION 'Jadwal tanam ID % tidak ditemukan!', v_salah.id_jadwal USING ERRCODE = 'no_data_found';
+                    ELSIF v_salah.tgl IS NULL THEN
+                        RAISE EXCEPTION 'Tanggal panen baris % wajib diisi!', v_salah.urutan USING ERRCODE = 'invalid_parameter_value';
+                    ELSIF v_salah.jumlah IS NULL OR v_salah.jumlah <= 0 THEN
+                        RAISE EXCEPTION 'Jumlah panen harus lebih dari 0! (baris %)', v_salah.urutan USING ERRCODE = 'invalid_parameter_value';
+                    ELSIF v_salah.harga IS NULL OR v_salah.harga <= 0 THEN
+                        RAISE EXCEPTION 'Harga harus lebih dari 0! (baris %)', v_salah.urutan USING ERRCODE = 'invalid_parameter_value';
+                    ELSE
+                        RAISE EXCEPTION 'Jadwal tanam ID % belum siap panen!', v_salah.id_jadwal USING ERRCODE = 'invalid_parameter_value';
+                    END IF;
+                END IF;
+                
+                -- Kegiatan = kegiatan pemupukan terakhir tanaman itu (indeks id_tanaman, id_kegiatan DESC)
+                RETURN QUERY
+                INSERT INTO Hasil_Panen AS hp (tanggal, jumlah_panen_kg, harga_per_kg, id_tanaman, id_jadwal_tanam, id_kegiatan)
+                SELECT i.tgl, i.jumlah, i.harga, jt.id_tanaman, jt.id_jadwal_tanam,
+                       COALESCE((SELECT jp.id_kegiatan FROM Jadwal_Pemupukan jp WHERE jp.id_tanaman = jt.id_tanaman
+                                 ORDER BY jp.id_kegiatan DESC LIMIT 1), p_kegiatan_default)
+                FROM unnest(p_id_jadwal_tanam, p_tanggal, p_jumlah_panen_kg, p_harga_per_kg)
+                     WITH ORDINALITY AS i(id_jadwal, tgl, jumlah, harga, urutan)
+                JOIN Jadwal_Tanam jt ON jt.id_jadwal_tanam = i.id_jadwal
+                ORDER BY i.urutan
+                RETURNING hp.id_panen::integer, hp.tanggal, hp.jumlah_panen_kg::numeric, hp.harga_per_kg::numeric,
+                          hp.id_tanaman::integer, hp.id_jadwal_tanam::integer, hp.id_kegiatan::integer,
+                          (hp.jumlah_panen_kg * hp.harga_per_kg)::numeric;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            """CREATE OR REPLACE FUNCTION catat_hasil_panen(
+                p_id_jadwal_tanam INTEGER, p_tanggal DATE, p_jumlah_panen_kg NUMERIC, p_harga_per_kg NUMERIC,
+                p_status_siap_panen INTEGER, p_kegiatan_default INTEGER DEFAULT 301)
+            RETURNS TABLE (id_panen INTEGER, tanggal DATE, jumlah_panen_kg NUMERIC, harga_per_kg NUMERIC,
+                           id_tanaman INTEGER, id_jadwal_tanam INTEGER, id_kegiatan INTEGER, total_nilai NUMERIC) AS $$
+                SELECT * FROM catat_hasil_panen_massal(ARRAY[p_id_jadwal_tanam], ARRAY[p_tanggal],
+                    ARRAY[p_jumlah_panen_kg], ARRAY[p_harga_per_kg], p_status_siap_panen, p_kegiatan_default);
+            $$ LANGUAGE sql;""",
+        ]),
+        (10, "Outbox CDC: event_perubahan dari Jadwal_Tanam, Hasil_Panen, laporan_masalah + offset_konsumen", [
+            """CREATE TABLE IF NOT EXISTS event_perubahan (
+                id_event BIGSERIAL PRIMARY KEY,
+                xid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+                waktu TIMESTAMPTZ NOT NULL DEFAULT now(),
+                tabel TEXT NOT NULL,
+                operasi VARCHAR(6) NOT NULL CHECK (operasi IN ('INSERT', 'UPDATE', 'DELETE')),
+                kunci BIGINT NOT NULL,
+                data JSONB NOT NULL);""",
+            "CREATE INDEX IF NOT EXISTS idx_event_perubahan_xid ON event_perubahan (xid, id_event);",
+            """CREATE TABLE IF NOT EXISTS offset_konsumen (
+                nama TEXT PRIMARY KEY,
+                xid XID8 NOT NULL DEFAULT '0'::xid8,
+                id_event BIGINT NOT NULL DEFAULT 0,
+                diperbarui_pada TIMESTAMPTZ NOT NULL DEFAULT now());""",
+            # Satu INSERT per statement dari transition table; DELETE mencatat isi baris terakhir.
+            # Kolom tsvector laporan_masalah (dokumen) tidak ikut dikirim.
+            f"""CREATE OR REPLACE FUNCTION catat_event_perubahan() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    INSERT INTO event_perubahan (tabel, operasi, kunci, data)
+                    SELECT lower(TG_TABLE_NAME), TG_OP, (to_jsonb(l) ->> TG_ARGV[0])::bigint, to_jsonb(l) - 'dokumen'
+                    FROM lama l;
+                ELSE
+                    INSERT INTO event_perubahan (tabel, operasi, kunci, data)
+                    SELECT lower(TG_TABLE_NAME), TG_OP, (to_jsonb(b) ->> TG_ARGV[0])::bigint, to_jsonb(b) - 'dokumen'
+                    FROM baru b;
+                END IF;
+                PERFORM pg_notify('{CHANNEL_PERUBAHAN}', lower(TG_TABLE_NAME));
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;""",
+            # Transition table hanya boleh untuk trigger satu event, jadi tiga trigger per tabel
+            *[f"""CREATE TRIGGER trg_cdc_{tabel}_{operasi.lower()} AFTER {operasi} ON {tabel}
+            REFERENCING {"OLD" if operasi == "DELETE" else "NEW"} TABLE AS {"lama" if operasi == "DELETE" else "baru"}
+            FOR EACH STATEMENT EXECUTE FUNCTION catat_event_perubahan('{kunci}');"""
+              for tabel, kunci in TABEL_CDC.items() for operasi in ("INSERT", "UPDATE", "DELETE")],
+        ]),
+        (11, "Metadata tabel yang dipartisi per rentang tanggal (ManajerPartisi)", [
+            """CREATE TABLE IF NOT EXISTS partisi_tabel (
+                tabel TEXT PRIMARY KEY,
+                kolom TEXT NOT NULL,
+                bulan_per_partisi INTEGER NOT NULL CHECK (12 % bulan_per_partisi = 0),
+                dikonversi_pada TIMESTAMPTZ NOT NULL DEFAULT now());""",
+        ]),
+        # Dulu dijalankan setiap aplikasi mulai; ALTER TABLE/ALTER SEQUENCE mengambil ACCESS EXCLUSIVE lock
+        (12, "Sequence ID jadwal tanam, hasil panen, jadwal pemupukan dan pupuk/pestisida", _sql_sequence_id()),
+    ]
+    # Kunci advisory agar dua proses tidak menjalankan migrasi bersamaan
+    KUNCI_ADVISORY = 720091
+    
+    def siapkan_tabel(self, cur):
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrasi (
+            versi INTEGER PRIMARY KEY,
+            deskripsi TEXT NOT NULL,
+            diterapkan_pada TIMESTAMP NOT NULL DEFAULT now()
+        );
+        """)
+    
+    def versi_terpasang(self, cur) -> Dict[int, datetime.datetime]:
+        cur.execute("SELECT versi, diterapkan_pada FROM schema_migrasi ORDER BY versi;")
+        return dict(cur.fetchall())
+    
+    def jalankan(self, conn) -> List[int]:
+        # Setiap versi dijalankan dalam transaksinya sendiri bersama pencatatannya
+        diterapkan = []
+        with conn.cursor() as cur:
+            self.siapkan_tabel(cur)
+            conn.commit()
+            for versi, deskripsi, perintah in self.MIGRASI:
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (self.KUNCI_ADVISORY,))
+                if versi in self.versi_terpasang(cur):
+                    conn.rollback()
+                    continue
                 try:
-                    dosis_per_bibit = float(input("Dosis per Bibit (ml atau gr per tanaman): "))
-                    if dosis_per_bibit > 0:
-                        break
-                    else:
-                        print("Dosis harus lebih dari 0!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+                    for query in perintah:
+                        cur.execute(query)
+                    cur.execute("INSERT INTO schema_migrasi (versi, deskripsi) VALUES (%s, %s);", (versi, deskripsi))
+                    conn.commit()
+                except psycopg2.Error:
+                    conn.rollback()
+                    raise
+                diterapkan.append(versi)
+        return diterapkan
+    
+    def indeks(self) -> List[Tuple[str, str]]:
+        # (nama, perintah) indeks non-unik dari semua migrasi; indeks UNIQUE dipakai ON CONFLICT jadi bagian
+        # skema fungsional, bukan sekadar optimasi
+        hasil = []
+        for _, _, perintah in self.MIGRASI:
+            for query in perintah:
+                cocok = re.match(r"\s*CREATE INDEX IF NOT EXISTS (\w+)", query)
+                if cocok:
+                    hasil.append((cocok.group(1), query))
+        return hasil
+    
+    def atur_indeks(self, conn, aktif: bool = True):
+        # aktif=False melepas indeks non-unik (baseline benchmark tanpa indeks) tanpa menyentuh tabel/fungsi/trigger;
+        # aktif=True memasangnya kembali meskipun versi migrasinya sudah tercatat
+        with conn.cursor() as cur:
+            for nama, query in self.indeks():
+                if aktif:
+                    cur.execute(query)
+                else:
+                    cur.execute(sql.SQL("DROP INDEX IF EXISTS {};").format(sql.Identifier(nama)))
+        conn.commit()
+    
+    def status(self, conn) -> List[Tuple[int, str, Optional[datetime.datetime]]]:
+        with conn.cursor() as cur:
+            self.siapkan_tabel(cur)
+            terpasang = self.versi_terpasang(cur)
+        conn.commit()
+        return [(versi, deskripsi, terpasang.get(versi)) for versi, deskripsi, _ in self.MIGRASI]
 
-            self.cur.execute("SELECT COALESCE(MAX(id_kegiatan), 300) + 1 FROM Jadwal_Pemupukan")
-            id_kegiatan = self.cur.fetchone()[0]
+QUERY_FK_MASUK_PARTISI = """
+SELECT conrelid::regclass::text || '.' || conname FROM pg_constraint
+WHERE confrelid = %s::regclass AND contype = 'f' AND conrelid <> confrelid;
+"""
+# Indeks selain milik constraint (PK/UNIQUE) dibuat ulang di tabel induk dengan definisi yang sama
+QUERY_INDEKS_PARTISI = """
+SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid),
+       i.indisunique AND NOT EXISTS (SELECT 1 FROM pg_attribute a
+                                     WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) AND a.attname = %s)
+FROM pg_index i
+WHERE i.indrelid = %s::regclass AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid);
+"""
+# LIKE ... INCLUDING CONSTRAINTS hanya menyalin CHECK; UNIQUE dibuat ulang jika memuat kolom partisi
+QUERY_UNIQUE_PARTISI = """
+SELECT c.conname, pg_get_constraintdef(c.oid),
+       EXISTS (SELECT 1 FROM pg_attribute a WHERE a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey) AND a.attname = %s)
+FROM pg_constraint c WHERE c.conrelid = %s::regclass AND c.contype = 'u';
+"""
+QUERY_FK_KELUAR_PARTISI = """
+SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f';
+"""
+QUERY_TRIGGER_PARTISI = "SELECT pg_get_triggerdef(oid) FROM pg_trigger WHERE tgrelid = %s::regclass AND NOT tgisinternal;"
+QUERY_PK_PARTISI = """
+SELECT a.attname FROM pg_constraint c
+JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey)
+WHERE c.conrelid = %s::regclass AND c.contype = 'p'
+ORDER BY array_position(c.conkey, a.attnum);
+"""
+QUERY_KOLOM_PARTISI = """
+SELECT attname, pg_get_serial_sequence(%s, attname), attgenerated <> '' FROM pg_attribute
+WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum;
+"""
+QUERY_DAFTAR_PARTISI = """
+SELECT p.tabel, c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+FROM partisi_tabel p
+JOIN pg_inherits i ON i.inhparent = p.tabel::regclass
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE %s::text IS NULL OR p.tabel = %s
+ORDER BY p.tabel, c.relname;
+"""
 
-            # Hitung tanggal pemupukan berdasarkan interval hari dari tanggal sekarang
-            tanggal_pemupukan = datetime.now().date() + timedelta(days=interval_hari)
-            self.cur.execute(
-                "INSERT INTO Jadwal_Pemupukan (id_kegiatan, nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman) VALUES (%s, %s, %s, %s, %s)",
-                (id_kegiatan, nama_kegiatan, tanggal_pemupukan, dosis_per_bibit, id_tanaman)
-            )
-            self.cur.execute(
-                "INSERT INTO Pupuk_Pestisida (id_pupukpestisida, nama_barang, jenis, id_kegiatan) VALUES ((SELECT COALESCE(MAX(id_pupukpestisida), 200) + 1 FROM Pupuk_Pestisida), %s, %s, %s)",
-                (nama_pupuk, jenis, id_kegiatan)
-            )
-            print(f"\nJadwal pemupukan berhasil ditambahkan! ID Kegiatan: {id_kegiatan}")
-        except psycopg2.Error as e:
-            print(f"Error menambah jadwal pemupukan: {e}")
+@dataclass
+class InfoPartisi:
+    tabel: str
+    partisi: str
+    dari: Optional[datetime.date]
+    sampai: Optional[datetime.date]
+    perkiraan_baris: int
+    ukuran_byte: int
 
-    def ubah_JadwalPemupukan(self):
-        print("3: Ubah Jadwal Pemupukan")
+def _awal_periode(tanggal: datetime.date, bulan_per_partisi: int) -> datetime.date:
+    return datetime.date(tanggal.year, (tanggal.month - 1) // bulan_per_partisi * bulan_per_partisi + 1, 1)
+
+def _tambah_bulan(tanggal: datetime.date, bulan: int) -> datetime.date:
+    indeks = tanggal.year * 12 + tanggal.month - 1 + bulan
+    return datetime.date(indeks // 12, indeks % 12 + 1, 1)
+
+def _batas_partisi(ekspresi: str) -> Tuple[Optional[datetime.date], Optional[datetime.date]]:
+    # "FOR VALUES FROM ('2026-01-01') TO ('2026-04-01')", MINVALUE/MAXVALUE -> None
+    cocok = re.search(r"FROM \((.+?)\) TO \((.+?)\)", ekspresi or "")
+    if cocok is None:
+        return None, None
+    return tuple(None if "VALUE" in b else datetime.date.fromisoformat(b.strip("'")) for b in cocok.groups())
+
+class ManajerPartisi:
+    # Tabel biasa dikonversi sekali menjadi tabel partisi RANGE (tanggal), partisi ke depan dibuat
+    # berkala oleh PenjadwalStatus, dan partisi lama dilepas/diarsip: retensi jadi operasi metadata,
+    # bukan DELETE massal. Indeks, foreign key keluar dan trigger (rekap panen, CDC) dipindah ke induk.
+    def __init__(self, pool: SipataniConnectionPool, ke_depan: int = PARTISI_KE_DEPAN):
+        self.pool = pool
+        self.ke_depan = ke_depan
+    
+    def konversi(self, tabel: str, bulan_per_partisi: int = BULAN_PER_PARTISI) -> Dict[str, Any]:
+        if tabel not in TABEL_PARTISI:
+            raise ValidasiGagal(f"Tabel harus salah satu dari: {', '.join(TABEL_PARTISI)}")
+        if bulan_per_partisi < 1 or 12 % bulan_per_partisi:
+            raise ValidasiGagal("Bulan per partisi harus pembagi 12 (1, 2, 3, 4, 6 atau 12)")
+        kolom_kunci = TABEL_PARTISI[tabel]
+        lama = f"{tabel}_konversi"
+        mulai = time.perf_counter()
+        # Satu transaksi: gagal di tengah jalan berarti tabel asli utuh
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            cur.execute(sql.SQL("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE;").format(sql.Identifier(tabel)))
+            cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass;", (tabel,))
+            if cur.fetchone()[0] == "p":
+                raise ValidasiGagal(f"Tabel {tabel} sudah dipartisi")
+            # Unique key yang dirujuk FK harus memuat kolom partisi, jadi tabel yang dirujuk tidak bisa dipartisi
+            cur.execute(QUERY_FK_MASUK_PARTISI, (tabel,))
+            fk_masuk = [row[0] for row in cur.fetchall()]
+            if fk_masuk:
+                raise ValidasiGagal(f"{tabel} dirujuk foreign key {', '.join(fk_masuk)}; PostgreSQL mewajibkan "
+                                    f"kolom {kolom_kunci} ada di key yang dirujuk, ubah FK tersebut dulu")
+            
+            # Definisi turunan dicatat sebelum tabel lama di-rename (teksnya tetap menyebut nama asli)
+            cur.execute(QUERY_INDEKS_PARTISI, (kolom_kunci, tabel))
+            indeks = cur.fetchall()
+            cur.execute(QUERY_UNIQUE_PARTISI, (kolom_kunci, tabel))
+            unique = cur.fetchall()
+            cur.execute(QUERY_FK_KELUAR_PARTISI, (tabel,))
+            fk_keluar = cur.fetchall()
+            cur.execute(QUERY_TRIGGER_PARTISI, (tabel,))
+            trigger = [row[0] for row in cur.fetchall()]
+            cur.execute(QUERY_PK_PARTISI, (tabel,))
+            pk = [row[0] for row in cur.fetchall()]
+            cur.execute(QUERY_KOLOM_PARTISI, (tabel, tabel))
+            kolom = cur.fetchall()
+            cur.execute(sql.SQL("SELECT min({0}), max({0}) FROM {1};").format(
+                sql.Identifier(kolom_kunci), sql.Identifier(tabel)))
+            tanggal_min, tanggal_maks = cur.fetchone()
+            
+            cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {};").format(sql.Identifier(tabel), sql.Identifier(lama)))
+            cur.execute(sql.SQL("""
+            CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING GENERATED INCLUDING CONSTRAINTS INCLUDING STORAGE)
+            PARTITION BY RANGE ({});
+            """).format(sql.Identifier(tabel), sql.Identifier(lama), sql.Identifier(kolom_kunci)))
+            # Sequence SERIAL ikut terhapus bersama pemiliknya, jadi pindahkan ke tabel induk
+            for nama, sequence, _ in kolom:
+                if sequence:
+                    cur.execute(sql.SQL("ALTER SEQUENCE {} OWNED BY {}.{};").format(
+                        sql.SQL(sequence), sql.Identifier(tabel), sql.Identifier(nama)))
+            hari_ini = datetime.date.today()
+            dari = _awal_periode(min(tanggal_min or hari_ini, hari_ini), bulan_per_partisi)
+            sampai = _tambah_bulan(_awal_periode(max(tanggal_maks or hari_ini, hari_ini), bulan_per_partisi),
+                                   bulan_per_partisi * (self.ke_depan + 1))
+            jumlah_partisi = 0
+            while dari < sampai:
+                jumlah_partisi += self._buat_partisi(cur, tabel, dari, bulan_per_partisi)
+                dari = _tambah_bulan(dari, bulan_per_partisi)
+            jumlah_partisi += self._buat_partisi_default(cur, tabel)
+            
+            # Salin dulu, baru buat PK/indeks/trigger: lebih cepat dan trigger CDC/rekap tidak ikut terpicu
+            kolom_salin = sql.SQL(", ").join(sql.Identifier(nama) for nama, _, generated in kolom if not generated)
+            cur.execute(sql.SQL("INSERT INTO {0} ({2}) SELECT {2} FROM {1};").format(
+                sql.Identifier(tabel), sql.Identifier(lama), kolom_salin))
+            jumlah_baris = cur.rowcount
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(lama)))
+            if pk:
+                # PK harus memuat kolom partisi; keunikan ID sendiri tetap dijaga sequence
+                kolom_pk = pk if kolom_kunci in pk else [*pk, kolom_kunci]
+                cur.execute(sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({});").format(
+                    sql.Identifier(tabel), sql.SQL(", ").join(sql.Identifier(k) for k in kolom_pk)))
+            indeks_dilewati = []
+            for nama, definisi, memuat_kunci in unique:
+                if not memuat_kunci:
+                    indeks_dilewati.append(nama)
+                    continue
+                cur.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {};").format(
+                    sql.Identifier(tabel), sql.Identifier(nama), sql.SQL(definisi)))
+            for nama, definisi, unik_tanpa_kunci in indeks:
+                # Indeks unik tanpa kolom partisi tidak diizinkan di tabel partisi
+                if unik_tanpa_kunci:
+                    indeks_dilewati.append(nama)
+                    continue
+                cur.execute(definisi)
+            for nama, definisi in fk_keluar:
+                cur.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {};").format(
+                    sql.Identifier(tabel), sql.Identifier(nama), sql.SQL(definisi)))
+            for definisi in trigger:
+                cur.execute(definisi)
+            cur.execute("""
+            INSERT INTO partisi_tabel (tabel, kolom, bulan_per_partisi) VALUES (%s, %s, %s)
+            ON CONFLICT (tabel) DO UPDATE SET kolom = EXCLUDED.kolom, bulan_per_partisi = EXCLUDED.bulan_per_partisi,
+                dikonversi_pada = now();
+            """, (tabel, kolom_kunci, bulan_per_partisi))
+            cur.execute(sql.SQL("ANALYZE {};").format(sql.Identifier(tabel)))
+        return {"tabel": tabel, "baris": jumlah_baris, "partisi": jumlah_partisi, "indeks_dilewati": indeks_dilewati,
+                "durasi_detik": round(time.perf_counter() - mulai, 3)}
+    
+    def _buat_partisi(self, cur, tabel: str, dari: datetime.date, bulan_per_partisi: int) -> int:
+        nama = f"{tabel}_p{dari:%Y%m}"
+        sampai = _tambah_bulan(dari, bulan_per_partisi)
+        cur.execute("SELECT to_regclass(%s) IS NULL;", (nama,))
+        if not cur.fetchone()[0]:
+            return 0
+        # Baris di partisi DEFAULT yang masuk rentang baru membuat CREATE ... PARTITION OF gagal, jadi
+        # dipindah lewat tabel sementara. Langsung ke partisi: trigger statement di induk tidak terpicu.
+        default = f"{tabel}_default"
+        sementara = f"{nama}_pindah"
+        kolom_kunci = sql.Identifier(TABEL_PARTISI[tabel])
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (default,))
+        ada_default = cur.fetchone()[0]
+        jumlah_pindah = 0
+        if ada_default:
+            cur.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {});").format(
+                sql.Identifier(sementara), sql.Identifier(default)))
+            cur.execute(sql.SQL("""
+            WITH pindah AS (DELETE FROM {1} WHERE {2} >= %s AND {2} < %s RETURNING *)
+            INSERT INTO {0} SELECT * FROM pindah;
+            """).format(sql.Identifier(sementara), sql.Identifier(default), kolom_kunci), (dari, sampai))
+            jumlah_pindah = cur.rowcount
+        cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s);").format(
+            sql.Identifier(nama), sql.Identifier(tabel)), (dari, sampai))
+        if ada_default:
+            if jumlah_pindah:
+                cur.execute(QUERY_KOLOM_PARTISI, (tabel, tabel))
+                kolom_salin = sql.SQL(", ").join(
+                    sql.Identifier(kolom) for kolom, _, generated in cur.fetchall() if not generated)
+                cur.execute(sql.SQL("INSERT INTO {0} ({2}) SELECT {2} FROM {1};").format(
+                    sql.Identifier(nama), sql.Identifier(sementara), kolom_salin))
+            cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(sementara)))
+        return 1
+    
+    def _buat_partisi_default(self, cur, tabel: str) -> int:
+        # Tanggal di luar partisi yang sudah dibuat (entri mundur, jauh ke depan) masuk ke sini, bukan error
+        nama = f"{tabel}_default"
+        cur.execute("SELECT to_regclass(%s) IS NULL;", (nama,))
+        if not cur.fetchone()[0]:
+            return 0
+        cur.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} DEFAULT;").format(
+            sql.Identifier(nama), sql.Identifier(tabel)))
+        return 1
+    
+    def siapkan_mendatang(self, tanggal: Optional[datetime.date] = None) -> int:
+        # Idempoten: partisi yang sudah ada dilewati
+        tanggal = tanggal or datetime.date.today()
+        dibuat = 0
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            cur.execute("SELECT tabel, bulan_per_partisi FROM partisi_tabel WHERE to_regclass(tabel) IS NOT NULL;")
+            for tabel, bulan_per_partisi in cur.fetchall():
+                # Tabel yang dikonversi sebelum ada partisi DEFAULT mendapatkannya di sini
+                dibuat += self._buat_partisi_default(cur, tabel)
+                dari = _awal_periode(tanggal, bulan_per_partisi)
+                for _ in range(self.ke_depan + 1):
+                    dibuat += self._buat_partisi(cur, tabel, dari, bulan_per_partisi)
+                    dari = _tambah_bulan(dari, bulan_per_partisi)
+        return dibuat
+    
+    def daftar_partisi(self, tabel: Optional[str] = None) -> List[InfoPartisi]:
+        with self.pool.koneksi() as conn, conn.cursor() as cur:
+            cur.execute(QUERY_DAFTAR_PARTISI, (tabel, tabel))
+            return [InfoPartisi(induk, nama, *_batas_partisi(batas), max(baris, 0), ukuran)
+                    for induk, nama, batas, baris, ukuran in cur.fetchall()]
+    
+    def lepas_lama(self, tabel: str, sebelum: datetime.date, arsip_dir: Optional[str] = None,
+                   hapus: bool = False) -> List[str]:
+        # Partisi yang seluruh rentangnya < sebelum: DETACH, lalu diarsip ke CSV dan di-DROP, di-DROP saja,
+        # atau dibiarkan sebagai tabel lepas. Satu transaksi per partisi; trigger CDC/rekap tidak terpicu.
+        if tabel not in TABEL_PARTISI:
+            raise ValidasiGagal(f"Tabel harus salah satu dari: {', '.join(TABEL_PARTISI)}")
+        dilepas = []
+        for info in self.daftar_partisi(tabel):
+            if info.sampai is None or info.sampai > sebelum:
+                continue
+            with self.pool.koneksi() as conn, conn.cursor() as cur:
+                cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {};").format(
+                    sql.Identifier(tabel), sql.Identifier(info.partisi)))
+                if arsip_dir:
+                    path = os.path.join(arsip_dir, f"{info.partisi}.csv")
+                    sementara = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+                    try:
+                        with open(sementara, "wb") as f:
+                            cur.copy_expert(sql.SQL("COPY {} TO STDOUT WITH (FORMAT csv, HEADER);").format(
+                                sql.Identifier(info.partisi)).as_string(conn), f)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        os.replace(sementara, path)
+                    finally:
+                        if os.path.exists(sementara):
+                            os.remove(sementara)
+                if arsip_dir or hapus:
+                    cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(info.partisi)))
+            dilepas.append(info.partisi)
+        return dilepas
+
+class PenasihatQuery:
+    # Query yang dijalankan manager/service beserta contoh parameternya.
+    # contoh berisi ID yang benar-benar ada di database agar rencana eksekusinya realistis.
+    QUERY_DIAWASI = [
+        ("lihat_jadwal", QUERY_LIHAT_JADWAL_HALAMAN, lambda c: (0, UKURAN_HALAMAN_JADWAL)),
+        ("ambil_jadwal", QUERY_AMBIL_JADWAL, lambda c: (c["jadwal"],)),
+        ("hitung_data_terkait", QUERY_HITUNG_DATA_TERKAIT, lambda c: (c["jadwal"],) * 3),
+        ("jadwal_siap_panen", QUERY_JADWAL_SIAP_PANEN, lambda c: (STATUS_SIAP_PANEN,)),
+        ("hapus_jadwal", "hapus_jadwal_massal", lambda c: FilterJadwal(id_jadwal_tanam=[c["jadwal"]])),
+        ("pratinjau_hapus_musim", "pratinjau_hapus_massal",
+         lambda c: FilterJadwal(tanggal_selesai=datetime.date.today() - datetime.timedelta(days=365))),
+        ("lihat_jadwal_pemupukan", QUERY_LIHAT_PEMUPUKAN, lambda c: ()),
+        ("ambil_jadwal_pemupukan", QUERY_AMBIL_PEMUPUKAN, lambda c: (c["kegiatan"],)),
+        ("hapus_pupuk_kegiatan", QUERY_HAPUS_PUPUK_PESTISIDA_KEGIATAN, lambda c: (c["kegiatan"],)),
+        ("cek_kegiatan", QUERY_CEK_KEGIATAN, lambda c: (c["kegiatan"],)),
+        ("lihat_stok", QUERY_LIHAT_STOK, lambda c: ()),
+        ("cari_laporan", _query_cari_laporan(FilterLaporan(kata_kunci="hama", status_penanganan="Belum"))[0],
+         lambda c: _query_cari_laporan(FilterLaporan(kata_kunci="hama", status_penanganan="Belum"))[1]),
+        ("ambil_stok", QUERY_AMBIL_STOK, lambda c: (c["stok"],)),
+        ("referensi_tanaman", ReferensiCache.QUERY["tanaman"][0], lambda c: ()),
+        ("referensi_lahan", ReferensiCache.QUERY["lahan"][0], lambda c: ()),
+    ]
+    QUERY_CONTOH = """
+    SELECT
+        (SELECT max(id_jadwal_tanam) FROM Jadwal_Tanam),
+        (SELECT max(id_tanaman) FROM Tanaman),
+        (SELECT max(id_kegiatan) FROM Jadwal_Pemupukan),
+        (SELECT max(id_pupukpestisida) FROM Pupuk_Pestisida);
+    """
+    
+    def __init__(self, pool: SipataniConnectionPool, ambang_seq_scan: int = AMBANG_SEQ_SCAN):
+        self.pool = pool
+        self.ambang_seq_scan = ambang_seq_scan
+    
+    def analisis(self) -> List[Dict[str, Any]]:
+        # EXPLAIN ANALYZE benar-benar mengeksekusi query (termasuk DELETE),
+        # jadi seluruh analisis berjalan dalam satu transaksi yang selalu di-rollback
+        conn = self.pool.getconn()
         try:
-            print("\nUBAH JADWAL PEMUPUKAN")
-            print("=" * 30)
-            self.lihat_JadwalPemupukan()
+            with conn.cursor() as cur:
+                cur.execute(self.QUERY_CONTOH)
+                contoh = dict(zip(("jadwal", "tanaman", "kegiatan", "stok"), (v or 0 for v in cur.fetchone())))
+                hasil = []
+                for nama, query, buat_param in self.QUERY_DIAWASI:
+                    param = buat_param(contoh)
+                    if isinstance(param, FilterJadwal):
+                        kondisi, param = _kondisi_filter_jadwal(param)
+                        query = (QUERY_HAPUS_JADWAL_MASSAL if query == "hapus_jadwal_massal"
+                                 else QUERY_PRATINJAU_HAPUS_MASSAL).format(kondisi=kondisi)
+                    cur.execute("SAVEPOINT analisis;")
+                    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.strip().rstrip(";"), param)
+                    rencana = cur.fetchone()[0]
+                    cur.execute("ROLLBACK TO SAVEPOINT analisis;")
+                    hasil.append(self._ringkas(nama, json.loads(rencana) if isinstance(rencana, str) else rencana))
+            return hasil
+        finally:
+            conn.rollback()
+            self.pool.putconn(conn)
+    
+    def _ringkas(self, nama: str, rencana: list) -> Dict[str, Any]:
+        plan = rencana[0]
+        seq_scan = []
+        antrian = [plan["Plan"]]
+        while antrian:
+            node = antrian.pop()
+            antrian.extend(node.get("Plans", []))
+            if node["Node Type"] == "Seq Scan":
+                dibaca = (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * node.get("Actual Loops", 1)
+                seq_scan.append((node["Relation Name"], dibaca))
+        return {
+            "query": nama,
+            "waktu_ms": plan.get("Execution Time", 0.0),
+            "shared_hit": plan["Plan"].get("Shared Hit Blocks", 0),
+            "shared_read": plan["Plan"].get("Shared Read Blocks", 0),
+            "seq_scan": seq_scan,
+            "perlu_indeks": sorted({tabel for tabel, dibaca in seq_scan if dibaca >= self.ambang_seq_scan}),
+        }
+    
+    def tampilkan(self, hasil: List[Dict[str, Any]]):
+        tabel = [
+            [h["query"], f"{h['waktu_ms']:.3f}", h["shared_hit"], h["shared_read"],
+             ", ".join(f"{t} ({n} baris)" for t, n in h["seq_scan"]) or "-",
+             ", ".join(h["perlu_indeks"]) or "OK"]
+            for h in hasil
+        ]
+        print(tabulate(tabel, headers=["Query", "Waktu (ms)", "Buffer Hit", "Buffer Read", "Seq Scan", "Perlu Indeks"],
+                       tablefmt="grid"))
+        bermasalah = [h["query"] for h in hasil if h["perlu_indeks"]]
+        if bermasalah:
+            print(f"\n{len(bermasalah)} query melakukan Seq Scan >= {self.ambang_seq_scan} baris: {', '.join(bermasalah)}")
+        else:
+            print("\nTidak ada Seq Scan besar yang ditemukan")
+
+class GeneratorDataSintetis:
+    # Skema dasar untuk database benchmark kosong (di database aplikasi tabel-tabel ini sudah ada)
+    DDL = [
+        "CREATE TABLE IF NOT EXISTS Petani (id_petani INTEGER PRIMARY KEY, nama_petani VARCHAR(100) NOT NULL);",
+        """CREATE TABLE IF NOT EXISTS Lahan (
+            id_lahan INTEGER PRIMARY KEY, luas_lahan NUMERIC(10, 2) NOT NULL, jumlah_pegawai INTEGER NOT NULL,
+            id_petani INTEGER NOT NULL REFERENCES Petani (id_petani));""",
+        """CREATE TABLE IF NOT EXISTS Tanaman (
+            id_tanaman INTEGER PRIMARY KEY, nama_tanaman VARCHAR(100) NOT NULL,
+            durasi_tanam INTEGER NOT NULL, jarak_antar_tanaman INTEGER NOT NULL);""",
+        "CREATE TABLE IF NOT EXISTS Status_Jadwal (id_status_jadwal INTEGER PRIMARY KEY, status VARCHAR(50) NOT NULL);",
+        """CREATE TABLE IF NOT EXISTS Jadwal_Tanam (
+            id_jadwal_tanam INTEGER PRIMARY KEY, tanggal DATE NOT NULL,
+            id_lahan INTEGER NOT NULL REFERENCES Lahan (id_lahan),
+            id_tanaman INTEGER NOT NULL REFERENCES Tanaman (id_tanaman),
+            status_jadwal_id INTEGER NOT NULL REFERENCES Status_Jadwal (id_status_jadwal));""",
+        """CREATE TABLE IF NOT EXISTS Jadwal_Pemupukan (
+            id_kegiatan INTEGER PRIMARY KEY, nama_kegiatan VARCHAR(100) NOT NULL, tanggal_pemupukan DATE NOT NULL,
+            dosis_per_bibit_tanaman NUMERIC(10, 2) NOT NULL, id_tanaman INTEGER NOT NULL REFERENCES Tanaman (id_tanaman));""",
+        """CREATE TABLE IF NOT EXISTS Pupuk_Pestisida (
+            id_pupukpestisida INTEGER PRIMARY KEY, nama_barang VARCHAR(100) NOT NULL, jenis VARCHAR(20) NOT NULL,
+            id_kegiatan INTEGER NOT NULL REFERENCES Jadwal_Pemupukan (id_kegiatan));""",
+        """CREATE TABLE IF NOT EXISTS Hasil_Panen (
+            id_panen INTEGER PRIMARY KEY, tanggal DATE NOT NULL, jumlah_panen_kg NUMERIC(12, 2) NOT NULL,
+            harga_per_kg NUMERIC(12, 2) NOT NULL, id_tanaman INTEGER NOT NULL REFERENCES Tanaman (id_tanaman),
+            id_jadwal_tanam INTEGER NOT NULL REFERENCES Jadwal_Tanam (id_jadwal_tanam),
+            id_kegiatan INTEGER NOT NULL REFERENCES Jadwal_Pemupukan (id_kegiatan));""",
+        """CREATE TABLE IF NOT EXISTS Masalah_Tanam (
+            id_masalah SERIAL PRIMARY KEY, id_jadwal_tanam INTEGER NOT NULL REFERENCES Jadwal_Tanam (id_jadwal_tanam),
+            deskripsi TEXT NOT NULL);""",
+    ]
+    # Urutan pengisian; jumlah baris tiap tabel diturunkan dari skala (= jumlah jadwal tanam)
+    TABEL = ["petani", "lahan", "tanaman", "status_jadwal", "jadwal_tanam", "jadwal_pemupukan",
+             "pupuk_pestisida", "hasil_panen", "masalah_tanam", "laporan_masalah"]
+    QUERY_ISI = {
+        "petani": """
+            INSERT INTO Petani (id_petani, nama_petani)
+            SELECT i, 'Petani ' || i FROM generate_series(1, %(petani)s) i;""",
+        "lahan": """
+            INSERT INTO Lahan (id_lahan, luas_lahan, jumlah_pegawai, id_petani)
+            SELECT i, round((0.5 + random() * 9.5)::numeric, 2), 1 + floor(random() * 10)::int,
+                   1 + floor(random() * %(petani)s)::int
+            FROM generate_series(1, %(lahan)s) i;""",
+        "tanaman": """
+            INSERT INTO Tanaman (id_tanaman, nama_tanaman, durasi_tanam, jarak_antar_tanaman)
+            SELECT i, 'Tanaman ' || i, 60 + floor(random() * 120)::int, 20 + floor(random() * 80)::int
+            FROM generate_series(1, %(tanaman)s) i;""",
+        "status_jadwal": """
+            INSERT INTO Status_Jadwal (id_status_jadwal, status)
+            VALUES (%(terjadwal)s, 'Terjadwal'), (%(berlangsung)s, 'Sedang Berlangsung'), (%(siap_panen)s, 'Siap Panen');""",
+        "jadwal_tanam": """
+            INSERT INTO Jadwal_Tanam (id_jadwal_tanam, tanggal, id_lahan, id_tanaman, status_jadwal_id)
+            SELECT %(id_jadwal)s + i, DATE '2020-01-01' + floor(random() * 1800)::int,
+                   1 + floor(random() * %(lahan)s)::int, 1 + floor(random() * %(tanaman)s)::int,
+                   %(terjadwal)s + floor(random() * 3)::int
+            FROM generate_series(1, %(jadwal_tanam)s) i;""",
+        "jadwal_pemupukan": """
+            INSERT INTO Jadwal_Pemupukan (id_kegiatan, nama_kegiatan, tanggal_pemupukan, dosis_per_bibit_tanaman, id_tanaman)
+            SELECT %(id_kegiatan)s + i, 'Pemupukan ' || i, DATE '2020-01-01' + floor(random() * 1800)::int,
+                   round((0.1 + random() * 5)::numeric, 2), 1 + floor(random() * %(tanaman)s)::int
+            FROM generate_series(1, %(jadwal_pemupukan)s) i;""",
+        "pupuk_pestisida": """
+            INSERT INTO Pupuk_Pestisida (id_pupukpestisida, nama_barang, jenis, id_kegiatan)
+            SELECT %(id_pupuk)s + i, 'Barang ' || i, CASE WHEN random() < 0.5 THEN 'Pupuk' ELSE 'Pestisida' END,
+                   %(id_kegiatan)s + i
+            FROM generate_series(1, %(jadwal_pemupukan)s) i;""",
+        "hasil_panen": """
+            INSERT INTO Hasil_Panen (id_panen, tanggal, jumlah_panen_kg, harga_per_kg, id_tanaman, id_jadwal_tanam, id_kegiatan)
+            SELECT %(id_panen)s + row_number() OVER (ORDER BY id_jadwal_tanam), tanggal + 90,
+                   round((10 + random() * 990)::numeric, 2), round((2000 + random() * 18000)::numeric, 2),
+                   id_tanaman, id_jadwal_tanam, %(id_kegiatan)s + 1 + floor(random() * %(jadwal_pemupukan)s)::int
+            FROM (SELECT * FROM Jadwal_Tanam ORDER BY id_jadwal_tanam LIMIT %(hasil_panen)s) jt;""",
+        "masalah_tanam": """
+            INSERT INTO Masalah_Tanam (id_jadwal_tanam, deskripsi)
+            SELECT %(id_jadwal)s + 1 + floor(random() * %(jadwal_tanam)s)::int, 'Masalah sintetis ' || i
+            FROM generate_series(1, %(masalah_tanam)s) i;""",
+        "laporan_masalah": """
+            INSERT INTO laporan_masalah (id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi)
+            SELECT %(id_jadwal)s + 1 + floor(random() * %(jadwal_tanam)s)::int,
+                   DATE '2020-01-01' + floor(random() * 1800)::int,
+                   (ARRAY['Hama', 'Penyakit', 'Cuaca', 'Irigasi'])[1 + floor(random() * 4)::int],
+                   'Laporan sintetis ' || i || ': ' || (ARRAY['wereng batang coklat', 'ulat grayak', 'busuk akar',
+                       'daun menguning', 'kekeringan', 'banjir', 'jamur bercak daun', 'tikus sawah'])[1 + floor(random() * 8)::int],
+                   (ARRAY['Belum', 'Proses', 'Selesai'])[1 + floor(random() * 3)::int], NULL
+            FROM generate_series(1, %(laporan_masalah)s) i;""",
+    }
+    
+    def __init__(self, conn, skala: int, seed: int = 42):
+        self.conn = conn
+        self.skala = skala
+        self.seed = seed
+        # ID awal mengikuti ID_SEQUENCES agar data sintetis mirip data asli
+        self.param = {
+            "petani": max(10, skala // 100),
+            "lahan": max(20, skala // 50),
+            "tanaman": max(10, min(500, skala // 1000)),
+            "jadwal_tanam": skala,
+            "jadwal_pemupukan": max(10, skala // 10),
+            "hasil_panen": skala // 2,
+            "masalah_tanam": skala // 10,
+            "laporan_masalah": skala // 10,
+            "id_jadwal": ID_SEQUENCES["jadwal_tanam_id_seq"][2],
+            "id_panen": ID_SEQUENCES["hasil_panen_id_seq"][2],
+            "id_kegiatan": ID_SEQUENCES["jadwal_pemupukan_id_seq"][2],
+            "id_pupuk": ID_SEQUENCES["pupuk_pestisida_id_seq"][2],
+            "terjadwal": STATUS_TERJADWAL,
+            "berlangsung": STATUS_SEDANG_BERLANGSUNG,
+            "siap_panen": STATUS_SIAP_PANEN,
+        }
+    
+    def bangkitkan(self) -> Dict[str, Dict[str, float]]:
+        # Deterministik: setseed + random() dalam satu sesi tanpa parallel query
+        statistik = {}
+        with self.conn.cursor() as cur:
+            for query in self.DDL:
+                cur.execute(query)
+            SipataniService(koneksi=self.conn).siapkan_tabel_laporan()
+            cur.execute("TRUNCATE Petani, Lahan, Tanaman, Status_Jadwal, Jadwal_Tanam, Jadwal_Pemupukan, "
+                        "Pupuk_Pestisida, Hasil_Panen, Masalah_Tanam, laporan_masalah RESTART IDENTITY CASCADE;")
+            cur.execute("SET max_parallel_workers_per_gather = 0;")
+            cur.execute("SELECT setseed(%s);", ((self.seed % 1_000_000) / 1_000_000,))
+            for tabel in self.TABEL:
+                mulai = time.perf_counter()
+                cur.execute(self.QUERY_ISI[tabel], self.param)
+                durasi = time.perf_counter() - mulai
+                statistik[tabel] = {"baris": cur.rowcount, "detik": round(durasi, 3),
+                                    "baris_per_detik": round(cur.rowcount / max(durasi, 1e-9))}
+            cur.execute("RESET max_parallel_workers_per_gather;")
+        self.conn.commit()
+        with self.conn.cursor() as cur:
+            # TRUNCATE ... RESTART IDENTITY mengulang sequence dari awal, padahal ID sintetis sudah terisi
+            for nama_seq in ID_SEQUENCES:
+                selaraskan_sequence(cur, nama_seq)
+            cur.execute("ANALYZE;")
+        self.conn.commit()
+        return statistik
+
+def _persentil(data: List[float], p: float) -> float:
+    urut = sorted(data)
+    return urut[max(0, math.ceil(p / 100 * len(urut)) - 1)]
+
+def _rss_puncak_kb() -> Optional[int]:
+    # ru_maxrss dalam KB di Linux, byte di macOS
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if platform.system() == "Darwin" else rss
+
+class BenchmarkSipatani:
+    def __init__(self, pool: SipataniConnectionPool, skala: int, seed: int = 42, iterasi: int = 50, pemanasan: int = 5):
+        self.pool = pool
+        self.skala = skala
+        self.iterasi = iterasi
+        self.pemanasan = pemanasan
+        self.acak = random.Random(seed)
+        self.service = SipataniService(pool, ReferensiCache(pool))
+        self.db = SipataniDatabase(pool)
+        self.jadwal_manager = JadwalTanamManager(self.db, service=self.service)
+        self.id_jadwal_awal = ID_SEQUENCES["jadwal_tanam_id_seq"][2]
+        self.id_kegiatan_awal = ID_SEQUENCES["jadwal_pemupukan_id_seq"][2]
+        self.id_pupuk_awal = ID_SEQUENCES["pupuk_pestisida_id_seq"][2]
+        self.jumlah_kegiatan = max(10, skala // 10)
+    
+    def _id_jadwal(self) -> int:
+        return self.id_jadwal_awal + self.acak.randint(1, self.skala)
+    
+    def _id_kegiatan(self) -> int:
+        return self.id_kegiatan_awal + self.acak.randint(1, self.jumlah_kegiatan)
+    
+    def _skenario(self) -> List[Tuple[str, Any]]:
+        # Setiap fungsi mengembalikan jumlah baris yang diproses (untuk baris/detik)
+        s = self.service
+        tanaman = [t["id"] for t in s.daftar_tanaman()]
+        lahan = [l["id"] for l in s.daftar_lahan()]
+        siap_panen = [j.id_jadwal_tanam for j in s.jadwal_siap_panen()] or [self._id_jadwal()]
+        
+        def tambah_edit_hapus_jadwal():
+            jadwal = s.tambah_jadwal(JadwalTanamInput(datetime.date(2024, 1, 1), self.acak.choice(lahan), self.acak.choice(tanaman)))
+            s.edit_jadwal(PerubahanJadwal(jadwal.id_jadwal_tanam, status_jadwal_id=STATUS_SEDANG_BERLANGSUNG))
+            s.hapus_jadwal(jadwal.id_jadwal_tanam)
+            return 3
+        
+        def siklus_pemupukan():
+            kegiatan = s.tambah_jadwal_pemupukan(JadwalPemupukanInput(self.acak.choice(tanaman), "Pupuk", "Bench", "Urea", 7, 1.5))
+            s.ubah_jadwal_pemupukan(PerubahanJadwalPemupukan(kegiatan.id_kegiatan, dosis_per_bibit=2.0))
+            s.hapus_jadwal_pemupukan(kegiatan.id_kegiatan)
+            return 3
+        
+        def siklus_stok():
+            stok = s.tambah_stok(StokInput("Bench", "Pestisida", self._id_kegiatan()))
+            s.hapus_stok(stok.id_pupukpestisida)
+            return 2
+        
+        def scan_semua_jadwal():
+            jumlah = 0
+            with self.db.sesi():
+                for halaman in self.jadwal_manager.iter_halaman_jadwal(ukuran_halaman=5000):
+                    jumlah += len(halaman)
+            return jumlah
+        
+        return [
+            ("referensi", lambda: len(s.daftar_tanaman()) + len(s.daftar_lahan()) + len(s.daftar_status_jadwal())),
+            ("lihat_jadwal_halaman_pertama", lambda: len(s.lihat_jadwal().data)),
+            ("lihat_jadwal_halaman_dalam", lambda: len(s.lihat_jadwal(self._id_jadwal()).data)),
+            ("ambil_jadwal", lambda: bool(s.ambil_jadwal(self._id_jadwal()))),
+            ("hitung_data_terkait", lambda: sum(s.hitung_data_terkait(self._id_jadwal()).values())),
+            ("jadwal_siap_panen", lambda: len(s.jadwal_siap_panen())),
+            ("pratinjau_hapus_massal", lambda: s.pratinjau_hapus_massal(
+                FilterJadwal(tanggal_selesai=datetime.date(2020, 3, 1))).jadwal_tanam),
+            ("tambah_edit_hapus_jadwal", tambah_edit_hapus_jadwal),
+            ("input_hasil_panen", lambda: bool(s.input_hasil_panen(
+                HasilPanenInput(self.acak.choice(siap_panen), datetime.date(2024, 6, 1), 100, 5000)))),
+            ("input_hasil_panen_massal_100", lambda: len(s.input_hasil_panen_massal([
+                HasilPanenInput(self.acak.choice(siap_panen), datetime.date(2024, 6, 1), 100, 5000) for _ in range(100)]))),
+            ("lihat_jadwal_pemupukan", lambda: len(s.lihat_jadwal_pemupukan())),
+            ("ambil_jadwal_pemupukan", lambda: bool(s.ambil_jadwal_pemupukan(self._id_kegiatan()))),
+            ("siklus_pemupukan", siklus_pemupukan),
+            ("lihat_stok", lambda: len(s.lihat_stok())),
+            ("ambil_stok", lambda: bool(s.ambil_stok(self.id_pupuk_awal + self.acak.randint(1, self.jumlah_kegiatan)))),
+            ("siklus_stok", siklus_stok),
+            ("saldo_stok", lambda: len(s.daftar_saldo_stok())),
+            ("proyeksi_kekurangan_stok", lambda: len(s.proyeksi_kekurangan_stok(365, semua=True))),
+            ("scan_semua_jadwal", scan_semua_jadwal),
+            ("pemupukan_jatuh_tempo_30_hari", lambda: len(s.pemupukan_jatuh_tempo(30, datetime.date(2022, 1, 1)))),
+            ("laporan_panen_per_tanaman", lambda: len(s.laporan_panen("tanaman"))),
+            ("laporan_panen_per_bulan", lambda: len(s.laporan_panen("bulan"))),
+            ("cari_laporan_kata_kunci", lambda: len(s.cari_laporan(FilterLaporan(kata_kunci="ulat grayak")).data)),
+            ("cari_laporan_filter", lambda: len(s.cari_laporan(
+                FilterLaporan(status_penanganan="Belum", tanggal_mulai=datetime.date(2023, 1, 1))).data)),
+        ] + ([("proyeksi_perencanaan", lambda: len(PipelinePerencanaan(self.pool).hitung().id_jadwal_tanam))]
+             if np is not None else [])
+    
+    def jalankan(self, hanya: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        hasil = []
+        for nama, fungsi in self._skenario():
+            if hanya and nama not in hanya:
+                continue
+            # Listing penuh tidak diulang sebanyak query titik
+            iterasi = max(1, self.iterasi // 10) if nama.startswith(("lihat_", "scan_", "jadwal_siap")) else self.iterasi
+            for _ in range(min(self.pemanasan, iterasi)):
+                fungsi()
+            latensi, baris = [], 0
+            for _ in range(iterasi):
+                mulai = time.perf_counter()
+                baris += fungsi()
+                latensi.append(time.perf_counter() - mulai)
+            total = sum(latensi)
+            hasil.append({
+                "nama": nama,
+                "iterasi": iterasi,
+                "p50_ms": round(_persentil(latensi, 50) * 1000, 3),
+                "p95_ms": round(_persentil(latensi, 95) * 1000, 3),
+                "p99_ms": round(_persentil(latensi, 99) * 1000, 3),
+                "rata_ms": round(total / iterasi * 1000, 3),
+                "baris_per_detik": round(baris / max(total, 1e-9)),
+                "rss_puncak_kb": _rss_puncak_kb(),
+            })
+            print(f"{nama:32} p50 {hasil[-1]['p50_ms']:>10.3f} ms  p95 {hasil[-1]['p95_ms']:>10.3f} ms  "
+                  f"{hasil[-1]['baris_per_detik']:>12,} baris/detik")
+        return hasil
+
+def bandingkan_benchmark(hasil: List[Dict[str, Any]], path_pembanding: str, ambang_persen: float) -> List[str]:
+    # Regresi = p95 lebih lambat dari pembanding melebihi ambang persen
+    with open(path_pembanding, encoding="utf-8") as f:
+        pembanding = {h["nama"]: h for h in json.load(f)["hasil"]}
+    regresi = []
+    for h in hasil:
+        lama = pembanding.get(h["nama"])
+        if lama and lama["p95_ms"] > 0:
+            selisih = (h["p95_ms"] - lama["p95_ms"]) / lama["p95_ms"] * 100
+            if selisih > ambang_persen:
+                regresi.append(f"{h['nama']}: p95 {lama['p95_ms']} ms -> {h['p95_ms']} ms (+{selisih:.1f}%)")
+    return regresi
+
+def _ke_json(obj):
+    if is_dataclass(obj):
+        return asdict(obj)
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Tipe {type(obj).__name__} tidak bisa diubah ke JSON")
 
-            while True:
-                try:
-                    id_kegiatan = int(input("\nMasukkan ID Kegiatan yang akan diubah: "))
-                    self.cur.execute("SELECT * FROM Jadwal_Pemupukan WHERE id_kegiatan = %s", (id_kegiatan,))
-                    jadwal = self.cur.fetchone()
-                    if jadwal:
-                        break
-                    else:
-                        print("ID kegiatan tidak ditemukan!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+class TeksPrometheus(str):
+    # Payload rute yang dikirim sebagai text/plain, bukan JSON
+    pass
 
-            print("\nPilih yang ingin diubah:")
-            print("1. Tanggal Pemupukan")
-            print("2. Dosis per Bibit")
-            pilihan = input("Pilihan (1-2): ")
+log_api = logging.getLogger("sipatani.api")
 
-            if pilihan == "1":
-                while True:
-                    try:
-                        tanggal_baru = input("Tanggal baru (YYYY-MM-DD): ")
-                        tanggal_obj = datetime.strptime(tanggal_baru, "%Y-%m-%d").date()
-                        break
-                    except ValueError:
-                        print("Format tanggal salah! Gunakan YYYY-MM-DD")
-                self.cur.execute("UPDATE Jadwal_Pemupukan SET tanggal_pemupukan = %s WHERE id_kegiatan = %s", (tanggal_obj, id_kegiatan))
-                print("Tanggal pemupukan berhasil diubah!")
+# Validasi bentuk body/query string rute HTTP; input yang salah selalu menjadi ValidasiGagal (400),
+# sehingga TypeError/KeyError dari kode server tetap terlihat sebagai 500
+def _objek_json(data: Any) -> Dict[str, Any]:
+    if not isinstance(data, dict):
+        raise ValidasiGagal("Body JSON harus berupa object")
+    return data
 
-            elif pilihan == "2":
-                while True:
-                    try:
-                        dosis_baru = float(input("Dosis per Bibit baru (ml atau gr per tanaman): "))
-                        if dosis_baru > 0:
-                            break
-                        else:
-                            print("Dosis per bibit harus lebih dari 0!")
-                    except ValueError:
-                        print("Masukkan angka yang valid!")
-                self.cur.execute("UPDATE Jadwal_Pemupukan SET dosis_per_bibit_tanaman = %s WHERE id_kegiatan = %s", (dosis_baru, id_kegiatan))
-                print("Dosis per bibit berhasil diubah!")
-        except psycopg2.Error as e:
-            print(f"Error mengubah jadwal pemupukan: {e}")
+def _daftar_json(data: Any) -> list:
+    if not isinstance(data, list):
+        raise ValidasiGagal("Body JSON harus berupa array")
+    return data
 
-    def hapus_JadwalPemupukan(self):
-        print("4: Hapus Jadwal Pemupukan")
-        try:
-            print("\nHAPUS JADWAL PEMUPUKAN")
-            print("=" * 30)
-            self.cur.execute("""
-                SELECT jp.id_kegiatan, t.id_tanaman || ' / ' || t.nama_tanaman AS tanaman, jp.nama_kegiatan, pp.jenis, jp.dosis_per_bibit_tanaman, jp.tanggal_pemupukan
-                FROM Jadwal_Pemupukan jp
-                JOIN Tanaman t ON jp.id_tanaman = t.id_tanaman
-                JOIN Pupuk_Pestisida pp ON jp.id_kegiatan = pp.id_kegiatan
-                ORDER BY jp.id_kegiatan;
-            """)
-            results = self.cur.fetchall()
-            if results:
-                print("\nJADWAL PEMUPUKAN")
-                print("=" * 80)
-                columns = ["ID Kegiatan", "ID/Nama Tanaman", "Nama Kegiatan", "Jenis", "Dosis per Bibit", "Tanggal Pemupukan"]
-                print(tabulate([list(row) for row in results], headers=columns, tablefmt="grid"))
-            else:
-                print("Tidak ada jadwal pemupukan yang ditemukan")
+def _angka_json(data: Any, nama: str, default: Optional[float] = None) -> float:
+    data = _objek_json(data)
+    if nama not in data:
+        if default is None:
+            raise ValidasiGagal(f"Field {nama} wajib diisi")
+        return default
+    nilai = data[nama]
+    if isinstance(nilai, bool) or not isinstance(nilai, (int, float)):
+        raise ValidasiGagal(f"Field {nama} harus berupa angka")
+    return nilai
 
-            while True:
-                try:
-                    id_kegiatan = int(input("\nMasukkan ID Kegiatan yang akan dihapus: "))
-                    self.cur.execute("SELECT * FROM Jadwal_Pemupukan WHERE id_kegiatan = %s", (id_kegiatan,))
-                    jadwal = self.cur.fetchone()
-                    if jadwal:
-                        break
-                    else:
-                        print("ID kegiatan tidak ditemukan!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+def _int_query(query: Dict[str, str], nama: str, default: Optional[int] = None) -> Optional[int]:
+    if nama not in query:
+        return default
+    try:
+        return int(query[nama])
+    except ValueError:
+        raise ValidasiGagal(f"Parameter {nama} harus berupa bilangan bulat")
 
-            konfirmasi = input(f"Yakin ingin menghapus jadwal ID {id_kegiatan}? (ya/tidak): ")
-            if konfirmasi.lower() == 'ya':
-                self.cur.execute("DELETE FROM Pupuk_Pestisida WHERE id_kegiatan = %s", (id_kegiatan,))
-                self.cur.execute("DELETE FROM Jadwal_Pemupukan WHERE id_kegiatan = %s", (id_kegiatan,))
-                print(f"Jadwal pemupukan ID {id_kegiatan} berhasil dihapus!")
-            else:
-                print("Penghapusan dibatalkan")
-        except psycopg2.Error as e:
-            print(f"Error menghapus jadwal pemupukan: {e}")
+def _tanggal_query(query: Dict[str, str], nama: str) -> Optional[datetime.date]:
+    if nama not in query:
+        return None
+    try:
+        return datetime.date.fromisoformat(query[nama])
+    except ValueError:
+        raise ValidasiGagal(f"Format tanggal {nama} salah! Gunakan YYYY-MM-DD")
 
-    def lihatStok_pp(self):
-        print("5: Lihat Stok Pupuk/Pestisida")
-        try:
-            self.cur.execute("SELECT * FROM Pupuk_Pestisida")
-            results = self.cur.fetchall()
-            if results:
-                print("\nSTOK PUPUK/PESTISIDA")
-                print("=" * 80)
-                columns = ["ID", "Nama Barang", "Jenis", "ID Kegiatan"]
-                print(tabulate([list(row) for row in results], headers=columns, tablefmt="grid"))
-            else:
-                print("Tidak ada stok pupuk/pestisida yang ditemukan")
-        except psycopg2.Error as e:
-            print(f"Error mengambil stok: {e}")
+def _format_lsn(lsn: float) -> str:
+    return "inf" if lsn == float("inf") else str(int(lsn))
 
-    def tambah_stok(self):
-        print("6: Tambah Stok")
+def _parse_lsn(nilai: Optional[str]) -> Optional[float]:
+    if not nilai:
+        return None
+    try:
+        return int(nilai)
+    except ValueError:
+        # LSN tidak dikenal tetap dianggap tulisan: baca ke primary, bukan ke replika yang mungkin tertinggal
+        return float("inf")
+
+class SipataniHttpServer:
+    STATUS_HTTP = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+                   405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error"}
+    MAKS_BODY = 1024 * 1024
+    # Read-your-writes antar request: respons membawa LSN tulisan terakhir klien, klien mengirimnya
+    # kembali di request berikutnya agar baca tidak dilayani replika yang belum me-replay tulisan itu
+    HEADER_LSN = "X-Sipatani-LSN"
+    
+    def __init__(self, service: SipataniService, host: str = "127.0.0.1", port: int = 8080,
+                 max_workers: Optional[int] = None, backend_async: Optional[AsyncSipataniBackend] = None):
+        self.service = service
+        self.backend_async = backend_async
+        self.perencanaan = None
+        self.host = host
+        self.port = port
+        # Query tetap blocking (psycopg2), jadi dijalankan di thread pool seukuran pool koneksi
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or (service.pool.maxconn if service.pool else POOL_MAX_KONEKSI))
+        self.rute = [
+            ("GET", r"/referensi/tanaman", lambda p, q, d: self.service.daftar_tanaman()),
+            ("GET", r"/referensi/lahan", lambda p, q, d: self.service.daftar_lahan()),
+            ("GET", r"/referensi/status-jadwal", lambda p, q, d: self.service.daftar_status_jadwal()),
+            ("GET", r"/jadwal", lambda p, q, d: self.service.lihat_jadwal(
+                _int_query(q, "setelah", 0), _int_query(q, "ukuran", UKURAN_HALAMAN_JADWAL))),
+            ("POST", r"/jadwal", lambda p, q, d: self.service.tambah_jadwal(dari_json(JadwalTanamInput, d))),
+            ("DELETE", r"/jadwal", lambda p, q, d: self.service.hapus_jadwal_massal(dari_json(FilterJadwal, d))),
+            ("GET", r"/jadwal/siap-panen", lambda p, q, d: self.service.jadwal_siap_panen()),
+            ("GET", r"/jadwal/(?P<id>\d+)", lambda p, q, d: self.service.ambil_jadwal(p["id"])),
+            ("PATCH", r"/jadwal", lambda p, q, d: self.service.terapkan_patch(
+                jadwal=[dari_json(PerubahanJadwal, x) for x in _daftar_json(d)])),
+            ("POST", r"/jadwal/geser", lambda p, q, d: self.service.geser_jadwal_massal(
+                dari_json(FilterJadwal, _objek_json(d).get("filter", {})), int(_angka_json(d, "hari", 0)),
+                bool(d.get("ikut_pemupukan", True)))),
+            ("PATCH", r"/jadwal/(?P<id>\d+)", lambda p, q, d: self.service.edit_jadwal(
+                dari_json(PerubahanJadwal, {**_objek_json(d), "id_jadwal_tanam": p["id"]}))),
+            ("DELETE", r"/jadwal/(?P<id>\d+)", lambda p, q, d: self.service.hapus_jadwal(p["id"])),
+            ("GET", r"/jadwal/(?P<id>\d+)/terkait", lambda p, q, d: self.service.hitung_data_terkait(p["id"])),
+            ("POST", r"/panen", lambda p, q, d: self.service.input_hasil_panen(dari_json(HasilPanenInput, d))),
+            ("POST", r"/panen/massal", lambda p, q, d: self.service.input_hasil_panen_massal(
+                [dari_json(HasilPanenInput, x) for x in _daftar_json(d)])),
+            ("GET", r"/perencanaan/lahan", lambda p, q, d: self._perencanaan().hitung().ringkasan_per_lahan()),
+            ("GET", r"/perencanaan/panen", lambda p, q, d: self._perencanaan().hitung().panen_per_bulan()),
+            ("GET", r"/analitik/panen", lambda p, q, d: self.service.laporan_panen(
+                q.get("dimensi", "tanaman"), _tanggal_query(q, "mulai"), _tanggal_query(q, "selesai"))),
+            ("GET", r"/pemupukan", lambda p, q, d: self.service.lihat_jadwal_pemupukan()),
+            ("POST", r"/pemupukan", lambda p, q, d: self.service.tambah_jadwal_pemupukan(dari_json(JadwalPemupukanInput, d))),
+            ("POST", r"/pemupukan/kalender", lambda p, q, d: self.service.buat_kalender_pemupukan(
+                dari_json(RencanaPemupukanInput, d))),
+            ("GET", r"/pemupukan/jatuh-tempo", lambda p, q, d: self.service.pemupukan_jatuh_tempo(_int_query(q, "hari", 7))),
+            ("GET", r"/pemupukan/(?P<id>\d+)", lambda p, q, d: self.service.ambil_jadwal_pemupukan(p["id"])),
+            ("PATCH", r"/pemupukan", lambda p, q, d: self.service.terapkan_patch(
+                pemupukan=[dari_json(PerubahanJadwalPemupukan, x) for x in _daftar_json(d)])),
+            ("PATCH", r"/pemupukan/(?P<id>\d+)", lambda p, q, d: self.service.ubah_jadwal_pemupukan(
+                dari_json(PerubahanJadwalPemupukan, {**_objek_json(d), "id_kegiatan": p["id"]}))),
+            ("DELETE", r"/pemupukan/(?P<id>\d+)", lambda p, q, d: self.service.hapus_jadwal_pemupukan(p["id"])),
+            ("GET", r"/stok", lambda p, q, d: self.service.lihat_stok()),
+            ("POST", r"/stok", lambda p, q, d: self.service.tambah_stok(dari_json(StokInput, d))),
+            ("GET", r"/stok/saldo", lambda p, q, d: self.service.daftar_saldo_stok(q.get("menipis") == "1")),
+            ("GET", r"/stok/kekurangan", lambda p, q, d: self.service.proyeksi_kekurangan_stok(_int_query(q, "hari", 30))),
+            ("POST", r"/stok/mutasi", lambda p, q, d: self.service.catat_mutasi_stok(dari_json(MutasiStokInput, d))),
+            ("GET", r"/stok/barang/(?P<id>\d+)/mutasi", lambda p, q, d: self.service.riwayat_mutasi_stok(
+                p["id"], _int_query(q, "batas", 50))),
+            ("PATCH", r"/stok/barang/(?P<id>\d+)", lambda p, q, d: self.service.atur_stok_minimum(
+                p["id"], float(_angka_json(d, "stok_minimum")))),
+            ("GET", r"/stok/(?P<id>\d+)", lambda p, q, d: self.service.ambil_stok(p["id"])),
+            ("DELETE", r"/stok/(?P<id>\d+)", lambda p, q, d: self.service.hapus_stok(p["id"])),
+            ("GET", r"/laporan", lambda p, q, d: self.service.lihat_laporan()),
+            ("GET", r"/laporan/cari", lambda p, q, d: self.service.cari_laporan(dari_json(FilterLaporan, {
+                k: _int_query(q, k) if k in ("id_jadwal_tanam", "halaman", "ukuran_halaman") else v
+                for k, v in q.items()}))),
+            ("POST", r"/laporan", lambda p, q, d: self.service.tambah_laporan(dari_json(LaporanMasalahInput, d))),
+            ("PUT", r"/laporan/(?P<id>\d+)", lambda p, q, d: self.service.edit_laporan(
+                p["id"], dari_json(LaporanMasalahInput, d))),
+            ("PATCH", r"/laporan/(?P<id>\d+)/status", lambda p, q, d: self.service.update_status_solusi(
+                p["id"], _objek_json(d).get("status_penanganan"), d.get("solusi"))),
+            ("DELETE", r"/laporan/(?P<id>\d+)", lambda p, q, d: self.service.hapus_laporan(p["id"])),
+            ("GET", r"/metrics", lambda p, q, d: TeksPrometheus(metrik_query.prometheus())),
+        ]
+        # Jika backend async tersedia, rute jadwal/pemupukan/stok di-await langsung di event loop
+        # tanpa melewati thread pool
+        rute_async = {}
+        if backend_async is not None:
+            b = backend_async
+            rute_async = {
+                ("GET", r"/referensi/tanaman"): lambda p, q, d: b.daftar_tanaman(),
+                ("GET", r"/referensi/lahan"): lambda p, q, d: b.daftar_lahan(),
+                ("GET", r"/referensi/status-jadwal"): lambda p, q, d: b.daftar_status_jadwal(),
+                ("GET", r"/jadwal"): lambda p, q, d: b.lihat_jadwal(
+                    _int_query(q, "setelah", 0), _int_query(q, "ukuran", UKURAN_HALAMAN_JADWAL)),
+                ("POST", r"/jadwal"): lambda p, q, d: b.tambah_jadwal(dari_json(JadwalTanamInput, d)),
+                ("DELETE", r"/jadwal"): lambda p, q, d: b.hapus_jadwal_massal(dari_json(FilterJadwal, d)),
+                ("GET", r"/jadwal/siap-panen"): lambda p, q, d: b.jadwal_siap_panen(),
+                ("GET", r"/jadwal/(?P<id>\d+)"): lambda p, q, d: b.ambil_jadwal(p["id"]),
+                ("PATCH", r"/jadwal/(?P<id>\d+)"): lambda p, q, d: b.edit_jadwal(
+                    dari_json(PerubahanJadwal, {**_objek_json(d), "id_jadwal_tanam": p["id"]})),
+                ("DELETE", r"/jadwal/(?P<id>\d+)"): lambda p, q, d: b.hapus_jadwal(p["id"]),
+                ("GET", r"/jadwal/(?P<id>\d+)/terkait"): lambda p, q, d: b.hitung_data_terkait(p["id"]),
+                ("POST", r"/panen"): lambda p, q, d: b.input_hasil_panen(dari_json(HasilPanenInput, d)),
+                ("POST", r"/panen/massal"): lambda p, q, d: b.input_hasil_panen_massal(
+                    [dari_json(HasilPanenInput, x) for x in _daftar_json(d)]),
+                ("GET", r"/pemupukan"): lambda p, q, d: b.lihat_jadwal_pemupukan(),
+                ("POST", r"/pemupukan"): lambda p, q, d: b.tambah_jadwal_pemupukan(dari_json(JadwalPemupukanInput, d)),
+                ("GET", r"/pemupukan/(?P<id>\d+)"): lambda p, q, d: b.ambil_jadwal_pemupukan(p["id"]),
+                ("PATCH", r"/pemupukan/(?P<id>\d+)"): lambda p, q, d: b.ubah_jadwal_pemupukan(
+                    dari_json(PerubahanJadwalPemupukan, {**_objek_json(d), "id_kegiatan": p["id"]})),
+                ("DELETE", r"/pemupukan/(?P<id>\d+)"): lambda p, q, d: b.hapus_jadwal_pemupukan(p["id"]),
+                ("GET", r"/stok"): lambda p, q, d: b.lihat_stok(),
+                ("POST", r"/stok"): lambda p, q, d: b.tambah_stok(dari_json(StokInput, d)),
+                ("GET", r"/stok/(?P<id>\d+)"): lambda p, q, d: b.ambil_stok(p["id"]),
+                ("DELETE", r"/stok/(?P<id>\d+)"): lambda p, q, d: b.hapus_stok(p["id"]),
+            }
+        # Rute sinkron dicatat sebagai satu operasi MetrikQuery, label memakai pola rute (bukan id)
+        self._rute = [
+            (metode, re.compile(pola + r"/?"),
+             rute_async[(metode, pola)] if (metode, pola) in rute_async
+             else metrik_query.bungkus(self._label_rute(metode, pola), fungsi),
+             (metode, pola) in rute_async)
+            for metode, pola, fungsi in self.rute
+        ]
+    
+    @staticmethod
+    def _label_rute(metode: str, pola: str) -> str:
+        return metode + " " + re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pola)
+    
+    def _perencanaan(self) -> "PipelinePerencanaan":
+        if self.perencanaan is None:
+            self.perencanaan = PipelinePerencanaan(self.service.pool)
+        return self.perencanaan
+    
+    async def jalankan(self):
+        server = await asyncio.start_server(self._tangani_koneksi, self.host, self.port)
+        print(f"SIPATANI API berjalan di http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+    
+    async def _tangani_koneksi(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Satu koneksi TCP bisa membawa banyak request (HTTP/1.1 keep-alive)
         try:
-            print("\nTAMBAH STOK PUPUK/PESTISIDA")
-            print("=" * 40)
-            nama_barang = input("Nama Barang: ").strip()
             while True:
-                jenis = input("Jenis (Pupuk/Pestisida): ").strip().capitalize()
-                if jenis in ["Pupuk", "Pestisida"]:
+                baris_request = await reader.readline()
+                if not baris_request:
                     break
-                print("Jenis harus 'Pupuk' atau 'Pestisida'! Coba lagi.")
-            self.cur.execute("SELECT id_kegiatan FROM Jadwal_Pemupukan")
-            kegiatan_list = self.cur.fetchall()
-            if not kegiatan_list:
-                print("Tidak ada jadwal pemupukan yang tersedia untuk stok!")
-                return
-            print("\nDAFTAR ID KEGIATAN TERSEDIA:")
-            for k in kegiatan_list:
-                print(f"ID Kegiatan: {k['id_kegiatan']}")
-            while True:
                 try:
-                    id_kegiatan = int(input("\nPilih ID Kegiatan untuk stok: "))
-                    if any(k['id_kegiatan'] == id_kegiatan for k in kegiatan_list):
+                    metode, target, versi = baris_request.decode("latin-1").split()
+                except ValueError:
+                    await self._kirim(writer, 400, {"error": "Request line tidak valid"}, False)
+                    break
+                
+                headers = {}
+                while True:
+                    baris = await reader.readline()
+                    if baris in (b"\r\n", b"\n", b""):
                         break
-                    else:
-                        print("ID kegiatan tidak valid!")
+                    nama, _, nilai = baris.decode("latin-1").partition(":")
+                    headers[nama.strip().lower()] = nilai.strip()
+                
+                try:
+                    panjang = int(headers.get("content-length", "0") or 0)
                 except ValueError:
-                    print("Masukkan angka yang valid!")
-            self.cur.execute(
-                "INSERT INTO Pupuk_Pestisida (id_pupukpestisida, nama_barang, jenis, id_kegiatan) VALUES ((SELECT COALESCE(MAX(id_pupukpestisida), 200) + 1 FROM Pupuk_Pestisida), %s, %s, %s)",
-                (nama_barang, jenis, id_kegiatan)
-            )
-            print(f"Stok {nama_barang} berhasil ditambahkan!")
-        except psycopg2.Error as e:
-            print(f"Error menambah stok: {e}")
+                    panjang = -1
+                if panjang < 0:
+                    await self._kirim(writer, 400, {"error": "Content-Length tidak valid"}, False)
+                    break
+                if panjang > self.MAKS_BODY:
+                    await self._kirim(writer, 413, {"error": "Body terlalu besar"}, False)
+                    break
+                body = await reader.readexactly(panjang) if panjang else b""
+                
+                status, payload, header_respons = await self._proses(metode.upper(), target, body, headers)
+                keep_alive = versi == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._kirim(writer, status, payload, keep_alive, header_respons)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+    
+    def _router(self) -> Optional[RouterKoneksi]:
+        return self.service.pool if isinstance(self.service.pool, RouterKoneksi) else None
+    
+    def _panggil(self, fungsi, lsn_klien: Optional[float], param, query, data) -> Tuple[Any, Optional[float]]:
+        # Berjalan di thread executor mana pun: LSN klien dipasang selama request ini saja
+        router = self._router()
+        if router is None:
+            return fungsi(param, query, data), None
+        router.atur_lsn_tulis(lsn_klien)
+        try:
+            return fungsi(param, query, data), router.lsn_tulis()
+        finally:
+            router.atur_lsn_tulis(None)
+    
+    async def _proses(self, metode: str, target: str, body: bytes,
+                      headers: Optional[Dict[str, str]] = None) -> Tuple[int, Any, Dict[str, str]]:
+        status, payload, lsn = await self._proses_rute(metode, target, body, _parse_lsn(
+            (headers or {}).get(self.HEADER_LSN.lower())))
+        return status, payload, {} if lsn is None else {self.HEADER_LSN: _format_lsn(lsn)}
+    
+    async def _proses_rute(self, metode: str, target: str, body: bytes,
+                           lsn: Optional[float]) -> Tuple[int, Any, Optional[float]]:
+        # LSN klien selalu dikembalikan (diperbarui jika request ini menulis), juga saat error
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        metode_cocok = False
+        for metode_rute, pola, fungsi, asinkron in self._rute:
+            cocok = pola.fullmatch(url.path)
+            if not cocok:
+                continue
+            metode_cocok = True
+            if metode_rute != metode:
+                continue
+            try:
+                data = json.loads(body) if body else {}
+            except ValueError as e:
+                return 400, {"error": f"Body bukan JSON yang valid: {e}"}, lsn
+            param = {k: int(v) for k, v in cocok.groupdict().items()}
+            loop = asyncio.get_running_loop()
+            try:
+                if asinkron:
+                    hasil = await fungsi(param, query, data)
+                    # Backend async menulis langsung ke primary, di luar router
+                    if metode != "GET" and self._router() is not None:
+                        lsn = await loop.run_in_executor(self.executor, self._router().lsn_primary)
+                else:
+                    hasil, lsn = await loop.run_in_executor(self.executor, self._panggil, fungsi, lsn,
+                                                            param, query, data)
+            except DataTidakDitemukan as e:
+                return 404, {"error": str(e)}, lsn
+            except KonflikVersi as e:
+                return 409, {"error": str(e)}, lsn
+            except ValidasiGagal as e:
+                return 400, {"error": str(e)}, lsn
+            except (psycopg2.Error, *ERROR_DATABASE_ASYNC) as e:
+                return 500, {"error": f"Error database: {e}"}, lsn
+            except Exception:
+                # Bug di server: tetap dijawab agar klien tidak menunggu koneksi yang ditutup tanpa respons
+                log_api.exception("Error tak terduga pada %s %s", metode, url.path)
+                return 500, {"error": "Error internal server"}, lsn
+            if hasil is None:
+                return 204, None, lsn
+            return (201 if metode == "POST" else 200), hasil, lsn
+        if metode_cocok:
+            return 405, {"error": f"Metode {metode} tidak didukung untuk {url.path}"}, lsn
+        return 404, {"error": f"Rute {url.path} tidak ditemukan"}, lsn
+    
+    async def _kirim(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool,
+                     header_tambahan: Optional[Dict[str, str]] = None):
+        if isinstance(payload, TeksPrometheus):
+            body, tipe = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = b"" if payload is None else json.dumps(payload, default=_ke_json).encode("utf-8")
+            tipe = "application/json; charset=utf-8"
+        header = (
+            f"HTTP/1.1 {status} {self.STATUS_HTTP.get(status, '')}\r\n"
+            f"Content-Type: {tipe}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            + "".join(f"{nama}: {nilai}\r\n" for nama, nilai in (header_tambahan or {}).items())
+            + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(header.encode("latin-1") + body)
+        await writer.drain()
 
-    def hapus_stok(self):
-        print("7: Hapus Stok")
+def siapkan_aplikasi(pool: SipataniConnectionPool) -> ReferensiCache:
+    # Persiapan database yang dibutuhkan menu interaktif maupun server API
+    with pool.koneksi() as conn:
+        for versi in MigrasiSkema().jalankan(conn):
+            print(f"Migrasi skema versi {versi} diterapkan")
+    
+    # Cache data referensi, di-invalidasi lewat LISTEN/NOTIFY
+    cache_referensi = ReferensiCache(pool)
+    try:
+        with pool.koneksi() as conn:
+            cache_referensi.siapkan_trigger(conn)
+        cache_referensi.mulai_listen()
+    except psycopg2.Error as e:
+        print(f"Peringatan: invalidasi cache lewat NOTIFY tidak aktif, hanya TTL ({e})")
+    return cache_referensi
+
+def jalankan_server(host: str, port: int, backend_async: bool = False):
+    print("SIPATANI - Server API HTTP/JSON")
+    try:
+        pool = get_router_koneksi()
+        cache_referensi = siapkan_aplikasi(pool)
+    except psycopg2.Error as e:
+        print(f"Error koneksi database: {e}")
+        tutup_semua_pool()
+        return
+    
+    service = SipataniService(pool, cache_referensi)
+    penjadwal_status = PenjadwalStatus(service)
+    penjadwal_status.mulai()
+    
+    async def _jalankan():
+        backend = None
+        if backend_async:
+            backend = await AsyncSipataniBackend(cache=cache_referensi).buka()
         try:
-            print("\nHAPUS STOK PUPUK/PESTISIDA")
-            print("=" * 30)
-            self.lihatStok_pp()
+            await SipataniHttpServer(service, host, port, backend_async=backend).jalankan()
+        finally:
+            if backend is not None:
+                await backend.tutup()
+    
+    try:
+        asyncio.run(_jalankan())
+    except KeyboardInterrupt:
+        print("\nServer dihentikan")
+    except (SipataniError, OSError, *ERROR_DATABASE_ASYNC) as e:
+        print(f"Error backend async: {e}")
+    finally:
+        penjadwal_status.berhenti()
+        cache_referensi.berhenti_listen()
+        tutup_semua_pool()
 
-            while True:
-                try:
-                    id_pupukpestisida = int(input("\nMasukkan ID Stok yang akan dihapus: "))
-                    self.cur.execute("SELECT * FROM Pupuk_Pestisida WHERE id_pupukpestisida = %s", (id_pupukpestisida,))
-                    stok = self.cur.fetchone()
-                    if stok:
-                        break
-                    else:
-                        print("ID stok tidak ditemukan!")
-                except ValueError:
-                    print("Masukkan angka yang valid!")
+def jalankan_migrasi(status_saja: bool = False):
+    try:
+        pool = get_connection_pool()
+        with pool.koneksi() as conn:
+            migrasi = MigrasiSkema()
+            if not status_saja:
+                diterapkan = migrasi.jalankan(conn)
+                print(f"{len(diterapkan)} migrasi diterapkan" + (f": {diterapkan}" if diterapkan else ""))
+            print(tabulate([(v, d, t or "belum") for v, d, t in migrasi.status(conn)],
+                           headers=["Versi", "Deskripsi", "Diterapkan"], tablefmt="grid"))
+    except psycopg2.Error as e:
+        print(f"Error migrasi skema: {e}")
+    finally:
+        tutup_semua_pool()
 
-            konfirmasi = input(f"Yakin ingin menghapus stok ID {id_pupukpestisida}? (ya/tidak): ")
-            if konfirmasi.lower() == 'ya':
-                self.cur.execute("DELETE FROM Pupuk_Pestisida WHERE id_pupukpestisida = %s", (id_pupukpestisida,))
-                print(f"Stok ID {id_pupukpestisida} berhasil dihapus!")
-            else:
-                print("Penghapusan dibatalkan")
-        except psycopg2.Error as e:
-            print(f"Error menghapus stok: {e}")
+def jalankan_perbarui_status(penuh: bool = False) -> int:
+    # Untuk cron: satu kali jalan lalu keluar, hasil dicatat lewat logging dan log_status_otomatis
+    try:
+        pool = get_connection_pool()
+        with pool.koneksi() as conn:
+            MigrasiSkema().jalankan(conn)
+        penjadwal = PenjadwalStatus(SipataniService(pool))
+        status_ok = penjadwal.jalankan_sekali(penuh) is not None
+        pemakaian_ok = penjadwal.catat_pemakaian_sekali(penuh) is not None
+        partisi_ok = penjadwal.rawat_partisi_sekali() is not None
+        return 0 if status_ok and pemakaian_ok and partisi_ok else 1
+    except psycopg2.Error as e:
+        print(f"Error memperbarui status jadwal: {e}")
+        return 1
+    finally:
+        tutup_semua_pool()
+
+def jalankan_analisis_query():
+    try:
+        penasihat = PenasihatQuery(get_connection_pool())
+        penasihat.tampilkan(penasihat.analisis())
+    except psycopg2.Error as e:
+        print(f"Error analisis query: {e}")
+    finally:
+        tutup_semua_pool()
+
+def jalankan_benchmark(args) -> int:
+    if args.db == DB_CONFIG["dbname"]:
+        print(f"Database benchmark tidak boleh sama dengan database aplikasi ({args.db})!")
+        return 1
+    registri_query.aktif = not args.tanpa_prepared
+    try:
+        pool = get_connection_pool(dbname=args.db)
+        statistik_generate = None
+        if not args.tanpa_generate:
+            print(f"Membangkitkan data sintetis skala {args.skala:,} (seed {args.seed}) di {args.db}...")
+            with pool.koneksi() as conn:
+                statistik_generate = GeneratorDataSintetis(conn, args.skala, args.seed).bangkitkan()
+            for tabel, st in statistik_generate.items():
+                print(f"{tabel:20} {st['baris']:>12,} baris  {st['baris_per_detik']:>12,} baris/detik")
+        # Skema fungsional (rekap, stok, fungsi panen, CDC) selalu dipasang; --tanpa-migrasi hanya melepas indeks
+        with pool.koneksi() as conn:
+            migrasi = MigrasiSkema()
+            migrasi.jalankan(conn)
+            migrasi.atur_indeks(conn, aktif=not args.tanpa_migrasi)
+        with pool.koneksi() as conn, conn.cursor() as cur:
+            cur.execute("SHOW server_version;")
+            versi_server = cur.fetchone()[0]
+        
+        benchmark = BenchmarkSipatani(pool, args.skala, args.seed, args.iterasi)
+        hasil = benchmark.jalankan(args.hanya)
+    except (psycopg2.Error, SipataniError) as e:
+        print(f"Error benchmark: {e}")
+        return 1
+    finally:
+        tutup_semua_pool()
+    
+    laporan = {
+        "waktu": datetime.datetime.now().isoformat(timespec="seconds"),
+        "skala": args.skala,
+        "seed": args.seed,
+        "iterasi": args.iterasi,
+        "migrasi": not args.tanpa_migrasi,
+        "postgresql": versi_server,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "generate": statistik_generate,
+        "prepared_statement": registri_query.statistik() if registri_query.aktif else None,
+        "hasil": hasil,
+    }
+    output = args.output or f"bench-{args.skala}-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(laporan, f, indent=2)
+    print(f"\nHasil benchmark disimpan ke {output}")
+    
+    if args.bandingkan:
+        regresi = bandingkan_benchmark(hasil, args.bandingkan, args.ambang_regresi)
+        if regresi:
+            print(f"\nREGRESI (p95 > +{args.ambang_regresi}%):")
+            for baris in regresi:
+                print(f"- {baris}")
+            return 2
+        print("\nTidak ada regresi dibanding pembanding")
+    return 0
+
+def jalankan_cek_replika() -> int:
+    if not DB_REPLIKA:
+        print("Tidak ada replika, isi SIPATANI_DB_REPLIKA (misal localhost:5433,localhost:5434)")
+        return 1
+    try:
+        router = get_router_koneksi()
+        status = router.status_replika()
+    except psycopg2.Error as e:
+        print(f"Error koneksi database: {e}")
+        return 1
+    finally:
+        tutup_semua_pool()
+    print(tabulate([(s["replika"], s["lag_detik"], s["lsn_replay"], "ya" if s["layak"] else "tidak", s["error"] or "-")
+                    for s in status],
+                   headers=["Replika", "Lag (detik)", "LSN Replay", f"Layak (<= {BATAS_LAG_REPLIKA_DETIK}s)", "Error"],
+                   tablefmt="grid"))
+    return 0 if all(s["layak"] for s in status) else 2
+
+def jalankan_cdc(args) -> int:
+    try:
+        pool = get_connection_pool()
+        with pool.koneksi() as conn:
+            MigrasiSkema().jalankan(conn)
+        sink = SinkJsonl(args.path)
+    except (psycopg2.Error, OSError) as e:
+        print(f"Error menyiapkan CDC: {e}")
+        tutup_semua_pool()
+        return 1
+    try:
+        konsumen = KonsumenPerubahan(pool, args.nama, sink, args.tabel, args.batch)
+        if args.bersihkan is not None:
+            print(f"{konsumen.bersihkan(args.bersihkan)} event lama dihapus")
+            return 0
+        if args.sekali:
+            print(f"{konsumen.proses_semua()} event ditulis ke {args.path}")
+            return 0
+        log_cdc.info("Konsumen %s menulis ke %s, Ctrl+C untuk berhenti", args.nama, args.path)
+        konsumen.jalankan()
+        return 0
+    except KeyboardInterrupt:
+        return 0
+    except (psycopg2.Error, SipataniError) as e:
+        print(f"Error CDC: {e}")
+        return 1
+    finally:
+        sink.tutup()
+        tutup_semua_pool()
+
+def jalankan_partisi(args) -> int:
+    try:
+        pool = get_connection_pool()
+        with pool.koneksi() as conn:
+            MigrasiSkema().jalankan(conn)
+        manajer = ManajerPartisi(pool, getattr(args, "ke_depan", PARTISI_KE_DEPAN))
+        if args.aksi == "konversi":
+            print(json.dumps(manajer.konversi(args.tabel, args.bulan)))
+        elif args.aksi == "siapkan":
+            print(f"{manajer.siapkan_mendatang()} partisi baru dibuat")
+        elif args.aksi == "lepas":
+            sebelum = datetime.date.fromisoformat(args.sebelum)
+            dilepas = manajer.lepas_lama(args.tabel, sebelum, args.arsip, args.hapus)
+            print(f"{len(dilepas)} partisi dilepas" + (f": {', '.join(dilepas)}" if dilepas else ""))
+        else:
+            print(tabulate([(i.tabel, i.partisi, i.dari or "-", i.sampai or "-", i.perkiraan_baris, i.ukuran_byte)
+                            for i in manajer.daftar_partisi()],
+                           headers=["Tabel", "Partisi", "Dari", "Sampai", "Perkiraan Baris", "Ukuran (byte)"],
+                           tablefmt="grid"))
+        return 0
+    except ValueError:
+        print("Format tanggal salah! Gunakan YYYY-MM-DD")
+        return 1
+    except (psycopg2.Error, SipataniError, OSError) as e:
+        print(f"Error partisi: {e}")
+        return 1
+    finally:
+        tutup_semua_pool()
+
+def jalankan_ekspor(args) -> int:
+    try:
+        hasil = EksporData(get_router_koneksi(), args.batch).ekspor(args.sumber, args.path, args.format)
+    except (psycopg2.Error, SipataniError, OSError) as e:
+        print(f"Error ekspor data: {e}")
+        return 1
+    finally:
+        tutup_semua_pool()
+    print(json.dumps(hasil))
+    return 0
 
 def clear_screen():
     print("Bersihkan layar konsol")
@@ -815,6 +5697,12 @@ def tampilkan_menu():
     print("1.4 Hapus Jadwal")
     print("1.5 Input Hasil Panen")
     print("1.6 Refresh Tampilan")
+    print("1.7 Impor Jadwal Tanam (CSV)")
+    print("1.8 Impor Hasil Panen (CSV)")
+    print("1.9 Hapus Jadwal Massal")
+    print("1.10 Laporan Hasil Panen")
+    print("1.11 Ekspor Data (CSV/JSONL/Parquet)")
+    print("1.12 Geser Jadwal Massal")
     print("0. Kembali ke Dashboard / Keluar")
     print("="*50)
     print("FITUR 2: MANAJEMEN JADWAL PEMUPUKAN DAN STOK")
@@ -826,6 +5714,11 @@ def tampilkan_menu():
     print("2.5 Lihat Stok Pupuk/Pestisida")
     print("2.6 Tambah Stok")
     print("2.7 Hapus Stok")
+    print("2.8 Proyeksi Kebutuhan Pupuk dan Panen")
+    print("2.9 Kalender Pemupukan Berulang")
+    print("2.10 Pemupukan Jatuh Tempo")
+    print("2.11 Catat Mutasi Stok")
+    print("2.12 Stok Menipis dan Proyeksi Kekurangan")
     print("="*50)
 
 def main():
@@ -834,88 +5727,91 @@ def main():
     print("SIPATANI - Sistem Informasi Pertanian")
     print("Memulai aplikasi...")
     
-    # Inisialisasi database
-    conn, cur = connect()
-    db = SipataniDatabase()
-    if not db.connect():
+    # Inisialisasi pool koneksi database (listing berat ke replika jika SIPATANI_DB_REPLIKA diisi)
+    try:
+        pool = get_router_koneksi()
+    except psycopg2.Error as e:
+        print(f"Error koneksi database: {e}")
         print("Gagal koneksi ke database. Program dihentikan.")
         return
+    db = SipataniDatabase(pool)
+    
+    # Sequence ID, tabel laporan dan cache data referensi
+    try:
+        cache_referensi = siapkan_aplikasi(pool)
+    except psycopg2.Error as e:
+        print(f"Error menyiapkan database: {e}")
+        print("Gagal menyiapkan database. Program dihentikan.")
+        tutup_semua_pool()
+        return
     
-    # Inisialisasi manager jadwal tanam
-    jadwal_manager = JadwalTanamManager(db)
-    manajemen_pemupukan = Jadwal_Pemupukan(conn, cur)
+    # Menu interaktif hanyalah salah satu klien dari SipataniService
+    service = SipataniService(pool, cache_referensi)
+    penjadwal_status = PenjadwalStatus(service)
+    penjadwal_status.mulai()
+    # Slow-query log ke file agar tidak mengganggu tampilan menu
+    handler_log_query = logging.FileHandler(FILE_LOG_QUERY_LAMBAT, encoding="utf-8")
+    log_query.addHandler(handler_log_query)
+    log_query.propagate = False
+    server_metrik = ServerMetrik(metrik_query)
+    if server_metrik.mulai():
+        print(f"Metrik Prometheus: http://{server_metrik.host}:{server_metrik.port}/metrics")
+    jadwal_manager = JadwalTanamManager(db, cache_referensi, service)
+    manajemen_pemupukan = Jadwal_Pemupukan(db, service)
+    impor_manager = ImporMassalManager(db)
+    ekspor_data = EksporData(pool)
     
     try:
         while True:
             tampilkan_menu()
-            menu_pemupukan()
             
             try:
                 pilihan = input("\nPilih menu (0-6): ")
                 
-                if pilihan == "1.1":
-                    clear_screen()
-                    jadwal_manager.lihat_semua_jadwal()
-                    input("\nTekan Enter untuk melanjutkan...")
-                
-                elif pilihan == "1.2":
-                    clear_screen()
-                    jadwal_manager.tambah_jadwal_baru()
-                    input("\nTekan Enter untuk melanjutkan...")
-                
-                elif pilihan == "1.3":
-                    clear_screen()
-                    jadwal_manager.edit_jadwal()
-                    input("\nTekan Enter untuk melanjutkan...")
-                
-                elif pilihan == "1.4":
-                    clear_screen()
-                    jadwal_manager.hapus_jadwal()
-                    input("\nTekan Enter untuk melanjutkan...")
-                
-                elif pilihan == "1.5":
+                if pilihan == "0":
                     clear_screen()
-                    jadwal_manager.input_hasil_panen()
-                    input("\nTekan Enter untuk melanjutkan...")
+                    print("Terima kasih telah menggunakan SIPATANI!")
+                    print("Menutup koneksi database...")
+                    break
                 
                 elif pilihan == "1.6":
                     clear_screen()
                     print("Tampilan di-refresh!")
+                    continue
                 
-                elif pilihan == "0":
-                    clear_screen()
-                    print("Terima kasih telah menggunakan SIPATANI!")
-                    print("Menutup koneksi database...")
-                    break
-
-                elif pilihan == "2.1":
-                clear_screen()
-                manajemen_pemupukan.lihat_JadwalPemupukan()
-    
-                elif pilihan == "2.2":
-                    clear_screen()
-                    manajemen_pemupukan.tambah_JadwalPemupukan()
-    
-                elif pilihan == "2.3":
-                    clear_screen()
-                    manajemen_pemupukan.ubah_JadwalPemupukan()
-    
-                elif pilihan == "2.4":
-                    clear_screen()
-                    manajemen_pemupukan.hapus_JadwalPemupukan()
-    
-                elif pilihan == "2.5":
-                    clear_screen()
-                    manajemen_pemupukan.lihatStok_pp()
-    
-                elif pilihan == "2.6":
-                    clear_screen()
-                    manajemen_pemupukan.tambah_stok()
-    
-                elif pilihan == "2.7":
+                aksi = {
+                    "1.1": jadwal_manager.lihat_semua_jadwal,
+                    "1.2": jadwal_manager.tambah_jadwal_baru,
+                    "1.3": jadwal_manager.edit_jadwal,
+                    "1.4": jadwal_manager.hapus_jadwal,
+                    "1.5": jadwal_manager.input_hasil_panen,
+                    "1.7": lambda: impor_manager.impor_jadwal_tanam(input("Path file CSV jadwal tanam: ").strip()),
+                    "1.8": lambda: impor_manager.impor_hasil_panen(input("Path file CSV hasil panen: ").strip()),
+                    "1.9": jadwal_manager.hapus_jadwal_massal,
+                    "1.10": jadwal_manager.laporan_panen,
+                    "1.11": ekspor_data.ekspor_interaktif,
+                    "1.12": jadwal_manager.geser_jadwal_massal,
+                    "2.1": manajemen_pemupukan.lihat_JadwalPemupukan,
+                    "2.2": manajemen_pemupukan.tambah_JadwalPemupukan,
+                    "2.3": manajemen_pemupukan.ubah_JadwalPemupukan,
+                    "2.4": manajemen_pemupukan.hapus_JadwalPemupukan,
+                    "2.5": manajemen_pemupukan.lihatStok_pp,
+                    "2.6": manajemen_pemupukan.tambah_stok,
+                    "2.7": manajemen_pemupukan.hapus_stok,
+                    "2.8": manajemen_pemupukan.proyeksi_kebutuhan,
+                    "2.9": manajemen_pemupukan.buat_kalender_pemupukan,
+                    "2.10": manajemen_pemupukan.lihat_jatuh_tempo,
+                    "2.11": manajemen_pemupukan.catat_mutasi_stok,
+                    "2.12": manajemen_pemupukan.lihat_kekurangan_stok,
+                }.get(pilihan)
+                
+                if aksi:
                     clear_screen()
-                    manajemen_pemupukan.hapus_stok()
-    
+                    # Koneksi hanya dipinjam dari pool selama aksi berjalan
+                    with db.sesi(), metrik_query.operasi(f"menu {pilihan}"):
+                        aksi()
+                    if pilihan.startswith("1."):
+                        input("\nTekan Enter untuk melanjutkan...")
                 else:
                     print("Pilihan tidak valid! Silakan pilih dengan benar!")
                     input("\nTekan Enter untuk melanjutkan...")
@@ -928,34 +5824,28 @@ def main():
                 input("\nTekan Enter untuk melanjutkan...")
     
     finally:
-        db.disconnect()
+        penjadwal_status.berhenti()
+        server_metrik.berhenti()
+        log_query.removeHandler(handler_log_query)
+        handler_log_query.close()
+        cache_referensi.berhenti_listen()
+        tutup_semua_pool()
 
-if __name__ == "__main__":
-    # Cek apakah library yang diperlukan sudah terinstall
-    try:
-        import psycopg2
-        from tabulate import tabulate
-    except ImportError as e:
-        print(f"Library yang diperlukan belum terinstall: {e}")
-        print("Jalankan perintah berikut untuk menginstall:")
-        print("pip install psycopg2-binary tabulate")
-        exit(1)
-    
-    main()
 class LaporanMasalahDB:
-    def __init__(self, dbname, user, password, host='localhost', port=5432):
-        self.connection_config = {
-            'dbname': dbname,
-            'user': user,
-            'password': password,
-            'host': host,
-            'port': port
-        }
+    def __init__(self, dbname=None, user=None, password=None, host=None, port=None, pool=None):
+        # Kredensial yang tidak diisi diambil dari DB_CONFIG
+        diberikan = {'dbname': dbname, 'user': user, 'password': password, 'host': host, 'port': port}
+        self.connection_config = {**DB_CONFIG, **{k: v for k, v in diberikan.items() if v is not None}}
+        self.pool = pool
         self.conn = None
+        self.service = None
 
     def connect(self):
         try:
-            self.conn = psycopg2.connect(**self.connection_config)
+            if self.pool is None:
+                self.pool = get_connection_pool(**self.connection_config)
+            self.conn = self.pool.getconn()
+            self.service = SipataniService(self.pool, koneksi=self.conn)
             print("Berhasil terhubung ke database PostgreSQL.")
             self.create_table_if_not_exists()
         except Exception as e:
@@ -964,117 +5854,195 @@ class LaporanMasalahDB:
 
     def close(self):
         if self.conn:
-            self.conn.close()
+            self.pool.putconn(self.conn)
+            self.conn = None
+            self.service = None
             print("Koneksi database ditutup.")
 
     def create_table_if_not_exists(self):
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS laporan_masalah (
-            id SERIAL PRIMARY KEY,
-            id_jadwal_tanam INTEGER NOT NULL,
-            tanggal_masalah DATE NOT NULL,
-            jenis VARCHAR(50) NOT NULL,
-            deskripsi TEXT NOT NULL,
-            status_penanganan VARCHAR(20) NOT NULL CHECK (status_penanganan IN ('Belum', 'Proses', 'Selesai')),
-            solusi TEXT
-        );
-        """
-        with self.conn.cursor() as cur:
-            cur.execute(create_table_query)
-            self.conn.commit()
-            print("Tabel 'laporan_masalah' siap digunakan.")
+        self.service.siapkan_tabel_laporan()
+        print("Tabel 'laporan_masalah' siap digunakan.")
 
     def lihat_laporan(self):
-        query = "SELECT * FROM laporan_masalah ORDER BY id;"
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(query)
-            records = cur.fetchall()
-            if not records:
-                print("Belum ada laporan masalah.")
-            else:
-                print("Daftar Laporan Masalah:")
-                for row in records:
-                    print(f"ID Laporan     : {row['id']}")
-                    print(f"ID Jadwal Tanam: {row['id_jadwal_tanam']}")
-                    print(f"Tanggal Masalah: {row['tanggal_masalah']}")
-                    print(f"Jenis Masalah  : {row['jenis']}")
-                    print(f"Deskripsi      : {row['deskripsi']}")
-                    print(f"Status         : {row['status_penanganan']}")
-                    print(f"Solusi         : {row['solusi'] if row['solusi'] else '-'}")
-                    print("-" * 40)
+        records = self.service.lihat_laporan()
+        if not records:
+            print("Belum ada laporan masalah.")
+        else:
+            print("Daftar Laporan Masalah:")
+            for row in records:
+                print(f"ID Laporan     : {row.id}")
+                print(f"ID Jadwal Tanam: {row.id_jadwal_tanam}")
+                print(f"Tanggal Masalah: {row.tanggal_masalah}")
+                print(f"Jenis Masalah  : {row.jenis}")
+                print(f"Deskripsi      : {row.deskripsi}")
+                print(f"Status         : {row.status_penanganan}")
+                print(f"Solusi         : {row.solusi if row.solusi else '-'}")
+                print("-" * 40)
+
+    def cari_laporan(self, kata_kunci=None, jenis=None, status_penanganan=None, tanggal_mulai=None,
+                     tanggal_selesai=None, id_jadwal_tanam=None, halaman=1):
+        try:
+            rentang = [datetime.datetime.strptime(t, "%Y-%m-%d").date() if t else None
+                       for t in (tanggal_mulai, tanggal_selesai)]
+        except ValueError:
+            print("Format tanggal salah. Gunakan format YYYY-MM-DD.")
+            return
+        try:
+            hasil = self.service.cari_laporan(FilterLaporan(
+                kata_kunci, jenis, status_penanganan, rentang[0], rentang[1], id_jadwal_tanam, halaman))
+        except ValidasiGagal as e:
+            print(e)
+            return
+        if not hasil.data:
+            print("Tidak ada laporan yang cocok.")
+            return
+        print(f"Hasil Pencarian Laporan (halaman {hasil.halaman}):")
+        for row in hasil.data:
+            skor = f" (skor {row.skor:.3f})" if row.skor is not None else ""
+            print(f"ID Laporan     : {row.id}{skor}")
+            print(f"ID Jadwal Tanam: {row.id_jadwal_tanam}")
+            print(f"Tanggal Masalah: {row.tanggal_masalah}")
+            print(f"Jenis Masalah  : {row.jenis}")
+            print(f"Deskripsi      : {row.cuplikan or row.deskripsi}")
+            print(f"Status         : {row.status_penanganan}")
+            print("-" * 40)
+        if hasil.ada_berikutnya:
+            print(f"Masih ada hasil lain, gunakan halaman={hasil.halaman + 1}.")
 
     def tambah_laporan(self, id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi):
-        insert_query = """
-        INSERT INTO laporan_masalah
-        (id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id;
-        """
-        try:
-            tanggal_obj = datetime.strptime(tanggal_masalah, "%Y-%m-%d").date()
+        try:
+            tanggal_obj = datetime.datetime.strptime(tanggal_masalah, "%Y-%m-%d").date()
         except ValueError:
             print("Format tanggal salah. Gunakan format YYYY-MM-DD.")
             return
-        if status_penanganan not in ('Belum', 'Proses', 'Selesai'):
-            print("Status penanganan harus salah satu dari: Belum, Proses, Selesai")
+        try:
+            laporan = self.service.tambah_laporan(LaporanMasalahInput(
+                id_jadwal_tanam, tanggal_obj, jenis, deskripsi, status_penanganan, solusi))
+        except ValidasiGagal as e:
+            print(e)
             return
-        with self.conn.cursor() as cur:
-            cur.execute(insert_query, (id_jadwal_tanam, tanggal_obj, jenis, deskripsi, status_penanganan, solusi))
-            new_id = cur.fetchone()[0]
-            self.conn.commit()
-            print(f"Laporan baru berhasil ditambahkan dengan ID {new_id}.")
+        print(f"Laporan baru berhasil ditambahkan dengan ID {laporan.id}.")
 
     def edit_laporan(self, id_laporan, id_jadwal_tanam, tanggal_masalah, jenis, deskripsi, status_penanganan, solusi):
-        update_query = """
-        UPDATE laporan_masalah 
-        SET id_jadwal_tanam=%s, tanggal_masalah=%s, jenis=%s, deskripsi=%s, status_penanganan=%s, solusi=%s
-        WHERE id=%s;
-        """
         try:
-            tanggal_obj = datetime.strptime(tanggal_masalah, "%Y-%m-%d").date()
+            tanggal_obj = datetime.datetime.strptime(tanggal_masalah, "%Y-%m-%d").date()
         except ValueError:
             print("Format tanggal salah. Gunakan format YYYY-MM-DD.")
             return
-        if status_penanganan not in ('Belum', 'Proses', 'Selesai'):
-            print("Status penanganan harus salah satu dari: Belum, Proses, Selesai")
+        try:
+            self.service.edit_laporan(id_laporan, LaporanMasalahInput(
+                id_jadwal_tanam, tanggal_obj, jenis, deskripsi, status_penanganan, solusi))
+        except SipataniError as e:
+            print(e)
             return
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM laporan_masalah WHERE id=%s;", (id_laporan,))
-            if cur.fetchone() is None:
-                print(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
-                return
-            cur.execute(update_query, (id_jadwal_tanam, tanggal_obj, jenis, deskripsi, status_penanganan, solusi, id_laporan))
-            self.conn.commit()
-            print(f"Laporan dengan ID {id_laporan} berhasil diedit.")
+        print(f"Laporan dengan ID {id_laporan} berhasil diedit.")
 
     def hapus_laporan(self, id_laporan):
-        delete_query = "DELETE FROM laporan_masalah WHERE id=%s;"
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM laporan_masalah WHERE id=%s;", (id_laporan,))
-            if cur.fetchone() is None:
-                print(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
-                return
-            cur.execute(delete_query, (id_laporan,))
-            self.conn.commit()
-            print(f"Laporan dengan ID {id_laporan} berhasil dihapus.")
+        try:
+            self.service.hapus_laporan(id_laporan)
+        except DataTidakDitemukan as e:
+            print(e)
+            return
+        print(f"Laporan dengan ID {id_laporan} berhasil dihapus.")
 
     def update_status_solusi(self, id_laporan, status_penanganan, solusi):
-        if status_penanganan not in ('Belum', 'Proses', 'Selesai'):
-            print("Status penanganan harus salah satu dari: Belum, Proses, Selesai")
+        try:
+            self.service.update_status_solusi(id_laporan, status_penanganan, solusi)
+        except SipataniError as e:
+            print(e)
             return
-        update_query = """
-        UPDATE laporan_masalah 
-        SET status_penanganan=%s, solusi=%s
-        WHERE id=%s;
-        """
-        with self.conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM laporan_masalah WHERE id=%s;", (id_laporan,))
-            if cur.fetchone() is None:
-                print(f"Laporan dengan ID {id_laporan} tidak ditemukan.")
-                return
-            cur.execute(update_query, (status_penanganan, solusi, id_laporan))
-            self.conn.commit()
-            print(f"Status penanganan dan solusi laporan ID {id_laporan} berhasil diperbarui.")
+        print(f"Status penanganan dan solusi laporan ID {id_laporan} berhasil diperbarui.")
 
     def kembali_ke_dashboard(self):
         print("Kembali ke Dashboard.")
+
+if __name__ == "__main__":
+    # Cek apakah library yang diperlukan sudah terinstall
+    try:
+        import psycopg2
+        from tabulate import tabulate
+    except ImportError as e:
+        print(f"Library yang diperlukan belum terinstall: {e}")
+        print("Jalankan perintah berikut untuk menginstall:")
+        print("pip install psycopg2-binary tabulate")
+        exit(1)
+    
+    parser = argparse.ArgumentParser(description="SIPATANI - Sistem Informasi Pertanian")
+    subparsers = parser.add_subparsers(dest="perintah")
+    parser_server = subparsers.add_parser("server", help="Jalankan API HTTP/JSON")
+    parser_server.add_argument("--host", default="127.0.0.1")
+    parser_server.add_argument("--port", type=int, default=8080)
+    parser_server.add_argument("--async-backend", action="store_true",
+                               help="Layani jadwal/pemupukan/stok lewat pool asyncpg")
+    parser_migrasi = subparsers.add_parser("migrasi", help="Terapkan migrasi skema dan indeks")
+    parser_migrasi.add_argument("--status", action="store_true", help="Hanya tampilkan status migrasi")
+    subparsers.add_parser("analisis-query", help="EXPLAIN (ANALYZE, BUFFERS) semua query dan tandai Seq Scan")
+    parser_status = subparsers.add_parser("perbarui-status", help="Majukan status jadwal tanam sesuai tanggal")
+    parser_status.add_argument("--penuh", action="store_true", help="Periksa semua jadwal, bukan hanya sejak run terakhir")
+    parser_bench = subparsers.add_parser("benchmark", help="Benchmark query dengan data sintetis")
+    parser_bench.add_argument("--db", default=DB_BENCHMARK, help="Database benchmark (isinya akan dihapus!)")
+    parser_bench.add_argument("--skala", type=int, default=10_000, help="Jumlah baris Jadwal_Tanam")
+    parser_bench.add_argument("--seed", type=int, default=42)
+    parser_bench.add_argument("--iterasi", type=int, default=50)
+    parser_bench.add_argument("--hanya", nargs="+", help="Hanya jalankan skenario tertentu")
+    parser_bench.add_argument("--output", help="File JSON hasil")
+    parser_bench.add_argument("--bandingkan", help="File JSON hasil sebelumnya sebagai pembanding")
+    parser_bench.add_argument("--ambang-regresi", type=float, default=20.0, help="Persen kenaikan p95 yang dianggap regresi")
+    parser_bench.add_argument("--tanpa-generate", action="store_true", help="Pakai data yang sudah ada")
+    parser_bench.add_argument("--tanpa-prepared", action="store_true", help="Jalankan query tanpa prepared statement")
+    parser_bench.add_argument("--tanpa-migrasi", action="store_true", help="Lepas indeks non-unik dari MigrasiSkema (tabel dan fungsi tetap dipasang)")
+    parser_cdc = subparsers.add_parser("cdc", help="Alirkan event perubahan jadwal/panen/laporan ke file JSON Lines")
+    parser_cdc.add_argument("path", help="File JSON Lines tujuan (ditambahkan di akhir)")
+    parser_cdc.add_argument("--nama", default="jsonl", help="Nama konsumen; offset disimpan per nama")
+    parser_cdc.add_argument("--tabel", nargs="+", choices=list(TABEL_CDC), help="Hanya event tabel tertentu")
+    parser_cdc.add_argument("--batch", type=int, default=UKURAN_BATCH_CDC, help="Event per batch")
+    parser_cdc.add_argument("--sekali", action="store_true", help="Kirim event yang tertunda lalu keluar")
+    parser_cdc.add_argument("--bersihkan", type=int, metavar="HARI",
+                            help="Hapus event lebih tua dari HARI yang sudah dibaca semua konsumen, lalu keluar")
+    parser_partisi = subparsers.add_parser("partisi", help="Kelola partisi tanggal Hasil_Panen/Jadwal_Tanam/laporan_masalah")
+    aksi_partisi = parser_partisi.add_subparsers(dest="aksi")
+    aksi_partisi.add_parser("status", help="Daftar partisi (default)")
+    parser_konversi = aksi_partisi.add_parser("konversi", help="Ubah tabel biasa menjadi tabel partisi (sekali)")
+    parser_konversi.add_argument("tabel", choices=list(TABEL_PARTISI))
+    parser_konversi.add_argument("--bulan", type=int, default=BULAN_PER_PARTISI, help="Bulan per partisi")
+    parser_konversi.add_argument("--ke-depan", type=int, default=PARTISI_KE_DEPAN, help="Partisi ke depan")
+    parser_siapkan = aksi_partisi.add_parser("siapkan", help="Buat partisi untuk periode mendatang")
+    parser_siapkan.add_argument("--ke-depan", type=int, default=PARTISI_KE_DEPAN)
+    parser_lepas = aksi_partisi.add_parser("lepas", help="DETACH partisi yang seluruhnya sebelum tanggal tertentu")
+    parser_lepas.add_argument("tabel", choices=list(TABEL_PARTISI))
+    parser_lepas.add_argument("--sebelum", required=True, help="YYYY-MM-DD")
+    tujuan_lepas = parser_lepas.add_mutually_exclusive_group()
+    tujuan_lepas.add_argument("--arsip", metavar="DIR", help="Ekspor partisi ke DIR/<partisi>.csv lalu DROP")
+    tujuan_lepas.add_argument("--hapus", action="store_true", help="DROP partisi tanpa arsip")
+    subparsers.add_parser("cek-replika", help="Tampilkan lag dan kelayakan replika baca (SIPATANI_DB_REPLIKA)")
+    parser_ekspor = subparsers.add_parser("ekspor", help="Ekspor listing ke CSV, JSON Lines atau Parquet")
+    parser_ekspor.add_argument("sumber", choices=list(EksporData.SUMBER))
+    parser_ekspor.add_argument("path", help="File tujuan, format ditebak dari ekstensi")
+    parser_ekspor.add_argument("--format", choices=EksporData.FORMAT)
+    parser_ekspor.add_argument("--batch", type=int, default=EksporData.UKURAN_BATCH, help="Baris per fetch cursor")
+    args = parser.parse_args()
+    
+    # Subcommand non-interaktif menampilkan log (misal penjadwal status) ke stderr
+    if args.perintah:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    
+    if args.perintah == "server":
+        jalankan_server(args.host, args.port, args.async_backend)
+    elif args.perintah == "migrasi":
+        jalankan_migrasi(args.status)
+    elif args.perintah == "analisis-query":
+        jalankan_analisis_query()
+    elif args.perintah == "perbarui-status":
+        exit(jalankan_perbarui_status(args.penuh))
+    elif args.perintah == "benchmark":
+        exit(jalankan_benchmark(args))
+    elif args.perintah == "ekspor":
+        exit(jalankan_ekspor(args))
+    elif args.perintah == "cdc":
+        exit(jalankan_cdc(args))
+    elif args.perintah == "partisi":
+        exit(jalankan_partisi(args))
+    elif args.perintah == "cek-replika":
+        exit(jalankan_cek_replika())
+    else:
+        main()
@@ -0,0 +1,156 @@
+import asyncio
+import importlib.util
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import psycopg2
+import pytest
+
+# Nama file program memakai spasi, jadi dimuat lewat importlib sebagai modul "kode_program"
+_PATH_PROGRAM = Path(__file__).resolve().parents[1] / "kode program.py"
+if "kode_program" not in sys.modules:
+    _spec = importlib.util.spec_from_file_location("kode_program", _PATH_PROGRAM)
+    _modul = importlib.util.module_from_spec(_spec)
+    sys.modules["kode_program"] = _modul
+    _spec.loader.exec_module(_modul)
+
+import kode_program as kp  # noqa: E402
+
+# Tes integrasi memakai database ini (default sipatani_test, bukan database aplikasi); setiap tes
+# mendapat skema baru lewat search_path yang di-DROP setelah selesai. Tanpa server tes di-skip.
+DB_UJI = os.environ.get("SIPATANI_TEST_DB", "sipatani_test")
+
+
+class CursorPalsu:
+    # Cursor tanpa database: mencatat query dan mengembalikan hasil fetch sesuai urutan yang disiapkan
+    def __init__(self, hasil=()):
+        self.hasil = list(hasil)
+        self.query = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, param=None):
+        self.query.append((query, param))
+
+    def fetchall(self):
+        return self.hasil.pop(0)
+
+    def fetchone(self):
+        return self.hasil.pop(0)
+
+
+class KoneksiPalsu:
+    closed = 0
+
+    def __init__(self, cursor: CursorPalsu):
+        self.cur = cursor
+        self.jumlah_commit = 0
+        self.jumlah_rollback = 0
+
+    def cursor(self, name=None):
+        return self.cur
+
+    def commit(self):
+        self.jumlah_commit += 1
+
+    def rollback(self):
+        self.jumlah_rollback += 1
+
+
+class PoolPalsu:
+    maxconn = 2
+
+    def __init__(self, koneksi: KoneksiPalsu):
+        self.koneksi = koneksi
+        self.jumlah_getconn = 0
+        self.dipinjam = 0
+
+    def getconn(self):
+        self.jumlah_getconn += 1
+        self.dipinjam += 1
+        return self.koneksi
+
+    def putconn(self, conn):
+        self.dipinjam -= 1
+
+
+class ServicePalsu:
+    # Service untuk tes rute HTTP: setiap metode mencatat argumennya lalu mengembalikan hasil atau error
+    pool = None
+
+    def __init__(self, hasil=None, error=None):
+        self.hasil = hasil
+        self.error = error
+        self.dipanggil = []
+
+    def __getattr__(self, nama):
+        def metode(*args):
+            self.dipanggil.append((nama, args))
+            if self.error is not None:
+                raise self.error
+            return self.hasil
+        return metode
+
+
+def proses_lengkap(service, metode, target, body=b"", headers=None):
+    server = kp.SipataniHttpServer(service, max_workers=1)
+    try:
+        return asyncio.run(server._proses(metode, target, body, headers))
+    finally:
+        server.executor.shutdown()
+
+
+def proses(service, metode, target, body=b""):
+    return proses_lengkap(service, metode, target, body)[:2]
+
+
+@pytest.fixture
+def skema_uji():
+    # Config koneksi ke skema kosong; semua objek (tabel, fungsi, sequence) dibuat di skema ini
+    config = {**kp.DB_CONFIG, "dbname": DB_UJI}
+    try:
+        admin = psycopg2.connect(connect_timeout=3, **config)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"PostgreSQL tidak tersedia ({DB_UJI}): {e}")
+    admin.autocommit = True
+    skema = f"uji_{uuid.uuid4().hex[:12]}"
+    with admin.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {skema};")
+    pool = kp.SipataniConnectionPool(minconn=1, maxconn=4, options=f"-c search_path={skema}", **config)
+    try:
+        yield pool
+    finally:
+        pool.tutup()
+        with admin.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {skema} CASCADE;")
+        admin.close()
+
+
+@pytest.fixture
+def skema_dasar(skema_uji):
+    # Tabel asli aplikasi (Petani ... Masalah_Tanam) tanpa migrasi
+    with skema_uji.koneksi() as conn, conn.cursor() as cur:
+        for query in kp.GeneratorDataSintetis.DDL:
+            cur.execute(query)
+    return skema_uji
+
+
+@pytest.fixture
+def skema_lengkap(skema_dasar):
+    with skema_dasar.koneksi() as conn:
+        kp.MigrasiSkema().jalankan(conn)
+    return skema_dasar
+
+
+@pytest.fixture
+def skema_berisi(skema_lengkap):
+    # Data sintetis kecil (seed tetap) di atas skema lengkap
+    with skema_lengkap.koneksi() as conn:
+        kp.GeneratorDataSintetis(conn, skala=200, seed=7).bangkitkan()
+    return skema_lengkap
@@ -0,0 +1,11 @@
+import kode_program as kp
+
+
+def test_sql_asyncpg_menomori_placeholder():
+    assert kp.sql_asyncpg("SELECT * FROM t WHERE a = %s AND b > %s;") == "SELECT * FROM t WHERE a = $1 AND b > $2;"
+    assert kp.sql_asyncpg("SELECT 1;") == "SELECT 1;"
+
+
+def test_jumlah_baris_dari_status_perintah():
+    assert kp._jumlah_baris("DELETE 3") == 3
+    assert kp._jumlah_baris("INSERT 0 12") == 12
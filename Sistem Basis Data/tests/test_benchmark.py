@@ -0,0 +1,31 @@
+import json
+
+import kode_program as kp
+
+
+def test_persentil():
+    assert kp._persentil([5.0, 1.0, 3.0, 2.0, 4.0], 50) == 3.0
+    assert kp._persentil([5.0, 1.0, 3.0, 2.0, 4.0], 95) == 5.0
+    assert kp._persentil([7.0], 99) == 7.0
+
+
+def test_generator_jumlah_baris_per_tabel():
+    param = kp.GeneratorDataSintetis(None, skala=200).param
+    assert param["jadwal_tanam"] == 200 and param["hasil_panen"] == 100
+    assert param["id_jadwal"] == kp.ID_SEQUENCES["jadwal_tanam_id_seq"][2]
+
+
+def test_bandingkan_benchmark(tmp_path):
+    pembanding = tmp_path / "lama.json"
+    pembanding.write_text(json.dumps({"hasil": [
+        {"nama": "lihat_jadwal", "p95_ms": 10.0},
+        {"nama": "cari_laporan", "p95_ms": 20.0},
+        {"nama": "kosong", "p95_ms": 0},
+    ]}), encoding="utf-8")
+    regresi = kp.bandingkan_benchmark([
+        {"nama": "lihat_jadwal", "p95_ms": 13.0},
+        {"nama": "cari_laporan", "p95_ms": 21.0},
+        {"nama": "kosong", "p95_ms": 5.0},
+        {"nama": "baru", "p95_ms": 99.0},
+    ], str(pembanding), ambang_persen=20.0)
+    assert regresi == ["lihat_jadwal: p95 10.0 ms -> 13.0 ms (+30.0%)"]
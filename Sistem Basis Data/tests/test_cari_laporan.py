@@ -0,0 +1,39 @@
+import pytest
+
+import kode_program as kp
+
+
+def test_query_cari_laporan_dengan_kata_kunci():
+    query, param = kp._query_cari_laporan(kp.FilterLaporan(
+        kata_kunci="  ulat grayak ", status_penanganan="Belum", halaman=3, ukuran_halaman=10))
+    assert "websearch_to_tsquery('simple', %(kata_kunci)s)" in query
+    assert "lm.dokumen @@ q AND lm.status_penanganan = %(status_penanganan)s" in query
+    # Satu baris lebih untuk mendeteksi halaman berikutnya
+    assert param == {"batas": 11, "offset": 20, "kata_kunci": "ulat grayak", "status_penanganan": "Belum"}
+
+
+def test_query_cari_laporan_tanpa_kriteria():
+    query, param = kp._query_cari_laporan(kp.FilterLaporan())
+    assert "websearch_to_tsquery" not in query
+    assert "lm.tanggal_masalah DESC, lm.id DESC" in query
+    assert param == {"batas": kp.UKURAN_HALAMAN_LAPORAN + 1, "offset": 0}
+
+
+@pytest.mark.parametrize("filter_laporan", [
+    kp.FilterLaporan(halaman=0),
+    kp.FilterLaporan(ukuran_halaman=kp.MAKS_UKURAN_HALAMAN_LAPORAN + 1),
+    kp.FilterLaporan(status_penanganan="Ditunda"),
+])
+def test_query_cari_laporan_menolak_filter_tidak_valid(filter_laporan):
+    with pytest.raises(kp.ValidasiGagal):
+        kp._query_cari_laporan(filter_laporan)
+
+
+def test_cari_laporan_dengan_indeks_teks(skema_berisi):
+    service = kp.SipataniService(skema_berisi)
+    halaman = service.cari_laporan(kp.FilterLaporan(kata_kunci="ulat grayak", status_penanganan="Belum",
+                                                    ukuran_halaman=5))
+    assert halaman.data and len(halaman.data) <= 5
+    for laporan in halaman.data:
+        assert "ulat grayak" in laporan.deskripsi and laporan.status_penanganan == "Belum"
+        assert laporan.skor > 0
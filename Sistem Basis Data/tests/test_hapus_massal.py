@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+import kode_program as kp
+from conftest import CursorPalsu, KoneksiPalsu, PoolPalsu
+
+
+def test_kondisi_filter_jadwal_menggabungkan_kriteria():
+    kondisi, param = kp._kondisi_filter_jadwal(kp.FilterJadwal(
+        id_jadwal_tanam=(1, 2), tanggal_mulai=datetime.date(2026, 1, 1), status_jadwal_id=kp.STATUS_TERJADWAL))
+    assert kondisi == "jt.id_jadwal_tanam = ANY(%s) AND jt.tanggal >= %s AND jt.status_jadwal_id = %s"
+    assert param == [[1, 2], datetime.date(2026, 1, 1), kp.STATUS_TERJADWAL]
+
+
+def test_kondisi_filter_jadwal_tanpa_kriteria_ditolak():
+    with pytest.raises(kp.ValidasiGagal):
+        kp._kondisi_filter_jadwal(kp.FilterJadwal())
+
+
+def test_hapus_jadwal_menghitung_laporan_masalah():
+    cur = CursorPalsu([(1, 2, 0, 3)])
+    service = kp.SipataniService(PoolPalsu(KoneksiPalsu(cur)))
+    assert service.hapus_jadwal(9) == kp.HasilHapusJadwal(9, 2, 0, 3)
+    assert "DELETE FROM laporan_masalah" in cur.query[0][0]
+
+
+def test_hapus_jadwal_massal_tanpa_laporan_yatim(skema_berisi):
+    service = kp.SipataniService(skema_berisi)
+    with skema_berisi.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT min(id_jadwal_tanam) FROM Jadwal_Tanam;")
+        id_jadwal = cur.fetchone()[0]
+        cur.execute("DELETE FROM laporan_masalah WHERE id_jadwal_tanam = %s;", (id_jadwal,))
+        for _ in range(2):
+            cur.execute(kp.QUERY_TAMBAH_LAPORAN, (id_jadwal, datetime.date.today(), "Hama", "wereng", "Belum", None))
+    filter_jadwal = kp.FilterJadwal(id_jadwal_tanam=[id_jadwal])
+    pratinjau = service.pratinjau_hapus_massal(filter_jadwal)
+    assert pratinjau.jadwal_tanam == 1 and pratinjau.laporan_masalah == 2
+    assert service.hitung_data_terkait(id_jadwal)["laporan_masalah"] == 2
+    assert service.hapus_jadwal_massal(filter_jadwal) == pratinjau
+    with skema_berisi.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM laporan_masalah WHERE id_jadwal_tanam = %s;", (id_jadwal,))
+        assert cur.fetchone()[0] == 0
@@ -0,0 +1,112 @@
+import datetime
+import logging
+
+import psycopg2
+import pytest
+
+import kode_program as kp
+from conftest import CursorPalsu, KoneksiPalsu, PoolPalsu, ServicePalsu, proses, proses_lengkap
+
+
+def test_dari_json_mengubah_tanggal_iso():
+    perubahan = kp.dari_json(kp.PerubahanJadwal, {"id_jadwal_tanam": 3, "tanggal": "2026-02-01", "versi": 7})
+    assert perubahan == kp.PerubahanJadwal(3, tanggal=datetime.date(2026, 2, 1), versi=7)
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"id_jadwal_tanam": 1, "warna": "merah"},
+    {"id_jadwal_tanam": 1, "tanggal": "01-02-2026"},
+    {"tanggal": "2026-02-01"},
+])
+def test_dari_json_menolak_body_tidak_valid(data):
+    with pytest.raises(kp.ValidasiGagal):
+        kp.dari_json(kp.PerubahanJadwal, data)
+
+
+@pytest.mark.parametrize("error, status", [
+    (kp.DataTidakDitemukan("tidak ada"), 404),
+    (kp.KonflikVersi("sudah diubah"), 409),
+    (kp.ValidasiGagal("salah"), 400),
+    (psycopg2.OperationalError("putus"), 500),
+])
+def test_proses_memetakan_error_ke_status(error, status):
+    kode, payload = proses(ServicePalsu(error=error), "GET", "/jadwal/5")
+    assert kode == status
+    assert str(error) in payload["error"]
+
+
+@pytest.mark.parametrize("error", [TypeError("bug"), AttributeError("bug"), KeyError("bug")])
+def test_proses_error_tak_terduga_menjadi_500(caplog, error):
+    # Bug di server tidak boleh tampil sebagai kesalahan klien atau menutup koneksi tanpa respons
+    with caplog.at_level(logging.ERROR, logger="sipatani.api"):
+        kode, payload = proses(ServicePalsu(error=error), "GET", "/jadwal/5")
+    assert (kode, payload) == (500, {"error": "Error internal server"})
+    assert "GET /jadwal/5" in caplog.text
+
+
+def test_proses_status_sukses():
+    assert proses(ServicePalsu(hasil={"id": 1}), "POST", "/jadwal",
+                  b'{"tanggal": "2026-03-01", "id_lahan": 2, "id_tanaman": 3}')[0] == 201
+    assert proses(ServicePalsu(), "DELETE", "/jadwal/5") == (204, None)
+
+
+def test_proses_patch_stok_minimum():
+    service = ServicePalsu(hasil={"id_barang": 1})
+    assert proses(service, "PATCH", "/stok/barang/1", b'{"stok_minimum": 5}')[0] == 200
+    assert service.dipanggil == [("atur_stok_minimum", (1, 5.0))]
+
+
+@pytest.mark.parametrize("metode, target, body, status", [
+    ("POST", "/jadwal", b"{bukan json", 400),
+    ("POST", "/jadwal", b'{"tanggal": "2026-03-01", "warna": 1}', 400),
+    # Field wajib hilang dan bentuk JSON yang salah dijawab 400, bukan KeyError/TypeError
+    ("PATCH", "/stok/barang/1", b"{}", 400),
+    ("PATCH", "/stok/barang/1", b'{"stok_minimum": "banyak"}', 400),
+    ("PATCH", "/jadwal/3", b"[1, 2]", 400),
+    ("PATCH", "/jadwal", b'{"id_jadwal_tanam": 1}', 400),
+    ("POST", "/jadwal/geser", b"[]", 400),
+    ("PATCH", "/laporan/1/status", b'"Selesai"', 400),
+    ("GET", "/jadwal?ukuran=banyak", b"", 400),
+    ("GET", "/analitik/panen?mulai=kemarin", b"", 400),
+    ("PUT", "/jadwal/5", b"", 405),
+    ("GET", "/tidak-ada", b"", 404),
+])
+def test_proses_request_tidak_valid(metode, target, body, status):
+    service = ServicePalsu(hasil={})
+    assert proses(service, metode, target, body)[0] == status
+    if status == 400:
+        assert service.dipanggil == []
+
+
+class _ServiceLsn:
+    # Tulisan menaikkan LSN lewat router seperti _transaksi -> catat_tulis; baca mencatat LSN yang terlihat
+    def __init__(self):
+        self.pool = kp.RouterKoneksi(PoolPalsu(KoneksiPalsu(CursorPalsu())))
+        self.lsn_terlihat = []
+
+    def lihat_laporan(self):
+        self.lsn_terlihat.append(self.pool.lsn_tulis())
+        return []
+
+    def hapus_laporan(self, id_laporan):
+        self.pool.atur_lsn_tulis(700 + id_laporan)
+
+
+def test_proses_membawa_lsn_tulis_per_klien():
+    service = _ServiceLsn()
+    kode, _, header = proses_lengkap(service, "DELETE", "/laporan/5", headers={"x-sipatani-lsn": "650"})
+    assert (kode, header) == (204, {"X-Sipatani-LSN": "705"})
+    # Request klien lain di thread executor yang sama tidak mewarisi LSN tersebut
+    assert proses_lengkap(service, "GET", "/laporan")[2] == {}
+    kode, _, header = proses_lengkap(service, "GET", "/laporan", headers={"x-sipatani-lsn": "705"})
+    assert (kode, header) == (200, {"X-Sipatani-LSN": "705"})
+    assert service.lsn_terlihat == [None, 705]
+
+
+@pytest.mark.parametrize("nilai, lsn", [(None, None), ("", None), ("123", 123), ("inf", float("inf")),
+                                        ("rusak", float("inf"))])
+def test_parse_lsn(nilai, lsn):
+    assert kp._parse_lsn(nilai) == lsn
+    if lsn is not None:
+        assert kp._parse_lsn(kp._format_lsn(lsn)) == lsn
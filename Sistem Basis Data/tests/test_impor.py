@@ -0,0 +1,39 @@
+import kode_program as kp
+from conftest import CursorPalsu
+
+
+class _CursorCopy(CursorPalsu):
+    def copy_expert(self, perintah, f):
+        self.isi_copy = f.read()
+
+
+class _DatabasePalsu:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.connection = None
+
+
+def test_copy_ke_staging_membuang_bom(tmp_path, monkeypatch):
+    path = tmp_path / "jadwal.csv"
+    path.write_bytes("\ufefftanggal,id_lahan,id_tanaman\n2026-03-01,2,3\n".encode("utf-8"))
+    cur = _CursorCopy([(1,)])
+    monkeypatch.setattr(kp.sql.Composed, "as_string", lambda self, conn: repr(self))
+    impor = kp.ImporMassalManager(_DatabasePalsu(cur))
+    assert impor._copy_ke_staging(str(path), "staging_jadwal_tanam", impor.KOLOM_CSV_JADWAL) == 1
+    assert cur.isi_copy == "2026-03-01,2,3\n"
+
+
+def test_impor_jadwal_tanpa_status_memakai_terjadwal(skema_berisi, tmp_path):
+    with skema_berisi.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT min(id_lahan) FROM Lahan;")
+        id_lahan = cur.fetchone()[0]
+        cur.execute("SELECT min(id_tanaman) FROM Tanaman;")
+        id_tanaman = cur.fetchone()[0]
+    path = tmp_path / "jadwal.csv"
+    path.write_text(f"tanggal,id_lahan,id_tanaman\n2030-01-05,{id_lahan},{id_tanaman}\n", encoding="utf-8-sig")
+    db = kp.SipataniDatabase(skema_berisi)
+    with db.sesi():
+        assert kp.ImporMassalManager(db).impor_jadwal_tanam(str(path))["dimasukkan"] == 1
+    with skema_berisi.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT status_jadwal_id FROM Jadwal_Tanam WHERE tanggal = '2030-01-05';")
+        assert cur.fetchall() == [(kp.STATUS_TERJADWAL,)]
@@ -0,0 +1,17 @@
+import datetime
+
+import kode_program as kp
+
+
+def test_bangun_kalender_pemupukan():
+    rencana = kp.RencanaPemupukanInput(id_jadwal_tanam=[5, 6], jenis="Pupuk", nama_kegiatan="Urea",
+                                       nama_pupuk="Urea", dosis_per_bibit=2.5, interval_hari=14,
+                                       jumlah_kejadian=2, mulai_hari_ke=7)
+    tanam = datetime.date(2026, 1, 1)
+    kejadian = kp.bangun_kalender_pemupukan(rencana, [(5, 10, tanam), (6, 11, tanam + datetime.timedelta(days=1))])
+    assert kejadian == [
+        ("Urea ke-1", datetime.date(2026, 1, 8), 2.5, 10, 5),
+        ("Urea ke-2", datetime.date(2026, 1, 22), 2.5, 10, 5),
+        ("Urea ke-1", datetime.date(2026, 1, 9), 2.5, 11, 6),
+        ("Urea ke-2", datetime.date(2026, 1, 23), 2.5, 11, 6),
+    ]
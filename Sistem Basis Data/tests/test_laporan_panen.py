@@ -0,0 +1,28 @@
+import datetime
+
+import pytest
+
+import kode_program as kp
+from conftest import CursorPalsu, KoneksiPalsu, PoolPalsu
+
+
+@pytest.mark.parametrize("mulai, selesai, tabel, periode", [
+    (datetime.date(2026, 1, 1), datetime.date(2026, 3, 31), "rekap_panen_bulanan", "bulan"),
+    (datetime.date(2026, 1, 15), datetime.date(2026, 3, 31), "rekap_panen_harian", "tanggal"),
+])
+def test_laporan_panen_per_bulan_memakai_kolom_periode(mulai, selesai, tabel, periode):
+    cur = CursorPalsu([[(datetime.date(2026, 2, 1), "2026-02", 120.5, 600000, 3)]])
+    service = kp.SipataniService(PoolPalsu(KoneksiPalsu(cur)))
+    hasil = service.laporan_panen("bulan", mulai, selesai, segarkan=False)
+    assert hasil == [kp.BarisLaporanPanen(datetime.date(2026, 2, 1), "2026-02", 120.5, 600000, 3)]
+    query, param = cur.query[0]
+    assert f"FROM {tabel} r" in query
+    assert f"date_trunc('month', r.{periode})::date" in query and f"to_char(r.{periode}, 'YYYY-MM')" in query
+    assert "{" not in query
+    assert param == (mulai, selesai)
+
+
+def test_laporan_panen_dimensi_tidak_dikenal():
+    service = kp.SipataniService(PoolPalsu(KoneksiPalsu(CursorPalsu())))
+    with pytest.raises(kp.ValidasiGagal):
+        service.laporan_panen("musim", segarkan=False)
@@ -0,0 +1,36 @@
+import kode_program as kp
+
+
+def test_migrasi_database_baru(skema_dasar):
+    # Semua migrasi harus jalan di atas tabel asli saja, tanpa siapkan_aplikasi lebih dulu
+    migrasi = kp.MigrasiSkema()
+    with skema_dasar.koneksi() as conn:
+        diterapkan = migrasi.jalankan(conn)
+        assert diterapkan == [versi for versi, _, _ in kp.MigrasiSkema.MIGRASI]
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('laporan_masalah') IS NOT NULL;")
+            assert cur.fetchone()[0]
+        assert migrasi.jalankan(conn) == []
+
+
+def test_migrasi_indeks_tanpa_unique():
+    nama = [n for n, _ in kp.MigrasiSkema().indeks()]
+    assert "idx_jadwal_tanam_status" in nama
+    # Indeks UNIQUE dipakai ON CONFLICT, tidak boleh dilepas untuk baseline benchmark
+    assert "idx_mutasi_stok_pemakaian" not in nama
+
+
+def test_atur_indeks_baseline_tetap_fungsional(skema_lengkap):
+    migrasi = kp.MigrasiSkema()
+    with skema_lengkap.koneksi() as conn:
+        migrasi.atur_indeks(conn, aktif=False)
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('idx_jadwal_tanam_status') IS NULL, "
+                        "to_regclass('idx_mutasi_stok_pemakaian') IS NOT NULL, "
+                        "to_regprocedure('catat_hasil_panen_massal(integer[], date[], numeric[], numeric[], "
+                        "integer, integer)') IS NOT NULL;")
+            assert cur.fetchone() == (True, True, True)
+        migrasi.atur_indeks(conn, aktif=True)
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass('idx_jadwal_tanam_status') IS NOT NULL;")
+            assert cur.fetchone()[0]
@@ -0,0 +1,68 @@
+import datetime
+
+import psycopg2
+import pytest
+
+import kode_program as kp
+from conftest import CursorPalsu, KoneksiPalsu, PoolPalsu
+
+TANGGAL = datetime.date(2026, 3, 1)
+
+
+def test_input_hasil_panen_massal_memetakan_error_fungsi():
+    class CursorError(CursorPalsu):
+        def execute(self, query, param=None):
+            super().execute(query, param)
+            raise _ErrorPanen()
+
+    class _ErrorPanen(psycopg2.Error):
+        pgcode = "22023"
+
+    cur = CursorError()
+    service = kp.SipataniService(PoolPalsu(KoneksiPalsu(cur)))
+    with pytest.raises(kp.ValidasiGagal):
+        service.input_hasil_panen(kp.HasilPanenInput(1, TANGGAL, 10, 5000))
+    query, param = cur.query[0]
+    assert query == kp.QUERY_CATAT_HASIL_PANEN_MASSAL
+    assert param == ([1], [TANGGAL], [10], [5000], kp.STATUS_SIAP_PANEN, kp.ID_KEGIATAN_DEFAULT)
+    with pytest.raises(kp.ValidasiGagal):
+        service.input_hasil_panen(kp.HasilPanenInput(1, TANGGAL, 0, 5000))
+
+
+def _jadwal_per_status(pool, status):
+    with pool.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT id_jadwal_tanam FROM Jadwal_Tanam WHERE status_jadwal_id = %s ORDER BY 1 LIMIT 2;",
+                    (status,))
+        return [row[0] for row in cur.fetchall()]
+
+
+def _jumlah_panen(pool):
+    with pool.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM Hasil_Panen;")
+        return cur.fetchone()[0]
+
+
+def test_catat_hasil_panen_massal_satu_round_trip(skema_berisi):
+    service = kp.SipataniService(skema_berisi)
+    siap = _jadwal_per_status(skema_berisi, kp.STATUS_SIAP_PANEN)
+    assert siap
+    sebelum = _jumlah_panen(skema_berisi)
+    hasil = service.input_hasil_panen_massal([kp.HasilPanenInput(i, TANGGAL, 12.5, 4000) for i in siap])
+    assert [h.id_jadwal_tanam for h in hasil] == siap
+    # ID dari sequence, setelah data sintetis yang mulai dari ID awal lama
+    assert all(h.id_panen > kp.ID_SEQUENCES["hasil_panen_id_seq"][2] for h in hasil)
+    assert all(h.total_nilai == 50000 for h in hasil)
+    assert _jumlah_panen(skema_berisi) == sebelum + len(siap)
+
+
+def test_catat_hasil_panen_massal_semua_atau_tidak_sama_sekali(skema_berisi):
+    service = kp.SipataniService(skema_berisi)
+    siap = _jadwal_per_status(skema_berisi, kp.STATUS_SIAP_PANEN)[0]
+    belum = _jadwal_per_status(skema_berisi, kp.STATUS_TERJADWAL)[0]
+    sebelum = _jumlah_panen(skema_berisi)
+    with pytest.raises(kp.ValidasiGagal, match="belum siap panen"):
+        service.input_hasil_panen_massal([kp.HasilPanenInput(siap, TANGGAL, 10, 5000),
+                                          kp.HasilPanenInput(belum, TANGGAL, 10, 5000)])
+    with pytest.raises(kp.DataTidakDitemukan):
+        service.input_hasil_panen(kp.HasilPanenInput(-1, TANGGAL, 10, 5000))
+    assert _jumlah_panen(skema_berisi) == sebelum
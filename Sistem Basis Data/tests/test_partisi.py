@@ -0,0 +1,64 @@
+import datetime
+
+import pytest
+
+import kode_program as kp
+
+
+@pytest.mark.parametrize("tanggal, bulan, awal", [
+    (datetime.date(2026, 1, 1), 3, datetime.date(2026, 1, 1)),
+    (datetime.date(2026, 5, 17), 3, datetime.date(2026, 4, 1)),
+    (datetime.date(2026, 12, 31), 6, datetime.date(2026, 7, 1)),
+    (datetime.date(2026, 8, 9), 12, datetime.date(2026, 1, 1)),
+])
+def test_awal_periode(tanggal, bulan, awal):
+    assert kp._awal_periode(tanggal, bulan) == awal
+
+
+@pytest.mark.parametrize("tanggal, bulan, hasil", [
+    (datetime.date(2026, 11, 15), 3, datetime.date(2027, 2, 1)),
+    (datetime.date(2026, 1, 1), -1, datetime.date(2025, 12, 1)),
+    (datetime.date(2026, 4, 1), 0, datetime.date(2026, 4, 1)),
+])
+def test_tambah_bulan(tanggal, bulan, hasil):
+    assert kp._tambah_bulan(tanggal, bulan) == hasil
+
+
+def test_batas_partisi():
+    assert kp._batas_partisi("FOR VALUES FROM ('2026-01-01') TO ('2026-04-01')") == (
+        datetime.date(2026, 1, 1), datetime.date(2026, 4, 1))
+    assert kp._batas_partisi("FOR VALUES FROM (MINVALUE) TO ('2026-01-01')") == (None, datetime.date(2026, 1, 1))
+    assert kp._batas_partisi("DEFAULT") == (None, None)
+    assert kp._batas_partisi(None) == (None, None)
+
+
+def _partisi_laporan(cur, deskripsi):
+    cur.execute("SELECT tableoid::regclass::text FROM laporan_masalah WHERE deskripsi = %s;", (deskripsi,))
+    return cur.fetchone()[0]
+
+
+def test_konversi_menerima_tanggal_di_luar_partisi(skema_lengkap):
+    manajer = kp.ManajerPartisi(skema_lengkap, ke_depan=1)
+    hari_ini = datetime.date.today()
+    jauh = hari_ini.replace(year=hari_ini.year + 10, day=1)
+    with skema_lengkap.koneksi() as conn, conn.cursor() as cur:
+        cur.execute(kp.QUERY_TAMBAH_LAPORAN, (1, hari_ini, "Hama", "sekarang", "Belum", None))
+    hasil = manajer.konversi("laporan_masalah", bulan_per_partisi=3)
+    assert hasil["baris"] == 1
+    
+    # Entri mundur dan jauh ke depan masuk partisi DEFAULT, bukan error
+    with skema_lengkap.koneksi() as conn, conn.cursor() as cur:
+        cur.execute(kp.QUERY_TAMBAH_LAPORAN, (1, datetime.date(2000, 1, 15), "Hama", "mundur", "Belum", None))
+        cur.execute(kp.QUERY_TAMBAH_LAPORAN, (1, jauh, "Hama", "ulat grayak", "Belum", None))
+        assert _partisi_laporan(cur, "mundur") == "laporan_masalah_default"
+        assert _partisi_laporan(cur, "ulat grayak") == "laporan_masalah_default"
+    
+    # Partisi baru untuk rentang itu memindahkan barisnya keluar dari DEFAULT
+    assert manajer.siapkan_mendatang(jauh) == 2
+    with skema_lengkap.koneksi() as conn, conn.cursor() as cur:
+        assert _partisi_laporan(cur, "ulat grayak") == f"laporan_masalah_p{kp._awal_periode(jauh, 3):%Y%m}"
+        assert _partisi_laporan(cur, "mundur") == "laporan_masalah_default"
+        cur.execute("SELECT count(*) FROM laporan_masalah WHERE dokumen @@ websearch_to_tsquery('simple', 'ulat');")
+        assert cur.fetchone()[0] == 1
+    assert manajer.lepas_lama("laporan_masalah", jauh) != []
+    assert "laporan_masalah_default" in [p.partisi for p in manajer.daftar_partisi("laporan_masalah")]
@@ -0,0 +1,185 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+
+import kode_program as kp
+from conftest import CursorPalsu, KoneksiPalsu, PoolPalsu, ServicePalsu, proses
+
+TANGGAL = datetime.date(2026, 3, 1)
+
+
+def _service(hasil=()):
+    cur = CursorPalsu(hasil)
+    pool = PoolPalsu(KoneksiPalsu(cur))
+    return kp.SipataniService(pool), pool, cur
+
+
+def _execute_values_palsu(baris_per_query):
+    # Pengganti psycopg2.extras.execute_values: kembalikan baris RETURNING yang disiapkan per query
+    dipanggil = []
+
+    def execute_values(cur, query, baris, template=None, page_size=100, fetch=False):
+        dipanggil.append((cur, query, list(baris)))
+        return baris_per_query[query]
+    return execute_values, dipanggil
+
+
+@pytest.mark.parametrize("jadwal, pemupukan", [
+    ((), ()),
+    ([kp.PerubahanJadwal(1)], ()),
+    ((), [kp.PerubahanJadwalPemupukan(1)]),
+    ((), [kp.PerubahanJadwalPemupukan(1, dosis_per_bibit=0)]),
+])
+def test_terapkan_patch_menolak_perubahan_kosong(jadwal, pemupukan):
+    service, pool, _ = _service()
+    with pytest.raises(kp.ValidasiGagal):
+        service.terapkan_patch(jadwal, pemupukan)
+    assert pool.jumlah_getconn == 0
+
+
+def test_terapkan_patch_satu_transaksi(monkeypatch):
+    execute_values, dipanggil = _execute_values_palsu({
+        kp.QUERY_PATCH_JADWAL: [(1, TANGGAL, 2, 3, kp.STATUS_TERJADWAL, 11)],
+        kp.QUERY_PATCH_PEMUPUKAN: [(7, "Urea ke-1", TANGGAL, 2.5, 3, 12)],
+    })
+    monkeypatch.setattr(kp, "execute_values", execute_values)
+    service, pool, cur = _service()
+    hasil = service.terapkan_patch([kp.PerubahanJadwal(1, tanggal=TANGGAL, versi=10)],
+                                   [kp.PerubahanJadwalPemupukan(7, tanggal_pemupukan=TANGGAL, versi=9)])
+    assert hasil.jadwal_tanam == [kp.JadwalTanam(1, TANGGAL, 2, 3, kp.STATUS_TERJADWAL, 11)]
+    assert hasil.jadwal_pemupukan == [kp.KegiatanPemupukan(7, "Urea ke-1", TANGGAL, 2.5, 3, 12)]
+    assert dipanggil[0][2] == [(1, TANGGAL, None, None, None, 10)]
+    assert dipanggil[1][2] == [(7, TANGGAL, None, 9)]
+    assert pool.jumlah_getconn == 1 and pool.koneksi.jumlah_commit == 1
+
+
+@pytest.mark.parametrize("ada, error", [([(1,)], kp.KonflikVersi), ([], kp.DataTidakDitemukan)])
+def test_terapkan_patch_membedakan_konflik_dan_hilang(monkeypatch, ada, error):
+    execute_values, _ = _execute_values_palsu({kp.QUERY_PATCH_JADWAL: []})
+    monkeypatch.setattr(kp, "execute_values", execute_values)
+    service, pool, _ = _service([ada])
+    with pytest.raises(error):
+        service.edit_jadwal(kp.PerubahanJadwal(1, tanggal=TANGGAL, versi=10))
+    assert pool.koneksi.jumlah_rollback == 1 and pool.koneksi.jumlah_commit == 0
+
+
+def test_terapkan_patch_id_ganda_ditolak(monkeypatch):
+    execute_values, dipanggil = _execute_values_palsu({})
+    monkeypatch.setattr(kp, "execute_values", execute_values)
+    service, _, _ = _service()
+    with pytest.raises(kp.ValidasiGagal):
+        service.terapkan_patch([kp.PerubahanJadwal(1, tanggal=TANGGAL), kp.PerubahanJadwal(1, versi=3, tanggal=TANGGAL)])
+    assert dipanggil == []
+
+
+def test_geser_jadwal_massal_memakai_satu_koneksi(monkeypatch):
+    execute_values, dipanggil = _execute_values_palsu({
+        kp.QUERY_PATCH_JADWAL: [(1, TANGGAL + datetime.timedelta(days=3), 2, 3, kp.STATUS_TERJADWAL, 21)],
+        kp.QUERY_PATCH_PEMUPUKAN: [(7, "Urea ke-1", TANGGAL + datetime.timedelta(days=10), 2.5, 3, 22)],
+    })
+    monkeypatch.setattr(kp, "execute_values", execute_values)
+    service, pool, cur = _service([
+        [(1, TANGGAL, 20)],
+        [(7, TANGGAL + datetime.timedelta(days=7), 19)],
+    ])
+    hasil = service.geser_jadwal_massal(kp.FilterJadwal(id_lahan=2), hari=3)
+    assert [j.tanggal for j in hasil.jadwal_tanam] == [TANGGAL + datetime.timedelta(days=3)]
+    assert dipanggil[0][2] == [(1, TANGGAL + datetime.timedelta(days=3), None, None, None, 20)]
+    assert dipanggil[1][2] == [(7, TANGGAL + datetime.timedelta(days=10), None, 19)]
+    # SELECT dan UPDATE dalam satu transaksi di koneksi yang sama, commit sekali di akhir
+    assert all(c is cur for c, _, _ in dipanggil)
+    assert pool.jumlah_getconn == 1 and pool.dipinjam == 0
+    assert pool.koneksi.jumlah_commit == 1
+
+
+def test_geser_jadwal_massal_tanpa_jadwal_cocok(monkeypatch):
+    execute_values, dipanggil = _execute_values_palsu({})
+    monkeypatch.setattr(kp, "execute_values", execute_values)
+    service, _, _ = _service([[]])
+    assert service.geser_jadwal_massal(kp.FilterJadwal(id_lahan=2), hari=-2) == kp.HasilPatch([], [])
+    assert dipanggil == []
+    with pytest.raises(kp.ValidasiGagal):
+        service.geser_jadwal_massal(kp.FilterJadwal(id_lahan=2), hari=0)
+
+
+# ---- Async backend ----
+
+class _KoneksiAsyncPalsu:
+    def __init__(self, baris):
+        self.baris = list(baris)
+        self.query = []
+
+    def transaction(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def fetch(self, query, *args):
+        return []
+
+    async def fetchrow(self, query, *args):
+        self.query.append((query, args))
+        return self.baris.pop(0)
+
+
+class _PoolAsyncPalsu:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        return self.conn
+
+
+def _backend_async(baris):
+    pytest.importorskip("asyncpg")
+    backend = kp.AsyncSipataniBackend()
+    conn = _KoneksiAsyncPalsu(baris)
+    backend.pool = _PoolAsyncPalsu(conn)
+    return backend, conn
+
+
+def test_async_edit_jadwal_memakai_cek_versi():
+    backend, conn = _backend_async([(1, TANGGAL, 2, 3, kp.STATUS_TERJADWAL, 11)])
+    hasil = asyncio.run(backend.edit_jadwal(kp.PerubahanJadwal(1, tanggal=TANGGAL, versi=10)))
+    assert hasil == kp.JadwalTanam(1, TANGGAL, 2, 3, kp.STATUS_TERJADWAL, 11)
+    query, args = conn.query[0]
+    assert "jt.xmin::text::bigint = v.versi" in query and "$6::bigint" in query
+    assert args == (1, TANGGAL, None, None, None, 10)
+
+
+@pytest.mark.parametrize("ada, error", [((7,), kp.KonflikVersi), (None, kp.DataTidakDitemukan)])
+def test_async_ubah_pemupukan_konflik_versi(ada, error):
+    backend, conn = _backend_async([None, ada])
+    with pytest.raises(error):
+        asyncio.run(backend.ubah_jadwal_pemupukan(kp.PerubahanJadwalPemupukan(7, dosis_per_bibit=3, versi=9)))
+    assert conn.query[0][1] == (7, None, 3, 9)
+
+
+# ---- HTTP ----
+
+def test_proses_patch_jadwal_meneruskan_versi():
+    service = ServicePalsu(hasil=kp.JadwalTanam(3, TANGGAL, 2, 3, kp.STATUS_TERJADWAL, 11))
+    kode, payload = proses(service, "PATCH", "/jadwal/3", json.dumps({"tanggal": "2026-03-01", "versi": 10}).encode())
+    assert kode == 200 and payload == service.hasil
+    assert service.dipanggil == [("edit_jadwal", (kp.PerubahanJadwal(3, tanggal=TANGGAL, versi=10),))]
+
+
+def test_edit_jadwal_versi_usang_ditolak(skema_berisi):
+    service = kp.SipataniService(skema_berisi)
+    with skema_berisi.koneksi() as conn, conn.cursor() as cur:
+        cur.execute("SELECT min(id_jadwal_tanam) FROM Jadwal_Tanam;")
+        id_jadwal = cur.fetchone()[0]
+    jadwal = service.ambil_jadwal(id_jadwal)
+    baru = service.edit_jadwal(kp.PerubahanJadwal(id_jadwal, tanggal=TANGGAL, versi=jadwal.versi))
+    assert baru.tanggal == TANGGAL and baru.versi != jadwal.versi
+    # Versi lama sudah dipakai perubahan sebelumnya
+    with pytest.raises(kp.KonflikVersi):
+        service.edit_jadwal(kp.PerubahanJadwal(id_jadwal, tanggal=TANGGAL + datetime.timedelta(days=1),
+                                               versi=jadwal.versi))
+    assert service.ambil_jadwal(id_jadwal).tanggal == TANGGAL
@@ -0,0 +1,29 @@
+import datetime
+
+import pytest
+
+import kode_program as kp
+
+
+def test_proyeksikan_dosis_per_jadwal():
+    np = pytest.importorskip("numpy")
+    pipeline = kp.PipelinePerencanaan(luas_lahan_m2=1)
+    hasil = pipeline.proyeksikan(
+        [[1, 1, 10, 0], [2, 1, 10, 0], [3, 2, 20, 31]],
+        lahan=[(1, 100), (2, 400)],
+        tanaman=[(10, 90, 100), (20, 60, 200)],
+        # Kegiatan umum tanaman 10 (id_jadwal NULL) + kegiatan khusus jadwal 1 dan 3
+        dosis=[(10, None, 1, 1), (10, 1, 2, 2), (20, 3, 0.5, 1)],
+    )
+    assert hasil.jumlah_bibit.tolist() == [100, 100, 100]
+    # Kalender jadwal 1 tidak ikut menaikkan dosis jadwal 2 dengan tanaman yang sama
+    assert hasil.dosis_total.tolist() == [300.0, 100.0, 50.0]
+    assert hasil.tanggal_panen.tolist() == [datetime.date(1970, 4, 1), datetime.date(1970, 4, 1),
+                                            datetime.date(1970, 4, 2)]
+    assert np.array_equal(hasil.id_jadwal_tanam, [1, 2, 3])
+
+
+def test_proyeksikan_tanpa_jadwal():
+    pytest.importorskip("numpy")
+    hasil = kp.PipelinePerencanaan().proyeksikan([], [], [], [])
+    assert len(hasil.id_jadwal_tanam) == 0 and len(hasil.dosis_total) == 0
@@ -0,0 +1,14 @@
+import kode_program as kp
+
+
+def test_registri_query_statistik():
+    registri = kp.RegistriQuery({"ambil_jadwal": kp.QUERY_AMBIL_JADWAL}, aktif=True)
+    assert registri.cari(kp.QUERY_AMBIL_JADWAL) == "sipatani_ambil_jadwal"
+    assert registri.cari("SELECT 1;") is None
+    assert registri.perintah_prepare("sipatani_ambil_jadwal").startswith("PREPARE sipatani_ambil_jadwal AS")
+    registri.catat("sipatani_ambil_jadwal", "prepare")
+    registri.catat("sipatani_ambil_jadwal", "hit")
+    registri.catat("sipatani_ambil_jadwal", "hit")
+    assert registri.statistik() == [{"statement": "sipatani_ambil_jadwal", "prepare": 1, "hit": 2,
+                                     "hit_rate": 0.6667, "aktif": True}]
+    assert not kp.RegistriQuery({"ambil_jadwal": kp.QUERY_AMBIL_JADWAL}, aktif=False).cari(kp.QUERY_AMBIL_JADWAL)
@@ -0,0 +1,32 @@
+import kode_program as kp
+from conftest import CursorPalsu
+
+
+def test_sql_sequence_id_per_sequence():
+    perintah = kp._sql_sequence_id()
+    assert len(perintah) == 4 * len(kp.ID_SEQUENCES)
+    assert "CREATE SEQUENCE IF NOT EXISTS jadwal_tanam_id_seq START WITH 8001;" in perintah
+    assert "ALTER TABLE hasil_panen ALTER COLUMN id_panen SET DEFAULT nextval('hasil_panen_id_seq');" in perintah
+    # Sequence baru selalu diselaraskan dengan ID yang sudah ada sebelum dipakai sebagai DEFAULT
+    indeks = perintah.index("CREATE SEQUENCE IF NOT EXISTS hasil_panen_id_seq START WITH 5001;")
+    assert "setval('hasil_panen_id_seq'" in perintah[indeks + 1]
+
+
+def test_selaraskan_sequence_dilewati_sebelum_migrasi():
+    cur = CursorPalsu([(False,)])
+    kp.selaraskan_sequence(cur, "jadwal_tanam_id_seq")
+    assert len(cur.query) == 1
+    cur = CursorPalsu([(True,)])
+    kp.selaraskan_sequence(cur, "jadwal_tanam_id_seq")
+    assert "COALESCE(MAX(id_jadwal_tanam), 8000) FROM jadwal_tanam" in cur.query[1][0]
+
+
+def test_sequence_id_database_baru(skema_lengkap):
+    with skema_lengkap.koneksi() as conn, conn.cursor() as cur:
+        for nama_seq, (tabel, kolom, id_awal) in kp.ID_SEQUENCES.items():
+            cur.execute("SELECT column_default FROM information_schema.columns "
+                        "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s;",
+                        (tabel, kolom))
+            assert nama_seq in cur.fetchone()[0]
+            cur.execute("SELECT nextval(%s);", (nama_seq,))
+            assert cur.fetchone()[0] == id_awal + 1
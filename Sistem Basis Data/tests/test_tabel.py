@@ -0,0 +1,56 @@
+import datetime
+import io
+
+import kode_program as kp
+
+
+def test_tabel_bertahap_render():
+    output = io.StringIO()
+    tabel = kp.TabelBertahap(["ID", "Nama"], lebar_maks=6, pager=False, output=output)
+    assert tabel.render([(1, "Padi"), (20, "Jagung manis"), (3, None)]) == 3
+    assert output.getvalue().splitlines() == [
+        "+----+--------+",
+        "| ID | Nama   |",
+        "+====+========+",
+        "|  1 | Padi   |",
+        "| 20 | Jagun… |",
+        "|  3 |        |",
+        "+----+--------+",
+    ]
+
+
+def test_tabel_bertahap_kosong():
+    output = io.StringIO()
+    assert kp.TabelBertahap(["ID"], pager=False, output=output).render([]) == 0
+    assert output.getvalue() == ""
+
+
+class _ServiceHalaman:
+    # lihat_jadwal palsu: keyset di atas daftar ID yang disiapkan
+    def __init__(self, id_jadwal):
+        self.id_jadwal = id_jadwal
+        self.dipanggil = []
+
+    def lihat_jadwal(self, id_terakhir, ukuran_halaman):
+        self.dipanggil.append(id_terakhir)
+        data = [kp.JadwalTanamDetail(i, 1, 1, 1, "Padi", 20, 3, datetime.date(2026, 1, 1), 90, "Terjadwal")
+                for i in self.id_jadwal if i > id_terakhir][:ukuran_halaman]
+        return kp.HalamanJadwal(data, data[-1].id_jadwal_tanam if len(data) == ukuran_halaman else None)
+
+
+def test_iter_halaman_jadwal_satu_query_per_halaman():
+    service = _ServiceHalaman([3, 5, 8, 13, 21])
+    manager = kp.JadwalTanamManager(None, cache=object(), service=service)
+    halaman_iter = manager.iter_halaman_jadwal(ukuran_halaman=2)
+    # Halaman berikutnya baru diambil saat dibutuhkan (setelah pager lanjut), bukan lewat cursor terbuka
+    assert [row[0] for row in next(halaman_iter)] == [3, 5]
+    assert service.dipanggil == [0]
+    assert [[row[0] for row in h] for h in halaman_iter] == [[8, 13], [21]]
+    assert service.dipanggil == [0, 5, 13]
+
+
+def test_iter_halaman_jadwal_kelipatan_ukuran():
+    service = _ServiceHalaman([1, 2])
+    manager = kp.JadwalTanamManager(None, cache=object(), service=service)
+    assert len(list(manager.iter_halaman_jadwal(ukuran_halaman=2))) == 1
+    assert service.dipanggil == [0, 2]